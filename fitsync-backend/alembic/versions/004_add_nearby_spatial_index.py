@@ -0,0 +1,59 @@
+"""Add spatial index for nearby_locations
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-02-03 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Composite index for the bounding-box prefilter on any backend
+    op.create_index(
+        'ix_nearby_locations_type_lat_lng', 'nearby_locations',
+        ['location_type', 'latitude', 'longitude'], unique=False
+    )
+
+    if op.get_bind().dialect.name == 'sqlite':
+        # R*Tree virtual table mirroring the location points, kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS nearby_locations_rtree "
+            "USING rtree(id, min_lat, max_lat, min_lng, max_lng)"
+        )
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS nearby_locations_rtree_insert AFTER INSERT ON nearby_locations BEGIN
+                INSERT OR REPLACE INTO nearby_locations_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS nearby_locations_rtree_update AFTER UPDATE OF latitude, longitude ON nearby_locations BEGIN
+                INSERT OR REPLACE INTO nearby_locations_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS nearby_locations_rtree_delete AFTER DELETE ON nearby_locations BEGIN
+                DELETE FROM nearby_locations_rtree WHERE id = old.id;
+            END
+        """)
+        op.execute(
+            "INSERT INTO nearby_locations_rtree "
+            "SELECT id, latitude, latitude, longitude, longitude FROM nearby_locations"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS nearby_locations_rtree_delete")
+        op.execute("DROP TRIGGER IF EXISTS nearby_locations_rtree_update")
+        op.execute("DROP TRIGGER IF EXISTS nearby_locations_rtree_insert")
+        op.execute("DROP TABLE IF EXISTS nearby_locations_rtree")
+
+    op.drop_index('ix_nearby_locations_type_lat_lng', table_name='nearby_locations')
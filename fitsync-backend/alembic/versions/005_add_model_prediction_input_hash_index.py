@@ -0,0 +1,26 @@
+"""Add prediction cache lookup index on model_predictions
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-02-10 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_model_predictions_input_hash', 'model_predictions',
+        ['input_hash', 'model_type', 'model_version'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_model_predictions_input_hash', table_name='model_predictions')
@@ -31,7 +31,7 @@ async def analyze_clothing(
         image_data = await file.read()
         
         # Analyze with ML service
-        analysis_result = await ml_service.analyze_clothing_image(image_data)
+        analysis_result = await ml_service.analyze_clothing_image(image_data, current_user.id)
         
         # Save analysis to database (optional)
         # TODO: Save analysis results for user history
@@ -9,6 +9,7 @@ from typing import Optional, Dict, Any
 from app.core.security import get_current_user
 from app.models.user import User
 from app.services.cache_service import CacheService
+from app.services.nearby_service import NearbyService
 
 router = APIRouter()
 
@@ -22,7 +23,8 @@ async def get_cache_stats(
         if not getattr(current_user, 'is_admin', False):
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        stats = CacheService.get_cache_stats()
+        stats = await CacheService.get_cache_stats()
+        stats["nearby_index"] = NearbyService.index_stats()
         return JSONResponse(content=stats)
         
     except HTTPException:
@@ -42,14 +44,15 @@ async def clear_cache(
             raise HTTPException(status_code=403, detail="Admin access required")
         
         if cache_type:
-            # Clear specific cache type (not implemented in simple version)
+            # Clear a single namespace through its tag
+            cleared = await CacheService.invalidate_namespace(cache_type)
             return JSONResponse(content={
-                "message": f"Cache type '{cache_type}' clearing not implemented in simple cache",
-                "status": "warning"
+                "message": f"Cleared {cleared} '{cache_type}' cache entries",
+                "status": "success"
             })
         else:
             # Clear all cache
-            CacheService.clear_all_cache()
+            await CacheService.clear_all_cache()
             return JSONResponse(content={
                 "message": "All cache entries cleared",
                 "status": "success"
@@ -71,7 +74,7 @@ async def invalidate_user_cache(
         if current_user.id != user_id and not getattr(current_user, 'is_admin', False):
             raise HTTPException(status_code=403, detail="Can only invalidate your own cache")
         
-        CacheService.invalidate_user_cache(user_id)
+        await CacheService.invalidate_user_cache(user_id)
         return JSONResponse(content={
             "message": f"Cache invalidated for user {user_id}",
             "status": "success"
@@ -95,7 +98,7 @@ async def invalidate_location_cache(
         if not getattr(current_user, 'is_admin', False):
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        CacheService.invalidate_location_cache(lat, lng, radius_km)
+        await CacheService.invalidate_location_cache(lat, lng, radius_km)
         return JSONResponse(content={
             "message": f"Location cache invalidated around ({lat}, {lng}) within {radius_km}km",
             "status": "success"
@@ -110,7 +113,7 @@ async def invalidate_location_cache(
 async def cache_health_check():
     """Check cache service health"""
     try:
-        stats = CacheService.get_cache_stats()
+        stats = await CacheService.get_cache_stats()
         
         # Determine health status
         if stats.get("error"):
@@ -149,10 +152,9 @@ async def warm_up_cache(
         if not getattr(current_user, 'is_admin', False):
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        # Warm up categories (most frequently accessed)
-        from app.schemas.clothing import ClothingCategoryEnum
-        categories = [category.value for category in ClothingCategoryEnum]
-        CacheService.set_categories(categories)
+        # Warm up categories (most frequently accessed) under the entry the endpoint serves
+        from app.api.v1.endpoints.ml_recommendations import load_categories
+        await CacheService.warm_response("categories", load_categories)
         
         # You could add more warm-up operations here
         # For example, warm up popular trending styles, etc.
@@ -14,7 +14,7 @@ from app.core.security import SecurityManager, get_current_user
 from app.models.user import User
 from app.services.enhanced_ml_service import enhanced_ml_service
 from app.services.ml_model_manager import ml_model_manager
-from app.core.exceptions import MLModelError
+from app.core.exceptions import MLModelError, InferenceCapacityError, InferenceTimeoutError
 
 router = APIRouter()
 
@@ -34,6 +34,9 @@ async def analyze_clothing_image(
         result = await enhanced_ml_service.analyze_clothing_image(image_data, current_user.id)
         return JSONResponse(content=result)
         
+    except (InferenceCapacityError, InferenceTimeoutError):
+        # Rendered as 503/504 by the FitSyncException handler
+        raise
     except MLModelError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
@@ -51,9 +54,12 @@ async def estimate_body_pose(
     
     try:
         image_data = await file.read()
-        result = await enhanced_ml_service.estimate_body_pose(image_data)
+        result = await enhanced_ml_service.estimate_body_pose(image_data, current_user.id)
         return JSONResponse(content=result)
         
+    except (InferenceCapacityError, InferenceTimeoutError):
+        # Rendered as 503/504 by the FitSyncException handler
+        raise
     except MLModelError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
@@ -77,6 +83,9 @@ async def generate_virtual_tryon(
         result = await enhanced_ml_service.generate_virtual_tryon(person_data, clothing_data)
         return JSONResponse(content=result)
         
+    except (InferenceCapacityError, InferenceTimeoutError):
+        # Rendered as 503/504 by the FitSyncException handler
+        raise
     except MLModelError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
@@ -114,20 +123,25 @@ async def get_model_status(
 @router.post("/models/reload")
 async def reload_models(
     background_tasks: BackgroundTasks,
+    model: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Reload ML models (admin only)"""
+    """Reload one or all loaded ML models without downtime (admin only)"""
     
     # Check if user is admin (implement your admin check logic)
     if not current_user.is_admin:  # Add this field to your User model
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        # Reload models in background
-        background_tasks.add_task(ml_model_manager.cleanup)
-        background_tasks.add_task(ml_model_manager.initialize)
+        if model and model not in ml_model_manager.specs:
+            raise HTTPException(status_code=404, detail=f"Unknown model '{model}'")
         
-        return {"message": "Model reload initiated", "status": "success"}
+        # New versions load next to the current ones, which keep serving until the swap
+        background_tasks.add_task(ml_model_manager.reload, model)
         
+        return {"message": "Model reload initiated", "status": "success"}
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
@@ -2,10 +2,9 @@
 ML Recommendations and Content Discovery Endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 from typing import Optional
-import math
 import json
 
 from app.core.security import get_current_user
@@ -13,29 +12,16 @@ from app.models.user import User
 from app.schemas.clothing import ClothingCategoryEnum
 from app.services.enhanced_ml_service import enhanced_ml_service
 from app.services.trends_service import TrendsService
+from app.services.nearby_service import NearbyService
 from app.services.cache_service import CacheService, hash_context
-from app.database import get_db
+from app.database import get_db, session_scope
+from app.config import settings
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
 # Utility functions
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two points using Haversine formula"""
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    
-    return R * c
+calculate_distance = TrendsService.calculate_distance
 
 # ============================================================================
 # OUTFIT SUGGESTIONS ENDPOINTS
@@ -62,7 +48,7 @@ async def get_outfit_recommendations(
         context_hash = hash_context(context_data) if context_data else None
         
         # Check cache first
-        cached_result = CacheService.get_outfit_recommendations(
+        cached_result = await CacheService.get_outfit_recommendations(
             current_user.id, context_hash, limit
         )
         if cached_result:
@@ -74,7 +60,7 @@ async def get_outfit_recommendations(
         )
         
         # Cache the result
-        CacheService.set_outfit_recommendations(
+        await CacheService.set_outfit_recommendations(
             current_user.id, recommendations, context_hash, limit
         )
         
@@ -87,79 +73,68 @@ async def get_outfit_recommendations(
 # EXPLORE ENDPOINTS
 # ============================================================================
 
+def load_categories():
+    """Body of /explore/categories, also used by the cache warm-up"""
+    return {"categories": [category.value for category in ClothingCategoryEnum]}
+
 @router.get("/explore/categories")
 async def get_explore_categories(
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Get clothing categories for explore screen"""
     try:
-        # Check cache first
-        cached_categories = CacheService.get_categories()
-        if cached_categories:
-            return JSONResponse(content={"categories": cached_categories})
-        
-        # Get fresh data
-        categories = [category.value for category in ClothingCategoryEnum]
-        
-        # Cache the result
-        CacheService.set_categories(categories)
-        
-        return JSONResponse(content={"categories": categories})
+        return await CacheService.cached_response(request, "categories", load_categories)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get categories: {str(e)}")
 
 @router.get("/explore/trending-styles")
 async def get_trending_styles(
+    request: Request,
     limit: int = Query(10, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Get trending styles for explore screen"""
     try:
-        # Check cache first
-        cached_styles = CacheService.get_trending_styles(limit)
-        if cached_styles:
-            return JSONResponse(content={"styles": cached_styles})
-        
-        # Get fresh data from service
-        styles = TrendsService.get_trending_styles(db, limit)
-        styles_data = [style.dict() for style in styles]
-        
-        # Cache the result
-        CacheService.set_trending_styles(styles_data, limit)
+        def load_trending_styles():
+            with session_scope() as db:
+                return {"styles": [style.dict() for style in TrendsService.get_trending_styles(db, limit)]}
         
-        return JSONResponse(content={"styles": styles_data})
+        # Concurrent misses share one query; stale entries refresh in the background
+        return await CacheService.cached_response(
+            request, "trending_styles", load_trending_styles, limit=limit
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get trending styles: {str(e)}")
 
 @router.get("/explore/items")
 async def get_explore_items(
+    request: Request,
     category: Optional[str] = Query(None),
     trending: Optional[bool] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Get explore items (style posts, outfits, etc.)"""
     try:
-        # Check cache first
-        cached_items = CacheService.get_explore_items(category, trending, limit, offset)
-        if cached_items:
-            return JSONResponse(content=cached_items)
-        
-        # Get fresh data from service
-        items, total = TrendsService.get_explore_items(db, category, trending, limit, offset)
-        items_data = [item.dict() for item in items]
-        
-        result = {"items": items_data, "total": total}
-        
-        # Cache the result
-        CacheService.set_explore_items(result, category, trending, limit, offset)
-        
-        return JSONResponse(content=result)
+        def load_explore_items():
+            with session_scope() as db:
+                items, total = TrendsService.get_explore_items(db, category, trending, limit, offset)
+                return {"items": [item.dict() for item in items], "total": total}
+        
+        # Concurrent misses share one query; stale entries refresh in the background
+        return await CacheService.cached_response(
+            request,
+            "explore_items",
+            load_explore_items,
+            category=category,
+            trending=trending,
+            limit=limit,
+            offset=offset
+        )
         # This section is now handled by the service layer above
         
     except Exception as e:
@@ -171,27 +146,27 @@ async def get_explore_items(
 
 @router.get("/trends/trending-now")
 async def get_trending_now(
+    request: Request,
     scope: str = Query("global", pattern="^(global|local)$"),
     timeframe: str = Query("week", pattern="^(day|week|month)$"),
     limit: int = Query(10, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Get trending fashion items and styles"""
     try:
-        # Check cache first
-        cached_trending = CacheService.get_trending_now(scope, timeframe, limit)
-        if cached_trending:
-            return JSONResponse(content={"trendingNow": cached_trending})
-        
-        # Get fresh data from service
-        trending_items = TrendsService.get_trending_now(db, scope, timeframe, limit)
-        trending_data = [item.dict() for item in trending_items]
-        
-        # Cache the result
-        CacheService.set_trending_now(trending_data, scope, timeframe, limit)
-        
-        return JSONResponse(content={"trendingNow": trending_data})
+        def load_trending_now():
+            with session_scope() as db:
+                return {"trendingNow": [item.dict() for item in TrendsService.get_trending_now(db, scope, timeframe, limit)]}
+        
+        # Concurrent misses share one query; stale entries refresh in the background
+        return await CacheService.cached_response(
+            request,
+            "trending_now",
+            load_trending_now,
+            scope=scope,
+            timeframe=timeframe,
+            limit=limit
+        )
         trending_items = [
             {
                 "id": "t_001",
@@ -246,26 +221,25 @@ async def get_trending_now(
 
 @router.get("/trends/fashion-insights")
 async def get_fashion_insights(
+    request: Request,
     scope: str = Query("global", pattern="^(global|local)$"),
     timeframe: str = Query("week", pattern="^(day|week|month)$"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Get fashion insights and trend analysis"""
     try:
-        # Check cache first
-        cached_insights = CacheService.get_fashion_insights(scope, timeframe)
-        if cached_insights:
-            return JSONResponse(content={"insights": cached_insights})
-        
-        # Get fresh data from service
-        insights = TrendsService.get_fashion_insights(db, scope, timeframe)
-        insights_data = [insight.dict() for insight in insights]
-        
-        # Cache the result
-        CacheService.set_fashion_insights(insights_data, scope, timeframe)
-        
-        return JSONResponse(content={"insights": insights_data})
+        def load_fashion_insights():
+            with session_scope() as db:
+                return {"insights": [insight.dict() for insight in TrendsService.get_fashion_insights(db, scope, timeframe)]}
+        
+        # Concurrent misses share one query; stale entries refresh in the background
+        return await CacheService.cached_response(
+            request,
+            "fashion_insights",
+            load_fashion_insights,
+            scope=scope,
+            timeframe=timeframe
+        )
         # This section is now handled by the service layer above
         
     except Exception as e:
@@ -273,26 +247,25 @@ async def get_fashion_insights(
 
 @router.get("/trends/influencer-spotlight")
 async def get_influencer_spotlight(
+    request: Request,
     scope: str = Query("global", pattern="^(global|local)$"),
     limit: int = Query(10, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Get influencer spotlight for trending setters"""
     try:
-        # Check cache first
-        cached_spotlight = CacheService.get_influencer_spotlight(scope, limit)
-        if cached_spotlight:
-            return JSONResponse(content={"spotlight": cached_spotlight})
-        
-        # Get fresh data from service
-        influencers = TrendsService.get_influencer_spotlight(db, scope, limit)
-        influencers_data = [inf.dict() for inf in influencers]
-        
-        # Cache the result
-        CacheService.set_influencer_spotlight(influencers_data, scope, limit)
-        
-        return JSONResponse(content={"spotlight": influencers_data})
+        def load_influencer_spotlight():
+            with session_scope() as db:
+                return {"spotlight": [inf.dict() for inf in TrendsService.get_influencer_spotlight(db, scope, limit)]}
+        
+        # Concurrent misses share one query; stale entries refresh in the background
+        return await CacheService.cached_response(
+            request,
+            "influencer_spotlight",
+            load_influencer_spotlight,
+            scope=scope,
+            limit=limit
+        )
         # This section is now handled by the service layer above
         
     except Exception as e:
@@ -313,8 +286,12 @@ async def get_nearby_people(
 ):
     """Get nearby people with fashion interests"""
     try:
+        if NearbyService.index_ready() or settings.cache_nearby_mode == "cell":
+            people_data = await NearbyService.get_nearby(db, "people", lat, lng, radius_km, limit)
+            return JSONResponse(content={"people": people_data})
+        
         # Check cache first
-        cached_people = CacheService.get_nearby_data(
+        cached_people = await CacheService.get_nearby_data(
             "people", lat, lng, radius_km, limit
         )
         if cached_people:
@@ -325,7 +302,7 @@ async def get_nearby_people(
         people_data = [person.dict() for person in people]
         
         # Cache the result
-        CacheService.set_nearby_data(
+        await CacheService.set_nearby_data(
             "people", people_data, lat, lng, radius_km, limit
         )
         
@@ -346,8 +323,12 @@ async def get_nearby_events(
 ):
     """Get nearby fashion events"""
     try:
+        if NearbyService.index_ready() or settings.cache_nearby_mode == "cell":
+            events_data = await NearbyService.get_nearby(db, "events", lat, lng, radius_km, limit)
+            return JSONResponse(content={"events": events_data})
+        
         # Check cache first
-        cached_events = CacheService.get_nearby_data(
+        cached_events = await CacheService.get_nearby_data(
             "events", lat, lng, radius_km, limit
         )
         if cached_events:
@@ -358,7 +339,7 @@ async def get_nearby_events(
         events_data = [event.dict() for event in events]
         
         # Cache the result
-        CacheService.set_nearby_data(
+        await CacheService.set_nearby_data(
             "events", events_data, lat, lng, radius_km, limit
         )
         
@@ -379,8 +360,12 @@ async def get_nearby_hotspots(
 ):
     """Get nearby fashion hotspots"""
     try:
+        if NearbyService.index_ready() or settings.cache_nearby_mode == "cell":
+            hotspots_data = await NearbyService.get_nearby(db, "hotspots", lat, lng, radius_km, limit)
+            return JSONResponse(content={"hotspots": hotspots_data})
+        
         # Check cache first
-        cached_hotspots = CacheService.get_nearby_data(
+        cached_hotspots = await CacheService.get_nearby_data(
             "hotspots", lat, lng, radius_km, limit
         )
         if cached_hotspots:
@@ -391,7 +376,7 @@ async def get_nearby_hotspots(
         hotspots_data = [hotspot.dict() for hotspot in hotspots]
         
         # Cache the result
-        CacheService.set_nearby_data(
+        await CacheService.set_nearby_data(
             "hotspots", hotspots_data, lat, lng, radius_km, limit
         )
         
@@ -403,48 +388,40 @@ async def get_nearby_hotspots(
 
 @router.get("/nearby/map")
 async def get_nearby_map_data(
+    request: Request,
     lat: float = Query(..., description="User latitude"),
     lng: float = Query(..., description="User longitude"),
     radius_km: float = Query(5.0, ge=0.1, le=50.0),
     limit_people: int = Query(10, ge=1, le=50),
     limit_events: int = Query(10, ge=1, le=50),
     limit_hotspots: int = Query(10, ge=1, le=50),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Get combined nearby data for map overlay"""
     try:
-        # Check cache first
-        cached_map_data = CacheService.get_nearby_data(
-            "map", lat, lng, radius_km, 
-            limit_people=limit_people, 
-            limit_events=limit_events, 
-            limit_hotspots=limit_hotspots
-        )
-        if cached_map_data:
-            return JSONResponse(content=cached_map_data)
-        
-        # Get fresh data from services
-        people = TrendsService.get_nearby_people(db, lat, lng, radius_km, limit_people)
-        events = TrendsService.get_nearby_events(db, lat, lng, radius_km, limit_events)
-        hotspots = TrendsService.get_nearby_hotspots(db, lat, lng, radius_km, limit_hotspots)
-        
-        map_data = {
-            "center": {"latitude": lat, "longitude": lng},
-            "people": [person.dict() for person in people],
-            "events": [event.dict() for event in events],
-            "hotspots": [hotspot.dict() for hotspot in hotspots]
-        }
-        
-        # Cache the result
-        CacheService.set_nearby_data(
-            "map", map_data, lat, lng, radius_km,
+        limits = {"people": limit_people, "events": limit_events, "hotspots": limit_hotspots}
+        
+        # The in-process index is already current and in memory
+        if NearbyService.index_ready():
+            return JSONResponse(content=NearbyService.get_nearby_map(None, lat, lng, radius_km, limits))
+        
+        def load_map_data():
+            with session_scope() as db:
+                return NearbyService.get_nearby_map(db, lat, lng, radius_km, limits)
+        
+        # One spatial query for all three types, cached as a single payload
+        return await CacheService.cached_response(
+            request,
+            "nearby_map",
+            load_map_data,
+            tags=CacheService.nearby_tags(lat, lng, radius_km),
+            lat=round(lat, 3),  # ~100m precision
+            lng=round(lng, 3),
+            radius=radius_km,
             limit_people=limit_people,
             limit_events=limit_events,
             limit_hotspots=limit_hotspots
         )
         
-        return JSONResponse(content=map_data)
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get map data: {str(e)}")
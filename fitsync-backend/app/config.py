@@ -66,6 +66,26 @@ class Settings(BaseSettings):
     # Cache Configuration
     cache_ttl: int = Field(default=3600, description="Cache TTL in seconds")
     recommendation_cache_ttl: int = Field(default=1800, description="Recommendation cache TTL")
+    cache_backend: str = Field(default="memory", description="Cache backend: memory (per-process), redis (shared) or tiered (L1 in-process + L2 redis)")
+    cache_key_prefix: str = Field(default="fitsync:", description="Prefix for keys stored in the shared cache; on Redis Cluster use a hash tag such as {fitsync}:")
+    redis_max_connections: int = Field(default=50, description="Max connections in the async Redis pool")
+    cache_l1_ttl: int = Field(default=5, description="Max seconds a shared entry is kept in the per-process L1 (tiered backend)")
+    cache_l1_max_entries: int = Field(default=2000, description="Maximum number of L1 entries (tiered backend)")
+    cache_lock_ttl: int = Field(default=30, description="Seconds a cross-process single-flight lock is held at most")
+    cache_lock_wait: int = Field(default=10, description="Seconds a worker waits for another worker's single-flight result")
+    cache_xfetch_beta: float = Field(default=1.0, description="XFetch early-refresh aggressiveness for get_or_compute (0 disables)")
+    cache_serialized_responses: bool = Field(default=True, description="Cache encoded JSON response bodies (raw + gzip, with ETag) instead of Python objects")
+    cache_response_gzip_min_size: int = Field(default=1000, description="Minimum body size (bytes) for storing a gzip-compressed copy of cached responses")
+    cache_nearby_mode: str = Field(default="cell", description="Nearby query caching: cell (per-geohash-cell records shared by nearby points) or point (per rounded coordinates and radius)")
+    cache_nearby_precision: int = Field(default=5, description="Geohash length for nearby cell caching (5 = ~4.9km x 4.9km)")
+    cache_nearby_max_cells: int = Field(default=64, description="Max cells per nearby query; larger radii fall back to coarser geohashes")
+    nearby_index_enabled: bool = Field(default=False, description="Answer nearby queries from an in-process grid index of active locations, built at startup")
+    nearby_index_cell_deg: float = Field(default=0.05, description="Grid cell size (degrees) of the in-process nearby index")
+    nearby_index_rebuild_interval: int = Field(default=300, description="Seconds between full nearby index rebuilds, picking up writes from other processes (0 disables)")
+    cache_max_entries: int = Field(default=10000, description="Maximum number of in-memory cache entries")
+    cache_max_bytes: int = Field(default=64 * 1024 * 1024, description="Approximate in-memory cache size budget in bytes (64MB)")
+    cache_eviction_policy: str = Field(default="lru", description="In-memory cache eviction policy: lru or lfu")
+    cache_sweep_interval: int = Field(default=30, description="Seconds between background sweeps of expired cache entries")
     
     # Social Features
     enable_location_services: bool = Field(default=True, description="Enable location-based features")
@@ -74,6 +94,36 @@ class Settings(BaseSettings):
     # Performance Configuration
     batch_size: int = Field(default=32, description="Batch size for ML processing")
     max_concurrent_requests: int = Field(default=10, description="Maximum concurrent ML requests")
+    ml_queue_size: int = Field(default=20, description="ML calls allowed to wait for a free inference slot before new ones are rejected with 503")
+    ml_inference_timeout: float = Field(default=30.0, description="Seconds a request waits for an ML call before failing with 504 (0 disables)")
+    ml_batch_max_wait_ms: float = Field(default=10.0, description="Max milliseconds a detection request waits for others to fill its batch (up to batch_size)")
+    ml_prediction_cache_size: int = Field(default=2000, description="Maximum ML predictions kept in the in-memory LRU")
+    ml_prediction_cache_ttl: int = Field(default=86400, description="Seconds an in-memory cached prediction is kept")
+    ml_prediction_cache_persist: bool = Field(default=True, description="Also store and look up predictions in the model_predictions table")
+    ml_prediction_version: str = Field(default="1", description="Bump to invalidate cached predictions after changing model or pipeline logic")
+    ml_near_duplicate_enabled: bool = Field(default=True, description="Reuse a user's recent clothing analysis for re-encoded or resized copies of the same photo")
+    ml_perceptual_hash: str = Field(default="dhash", description="Perceptual hash for near-duplicate uploads: dhash or phash")
+    ml_near_duplicate_max_distance: int = Field(default=5, description="Max differing bits (of 64) between perceptual hashes of near-duplicate uploads")
+    ml_near_duplicate_per_user: int = Field(default=50, description="Recent upload hashes remembered per user")
+    ml_near_duplicate_ttl: int = Field(default=86400, description="Seconds an upload hash stays eligible for near-duplicate matching")
+    color_palette_engine: str = Field(default="kmeans", description="Palette extraction: kmeans (every pixel), minibatch (MiniBatchKMeans on a pixel grid), histogram (32^3 bins, top-k merge) or median_cut")
+    color_palette_sample_size: int = Field(default=20000, description="Pixels the minibatch palette engine clusters")
+    ml_execution_mode: str = Field(default="thread", description="Where CPU-bound ML tasks such as palette extraction run: thread (inference pool) or process (worker processes)")
+    ml_process_workers: int = Field(default=0, description="Worker processes when ml_execution_mode is process (0 = one per CPU)")
+    ml_process_start_method: str = Field(default="spawn", description="multiprocessing start method for ML workers: spawn, forkserver or fork")
+    ml_eager_models: List[str] = Field(default=["clothing_detector"], description="Models loaded and warmed up at startup (\"all\" for every model); others load on first use")
+    ml_model_warmup: bool = Field(default=True, description="Run one inference on each model after loading so the first request doesn't pay for lazy allocation")
+    ml_reload_drain_timeout: float = Field(default=30.0, description="Seconds a reload waits for requests on the old model version before releasing it")
+    pose_pool_size: int = Field(default=0, description="MediaPipe Pose graphs per mode (static/video), one per concurrent call (0 = max_concurrent_requests)")
+    ml_preload_models: bool = Field(default=False, description="Under gunicorn, load the fork-safe eager models in the master so workers share them copy-on-write")
+    ml_inference_backend: str = Field(default="torch", description="Runtime for the clothing detector and try-on generator: torch or onnx (ONNX Runtime on CPU)")
+    clothing_detection_onnx_model: str = Field(default="", description="ONNX clothing detection model (default: detection model path with .onnx, exported if missing)")
+    virtual_tryon_onnx_model: str = Field(default="", description="ONNX try-on generator (default: try-on model path with .onnx, exported if missing)")
+    onnx_intra_op_threads: int = Field(default=0, description="ONNX Runtime threads inside one operator (0 = one per physical core)")
+    onnx_inter_op_threads: int = Field(default=1, description="ONNX Runtime threads across independent operators (above 1 enables parallel execution)")
+    virtual_tryon_quantization: str = Field(default="none", description="INT8 try-on generator on ONNX Runtime: none, dynamic (weights only) or static (calibrated, fastest on CPU)")
+    virtual_tryon_calibration_dir: str = Field(default="", description="Person/clothing images that calibrate static quantization (synthetic images if empty)")
+    virtual_tryon_calibration_samples: int = Field(default=32, description="Image pairs used to calibrate static quantization")
     
     # Logging Configuration
     log_level: str = Field(default="INFO", description="Logging level")
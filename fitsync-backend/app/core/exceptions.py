@@ -93,6 +93,28 @@ class MLModelError(FitSyncException):
             details={"model_type": model_type, "operation": operation, **(details or {})}
         )
 
+class InferenceCapacityError(FitSyncException):
+    """Raised when the ML inference queue is full"""
+    
+    def __init__(self, task: str, details: Dict[str, Any] = None):
+        super().__init__(
+            message=f"ML inference capacity exhausted, {task} rejected; retry shortly",
+            error_code="INFERENCE_CAPACITY_ERROR",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            details={"task": task, **(details or {})}
+        )
+
+class InferenceTimeoutError(FitSyncException):
+    """Raised when an ML inference call exceeds its timeout"""
+    
+    def __init__(self, task: str, timeout: float, details: Dict[str, Any] = None):
+        super().__init__(
+            message=f"ML inference {task} timed out after {timeout}s",
+            error_code="INFERENCE_TIMEOUT_ERROR",
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            details={"task": task, "timeout": timeout, **(details or {})}
+        )
+
 class ImageProcessingError(FitSyncException):
     """Raised when image processing fails"""
     
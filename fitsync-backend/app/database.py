@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import logging
-from typing import AsyncGenerator, Generator, Optional
+from contextlib import contextmanager
+from typing import AsyncGenerator, Generator, Iterator, Optional
 
 from sqlalchemy import event, text
 from sqlalchemy.pool import QueuePool
@@ -103,6 +104,23 @@ else:
         finally:
             db.close()
 
+@contextmanager
+def session_scope() -> Iterator:
+    """
+    Standalone sync session for work that outlives a request, such as
+    background cache refreshes (request sessions are closed after the response).
+    """
+    if IS_ASYNC:
+        raise RuntimeError("session_scope() requires a sync database engine")
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 # -----------------------------------------------------------------------------
 # SQLite PRAGMAs (performance) — works for both async & sync engines
 # -----------------------------------------------------------------------------
@@ -149,13 +167,19 @@ async def init_db() -> None:
         # Adjust these imports to your real model module paths
         from app.models import user, clothing, social, analytics  # noqa: F401
 
+        from app.services.spatial_index import SpatialIndex
+
         if IS_ASYNC:
             assert isinstance(engine, AsyncEngine)
             async with engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+                # R*Tree over nearby_locations for spatial queries (SQLite only)
+                await conn.run_sync(SpatialIndex.ensure_rtree)
         else:
             # sync engine path
             Base.metadata.create_all(bind=engine)  # type: ignore[arg-type]
+            with engine.begin() as conn:  # type: ignore[union-attr]
+                SpatialIndex.ensure_rtree(conn)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Database initialization error: {e}")
@@ -1,6 +1,7 @@
 # app/main.py
 from __future__ import annotations
 
+import asyncio
 import time
 from pathlib import Path
 from contextlib import asynccontextmanager
@@ -20,6 +21,10 @@ from app.core.exceptions import FitSyncException, handle_fitsync_exception
 from app.database import init_db, check_db_connection
 from app.core.security import rate_limiter
 from app.services.ml_model_manager import ml_model_manager
+from app.services.cache_service import CacheService
+from app.services.nearby_service import NearbyService
+from app.services.inference_executor import inference_executor
+from app.services.ml_worker_pool import ml_worker_pool
 
 # -----------------------------------------------------------------------------
 # Prometheus metrics
@@ -78,15 +83,29 @@ async def lifespan(app: FastAPI):
         if getattr(settings, "environment", "development") == "production":
             raise
 
+    # Process-based ML workers load their models before taking traffic
+    if ml_worker_pool.enabled:
+        await asyncio.to_thread(ml_worker_pool.start)
+
+    # Cache invalidation listener + proactive eviction of expired entries
+    await CacheService.start()
+
+    # Optional in-process spatial index for nearby queries
+    await NearbyService.start_index()
+
     api_logger.info("FitSync API server started successfully")
     yield
 
     # Shutdown
     api_logger.info("Shutting down FitSync API server...")
+    await NearbyService.stop_index()
+    await CacheService.close()
     try:
         await ml_model_manager.cleanup()
     except Exception as e:
         api_logger.warning(f"ML model cleanup error: {e}")
+    inference_executor.shutdown()
+    ml_worker_pool.shutdown()
 
 # -----------------------------------------------------------------------------
 # Create FastAPI app
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, JSON, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, JSON, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -86,6 +86,11 @@ class ModelPrediction(Base):
     
     # Relationships
     user = relationship("User")
+    
+    __table_args__ = (
+        # Prediction cache lookups by input content and model
+        Index("ix_model_predictions_input_hash", "input_hash", "model_type", "model_version"),
+    )
 
 class RecommendationHistory(Base):
     __tablename__ = "recommendation_history"
@@ -1,9 +1,15 @@
 # app/models/detection/clothing_detector.py
 from __future__ import annotations
 
+import asyncio
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 import logging
 
+import cv2
+
+from app.utils import onnx_runtime
+
 # Try to import ultralytics at module level
 try:
     from ultralytics import YOLO  # type: ignore
@@ -19,22 +25,44 @@ class ClothingDetector:
     YOLOv8 wrapper that:
       - Works even if Ultralytics isn't installed (it returns empty results)
       - Accepts optional `model_path` and `device` ("cpu" | "cuda:0" …)
+      - With backend="onnx", runs an ONNX export through ONNX Runtime on CPU,
+        with letterboxing and NMS done in NumPy (no torch at inference time)
     """
 
-    def __init__(self, model_path: Optional[str] = "yolov8n.pt", device: Optional[str] = None):
+    def __init__(
+        self,
+        model_path: Optional[str] = "yolov8n.pt",
+        device: Optional[str] = None,
+        backend: str = "torch",
+        onnx_path: Optional[str] = None,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+    ):
         self.model_path = model_path
         self.device = device  # "cpu" or "cuda:0"
+        self.backend = backend  # "torch" (Ultralytics) or "onnx"
+        self.onnx_path = onnx_path or str(Path(model_path or "yolov8n.pt").with_suffix(".onnx"))
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
         self.model = None
+        self.session = None
+        self.names: Dict[int, str] = {}
+        self.imgsz = 640
         self.available = False
 
     async def load(self) -> None:
+        # Weight loading and export are blocking; keep them off the event loop
+        if self.backend == "onnx":
+            await asyncio.to_thread(self._load_onnx)
+            return
+
         if not ULTRALYTICS_AVAILABLE:
             logger.warning("Ultralytics not available; detection disabled")
             self.available = False
             return
 
         try:
-            self.model = YOLO(self.model_path or "yolov8n.pt")
+            self.model = await asyncio.to_thread(YOLO, self.model_path or "yolov8n.pt")
             # Move model to device if provided
             if self.device:
                 try:
@@ -47,7 +75,39 @@ class ClothingDetector:
             logger.error(f"Failed to load ClothingDetector: {e}")
             self.available = False
 
+    def _load_onnx(self) -> None:
+        try:
+            if not Path(self.onnx_path).exists():
+                if not ULTRALYTICS_AVAILABLE:
+                    raise FileNotFoundError(f"{self.onnx_path} not found and Ultralytics is unavailable to export it")
+                self.export_onnx(self.onnx_path)
+            self.session = onnx_runtime.create_session(
+                self.onnx_path, self.intra_op_threads, self.inter_op_threads
+            )
+            self.names = onnx_runtime.yolo_class_names(self.session)
+            _, shape = onnx_runtime.session_input(self.session)
+            if isinstance(shape[-1], int):
+                self.imgsz = shape[-1]
+            self.available = True
+            logger.info(f"ClothingDetector loaded ONNX model {self.onnx_path}.")
+        except Exception as e:
+            logger.error(f"Failed to load ONNX ClothingDetector: {e}")
+            self.available = False
+
+    def export_onnx(self, onnx_path: Optional[str] = None, imgsz: int = 640) -> str:
+        """Export the Ultralytics weights to ONNX (dynamic batch and size); returns the file written"""
+        if not ULTRALYTICS_AVAILABLE:
+            raise RuntimeError("Ultralytics is required to export the detector")
+        exported = YOLO(self.model_path or "yolov8n.pt").export(format="onnx", imgsz=imgsz, dynamic=True)
+        target = onnx_path or self.onnx_path
+        if Path(exported).resolve() != Path(target).resolve():
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            Path(exported).replace(target)
+        return target
+
     async def detect(self, image_path: str) -> List[Dict[str, Any]]:
+        if self.available and self.session is not None:
+            return self._detect_batch_onnx([image_path])[0]
         if not self.available or self.model is None:
             return []
 
@@ -57,20 +117,67 @@ class ClothingDetector:
             logger.error(f"YOLO inference error: {e}")
             return []
 
+        boxes: List[Dict[str, Any]] = []
+        for r in results:
+            boxes.extend(self._parse_result(r))
+        return boxes
+
+    def detect_batch(self, images: List[Any]) -> List[List[Dict[str, Any]]]:
+        """
+        Run one forward pass over several images (BGR arrays or paths).
+
+        Blocking; returns one list of boxes per input, in input order.
+        """
+        if not self.available:
+            return [[] for _ in images]
+        if self.session is not None:
+            return self._detect_batch_onnx(images)
+        if self.model is None:
+            return [[] for _ in images]
+
+        # Ultralytics batches a list source into a single forward pass
+        results = self.model(list(images), verbose=False)
+        return [self._parse_result(r) for r in results]
+
+    def detect_clothing(self, image: Any) -> List[Dict[str, Any]]:
+        """Blocking single-image detection (a batch of one)"""
+        return self.detect_batch([image])[0]
+
+    def _detect_batch_onnx(self, images: List[Any]) -> List[List[Dict[str, Any]]]:
+        arrays = [cv2.imread(str(image)) if isinstance(image, (str, Path)) else image for image in images]
+        batch, transforms = onnx_runtime.yolo_input(arrays, self.imgsz)
+        predictions = onnx_runtime.run(self.session, batch)
+        results = []
+        for prediction, transform, image in zip(predictions, transforms, arrays):
+            boxes, confidences, classes = onnx_runtime.yolo_postprocess(prediction, transform, image.shape)
+            results.append([
+                self._box(xyxy, float(conf), int(cls)) for xyxy, conf, cls in zip(boxes, confidences, classes)
+            ])
+        return results
+
+    def _box(self, xyxy: Any, confidence: float, cls: int, names: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
+        names = self.names if names is None else names
+        return {
+            "x1": float(xyxy[0]),
+            "y1": float(xyxy[1]),
+            "x2": float(xyxy[2]),
+            "y2": float(xyxy[3]),
+            "confidence": confidence,
+            "label": str(cls),
+            # Integer pixel box and class name, as used for cropping by the ML services
+            "bbox": [int(v) for v in xyxy],
+            "class": names.get(cls, str(cls)),
+        }
+
+    def _parse_result(self, result: Any) -> List[Dict[str, Any]]:
+        names = getattr(result, "names", None) or {}
         boxes: List[Dict[str, Any]] = []
         try:
-            for r in results:
-                # r.boxes may be empty
-                for b in getattr(r, "boxes", []) or []:
-                    xyxy = b.xyxy.cpu().numpy().astype(float)[0]
-                    boxes.append({
-                        "x1": float(xyxy[0]),
-                        "y1": float(xyxy[1]),
-                        "x2": float(xyxy[2]),
-                        "y2": float(xyxy[3]),
-                        "confidence": float(b.conf.cpu().numpy()[0]),
-                        "label": str(int(b.cls.cpu().numpy()[0])),
-                    })
+            # r.boxes may be empty
+            for b in getattr(result, "boxes", []) or []:
+                xyxy = b.xyxy.cpu().numpy().astype(float)[0]
+                cls = int(b.cls.cpu().numpy()[0])
+                boxes.append(self._box(xyxy, float(b.conf.cpu().numpy()[0]), cls, names))
         except Exception as e:
             logger.error(f"Failed to parse YOLO results: {e}")
         return boxes
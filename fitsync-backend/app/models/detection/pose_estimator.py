@@ -5,10 +5,14 @@ Pose Estimation Model for Body Type Analysis and Virtual Try-On
 import cv2
 import numpy as np
 import mediapipe as mp
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+import contextlib
 import logging
+import threading
 from dataclasses import dataclass
 
+from app.utils.instance_pool import InstancePool
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -31,68 +35,129 @@ class BodyMeasurements:
     confidence: float
 
 class PoseEstimator:
-    """MediaPipe-based pose estimation for body measurements"""
+    """
+    MediaPipe-based pose estimation for body measurements
+
+    A MediaPipe Pose graph is slow to build and serves one call at a time,
+    so the estimator keeps a pool of ready graphs per mode (static image
+    and video) and checks one out per call. Size the pools to the number
+    of calls that can run at once.
+    """
     
-    def __init__(self, static_mode: bool = False, model_complexity: int = 1):
+    def __init__(self, static_mode: bool = False, model_complexity: int = 1,
+                 pool_size: int = 1, checkout_timeout: Optional[float] = None):
         """
         Initialize pose estimator
         
         Args:
-            static_mode: Whether to use static mode for better accuracy
+            static_mode: Default mode for estimate_pose; static mode is more accurate on single images
             model_complexity: Model complexity (0, 1, or 2)
+            pool_size: Pose graphs per mode, built up front (the other mode's pool on first use)
+            checkout_timeout: Seconds to wait for a free graph before giving up (None waits forever)
         """
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=static_mode,
-            model_complexity=model_complexity,
-            enable_segmentation=True,
-            min_detection_confidence=0.5
-        )
+        self.static_mode = static_mode
+        self.model_complexity = model_complexity
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self._pools: Dict[bool, InstancePool] = {}
+        self._pools_lock = threading.Lock()
+        self._pool(static_mode)
         self.mp_drawing = mp.solutions.drawing_utils
+    
+    def _pool(self, static_mode: bool) -> InstancePool:
+        """Pool of Pose graphs for one mode, built on first use"""
+        pool = self._pools.get(static_mode)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(static_mode)
+                if pool is None:
+                    pool = InstancePool(
+                        "pose_static" if static_mode else "pose_video",
+                        lambda: self.mp_pose.Pose(
+                            static_image_mode=static_mode,
+                            model_complexity=self.model_complexity,
+                            enable_segmentation=True,
+                            min_detection_confidence=0.5
+                        ),
+                        self.pool_size,
+                        # Video graphs track landmarks from frame to frame; the next stream starts fresh
+                        reset=None if static_mode else (lambda pose: pose.reset()),
+                        close=lambda pose: pose.close()
+                    )
+                    self._pools[static_mode] = pool
+        return pool
         
-    def estimate_pose(self, image: np.ndarray) -> Optional[PoseLandmarks]:
+    def estimate_pose(self, image: np.ndarray, static_mode: Optional[bool] = None) -> Optional[PoseLandmarks]:
         """
         Estimate pose from image
         
         Args:
             image: Input image (BGR format)
+            static_mode: Mode to run in (default: the estimator's static_mode)
             
         Returns:
             PoseLandmarks object or None if no pose detected
         """
+        mode = self.static_mode if static_mode is None else static_mode
         try:
-            # Convert BGR to RGB
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Process image
-            results = self.pose.process(rgb_image)
-            
-            if results.pose_landmarks:
-                landmarks = []
-                visibility = []
-                
-                for landmark in results.pose_landmarks.landmark:
-                    landmarks.append((landmark.x, landmark.y, landmark.z))
-                    visibility.append(landmark.visibility)
-                
-                pose_world_landmarks = None
-                if results.pose_world_landmarks:
-                    pose_world_landmarks = [
-                        (lm.x, lm.y, lm.z) for lm in results.pose_world_landmarks.landmark
-                    ]
-                
-                return PoseLandmarks(
-                    landmarks=landmarks,
-                    visibility=visibility,
-                    pose_world_landmarks=pose_world_landmarks
-                )
-            
-            return None
-            
+            with self._pool(mode).checkout(self.checkout_timeout) as pose:
+                return self._process(pose, image)
         except Exception as e:
             logger.error(f"Error in pose estimation: {e}")
             return None
     
+    @contextlib.contextmanager
+    def video_stream(self) -> Iterator[Callable[[np.ndarray], Optional[PoseLandmarks]]]:
+        """
+        Hold one video-mode graph for the frames of a single stream, so tracking carries over
+        
+        Yields a function estimating the pose of the next frame; the graph
+        goes back to the pool, reset, when the block exits.
+        """
+        with self._pool(False).checkout(self.checkout_timeout) as pose:
+            def estimate(frame: np.ndarray) -> Optional[PoseLandmarks]:
+                try:
+                    return self._process(pose, frame)
+                except Exception as e:
+                    logger.error(f"Error in pose estimation: {e}")
+                    return None
+            yield estimate
+    
+    def _process(self, pose, image: np.ndarray) -> Optional[PoseLandmarks]:
+        """Run one checked-out Pose graph on a BGR image"""
+        # Convert BGR to RGB
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        
+        # Process image
+        results = pose.process(rgb_image)
+        
+        if results.pose_landmarks:
+            landmarks = []
+            visibility = []
+            
+            for landmark in results.pose_landmarks.landmark:
+                landmarks.append((landmark.x, landmark.y, landmark.z))
+                visibility.append(landmark.visibility)
+            
+            pose_world_landmarks = None
+            if results.pose_world_landmarks:
+                pose_world_landmarks = [
+                    (lm.x, lm.y, lm.z) for lm in results.pose_world_landmarks.landmark
+                ]
+            
+            return PoseLandmarks(
+                landmarks=landmarks,
+                visibility=visibility,
+                pose_world_landmarks=pose_world_landmarks
+            )
+        
+        return None
+    
+    def pool_stats(self) -> Dict[str, Dict]:
+        """Checkout and wait statistics per mode"""
+        return {"static" if mode else "video": pool.stats() for mode, pool in self._pools.items()}
+    
     def calculate_body_measurements(self, pose_landmarks: PoseLandmarks, 
                                   image_height: int, image_width: int) -> BodyMeasurements:
         """
@@ -259,5 +324,6 @@ class PoseEstimator:
     
     def cleanup(self):
         """Clean up resources"""
-        if hasattr(self, 'pose'):
-            self.pose.close()
+        for pool in self._pools.values():
+            pool.close()
+        self._pools.clear()
@@ -12,6 +12,8 @@ from dataclasses import dataclass
 from PIL import Image
 import os
 
+from app.utils import onnx_runtime
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -22,20 +24,83 @@ class TryOnResult:
     processing_time: float
     metadata: Dict
 
+class Generator(nn.Module):
+    """Encoder-decoder over person RGB + clothing RGB + pose map (7 channels)"""
+    
+    def __init__(self, input_channels=7, output_channels=3):
+        super(Generator, self).__init__()
+    
+        # Encoder
+        self.encoder = nn.Sequential(
+            nn.Conv2d(input_channels, 64, 3, padding=1),
+            nn.ReLU(inplace=True),
+            nn.Conv2d(64, 128, 3, padding=1),
+            nn.ReLU(inplace=True),
+            nn.MaxPool2d(2, 2),
+    
+            nn.Conv2d(128, 256, 3, padding=1),
+            nn.ReLU(inplace=True),
+            nn.Conv2d(256, 512, 3, padding=1),
+            nn.ReLU(inplace=True),
+            nn.MaxPool2d(2, 2),
+        )
+    
+        # Decoder
+        self.decoder = nn.Sequential(
+            nn.ConvTranspose2d(512, 256, 2, stride=2),
+            nn.ReLU(inplace=True),
+            nn.Conv2d(256, 256, 3, padding=1),
+            nn.ReLU(inplace=True),
+    
+            nn.ConvTranspose2d(256, 128, 2, stride=2),
+            nn.ReLU(inplace=True),
+            nn.Conv2d(128, 128, 3, padding=1),
+            nn.ReLU(inplace=True),
+    
+            nn.Conv2d(128, 64, 3, padding=1),
+            nn.ReLU(inplace=True),
+            nn.Conv2d(64, output_channels, 3, padding=1),
+            nn.Tanh()
+        )
+    
+    def forward(self, x):
+        encoded = self.encoder(x)
+        decoded = self.decoder(encoded)
+        return decoded
+
 class VirtualTryOnModel:
     """GAN-based virtual try-on model"""
     
-    def __init__(self, model_path: Optional[str] = None, device: str = "cpu"):
+    # Generator input size as (width, height)
+    TARGET_SIZE = (256, 192)
+    
+    def __init__(self, model_path: Optional[str] = None, device: str = "cpu",
+                 backend: str = "torch", onnx_path: Optional[str] = None,
+                 intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 quantization: str = "none", calibration_dir: Optional[str] = None,
+                 calibration_samples: int = 32):
         """
         Initialize virtual try-on model
         
         Args:
             model_path: Path to pre-trained model weights
             device: Device to run model on ('cpu' or 'cuda')
+            backend: 'torch' (eager) or 'onnx' (ONNX Runtime on CPU)
+            onnx_path: ONNX file for the onnx backend; exported from the torch
+                weights if missing
+            intra_op_threads, inter_op_threads: ONNX Runtime thread pools
+            quantization: 'none', or 'dynamic' / 'static' to run an INT8 copy of
+                the generator on ONNX Runtime (quantized on first use)
+            calibration_dir, calibration_samples: images and pair count used
+                to calibrate static quantization
         """
         self.device = torch.device(device if torch.cuda.is_available() else "cpu")
         self.model = None
+        self.session = None
         self.model_path = model_path
+        self.backend = "onnx" if quantization != "none" else backend
+        self.quantization = quantization
+        self.onnx_path = onnx_path or os.path.splitext(model_path or "tryon_model.pt")[0] + ".onnx"
         
         # Initialize model architecture
         self._initialize_model()
@@ -43,56 +108,24 @@ class VirtualTryOnModel:
         # Load pre-trained weights if provided
         if model_path and os.path.exists(model_path):
             self.load_model(model_path)
+        
+        if self.backend == "onnx":
+            if not os.path.exists(self.onnx_path):
+                self.export_onnx(self.onnx_path)
+            session_path = self.onnx_path
+            if quantization != "none":
+                session_path = self.quantized_path(quantization)
+                if not os.path.exists(session_path):
+                    self.quantize(quantization, calibration_dir, calibration_samples)
+            self.session = onnx_runtime.create_session(session_path, intra_op_threads, inter_op_threads)
     
     def _initialize_model(self):
         """Initialize the GAN model architecture"""
         try:
             # This is a simplified GAN architecture
             # In production, you'd use more sophisticated models like HR-VITON, ACGPN, etc.
-            
-            class Generator(nn.Module):
-                def __init__(self, input_channels=6, output_channels=3):
-                    super(Generator, self).__init__()
-                    
-                    # Encoder
-                    self.encoder = nn.Sequential(
-                        nn.Conv2d(input_channels, 64, 3, padding=1),
-                        nn.ReLU(inplace=True),
-                        nn.Conv2d(64, 128, 3, padding=1),
-                        nn.ReLU(inplace=True),
-                        nn.MaxPool2d(2, 2),
-                        
-                        nn.Conv2d(128, 256, 3, padding=1),
-                        nn.ReLU(inplace=True),
-                        nn.Conv2d(256, 512, 3, padding=1),
-                        nn.ReLU(inplace=True),
-                        nn.MaxPool2d(2, 2),
-                    )
-                    
-                    # Decoder
-                    self.decoder = nn.Sequential(
-                        nn.ConvTranspose2d(512, 256, 2, stride=2),
-                        nn.ReLU(inplace=True),
-                        nn.Conv2d(256, 256, 3, padding=1),
-                        nn.ReLU(inplace=True),
-                        
-                        nn.ConvTranspose2d(256, 128, 2, stride=2),
-                        nn.ReLU(inplace=True),
-                        nn.Conv2d(128, 128, 3, padding=1),
-                        nn.ReLU(inplace=True),
-                        
-                        nn.Conv2d(128, 64, 3, padding=1),
-                        nn.ReLU(inplace=True),
-                        nn.Conv2d(64, output_channels, 3, padding=1),
-                        nn.Tanh()
-                    )
-                
-                def forward(self, x):
-                    encoded = self.encoder(x)
-                    decoded = self.decoder(encoded)
-                    return decoded
-            
             self.model = Generator().to(self.device)
+            self.model.eval()
             logger.info(f"Virtual try-on model initialized on {self.device}")
             
         except Exception as e:
@@ -115,6 +148,67 @@ class VirtualTryOnModel:
         except Exception as e:
             logger.error(f"Error loading virtual try-on model: {e}")
     
+    def export_onnx(self, onnx_path: Optional[str] = None, opset_version: int = 17) -> str:
+        """Export the generator to ONNX with a dynamic batch axis; returns the file written"""
+        onnx_path = onnx_path or self.onnx_path
+        os.makedirs(os.path.dirname(os.path.abspath(onnx_path)), exist_ok=True)
+        width, height = self.TARGET_SIZE
+        dummy = torch.zeros(1, 7, height, width, device=self.device)
+        self.model.eval()
+        torch.onnx.export(
+            self.model, dummy, onnx_path,
+            input_names=["input"], output_names=["output"],
+            dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+            opset_version=opset_version
+        )
+        logger.info(f"Virtual try-on generator exported to {onnx_path}")
+        return onnx_path
+    
+    def quantized_path(self, mode: str) -> str:
+        """INT8 model file for a quantization mode, next to the fp32 ONNX file"""
+        return os.path.splitext(self.onnx_path)[0] + f".int8-{mode}.onnx"
+    
+    def quantize(self, mode: str = "static", calibration_dir: Optional[str] = None,
+                 calibration_samples: int = 32) -> str:
+        """Write the INT8 generator for ``mode``, exporting to ONNX first if needed; returns its path"""
+        if not os.path.exists(self.onnx_path):
+            self.export_onnx(self.onnx_path)
+        batches = self.calibration_batches(calibration_dir, calibration_samples) if mode == "static" else None
+        return onnx_runtime.quantize(self.onnx_path, self.quantized_path(mode), mode, batches)
+    
+    def calibration_batches(self, image_dir: Optional[str] = None, samples: int = 32) -> List[np.ndarray]:
+        """
+        Generator inputs to calibrate static quantization on
+        
+        Images in ``image_dir`` are paired in sorted order as (person, clothing).
+        Without at least two, smooth synthetic images stand in; activation
+        ranges calibrated on them fit real photos less well.
+        """
+        images = []
+        if image_dir and os.path.isdir(image_dir):
+            for name in sorted(os.listdir(image_dir)):
+                image = cv2.imread(os.path.join(image_dir, name))
+                if image is not None:
+                    images.append(image)
+        if len(images) < 2:
+            logger.warning("No calibration images found; calibrating the try-on generator on synthetic images")
+            rng = np.random.default_rng(0)
+            width, height = self.TARGET_SIZE
+            images = [
+                cv2.GaussianBlur(
+                    cv2.resize(rng.integers(0, 256, size=(8, 6, 3), dtype=np.uint8), (width, height),
+                               interpolation=cv2.INTER_CUBIC),
+                    (0, 0), 4
+                )
+                for _ in range(samples + 1)
+            ]
+        
+        pairs = min(samples, len(images))
+        return [
+            self.preprocess_images(images[i], images[(i + 1) % len(images)]).cpu().numpy()
+            for i in range(pairs)
+        ]
+    
     def preprocess_images(self, person_image: np.ndarray, 
                          clothing_image: np.ndarray,
                          pose_landmarks: Optional[List[Tuple[float, float]]] = None) -> torch.Tensor:
@@ -131,7 +225,7 @@ class VirtualTryOnModel:
         """
         try:
             # Resize images to standard size
-            target_size = (256, 192)  # Standard size for virtual try-on
+            target_size = self.TARGET_SIZE  # Standard size for virtual try-on
             
             person_resized = cv2.resize(person_image, target_size)
             clothing_resized = cv2.resize(clothing_image, target_size)
@@ -166,6 +260,13 @@ class VirtualTryOnModel:
             logger.error(f"Error preprocessing images: {e}")
             raise
     
+    def _forward(self, input_tensor: torch.Tensor) -> np.ndarray:
+        """Generator output (N, 3, H, W) in [-1, 1] on the configured backend"""
+        if self.session is not None:
+            return onnx_runtime.run(self.session, input_tensor.cpu().numpy())
+        with torch.no_grad():
+            return self.model(input_tensor).cpu().numpy()
+    
     def _create_pose_map(self, landmarks: List[Tuple[float, float]], 
                         image_size: Tuple[int, int]) -> np.ndarray:
         """Create pose map from landmarks"""
@@ -217,23 +318,24 @@ class VirtualTryOnModel:
             input_tensor = self.preprocess_images(person_image, clothing_image, pose_landmarks)
             
             # Generate result
-            with torch.no_grad():
-                output_tensor = self.model(input_tensor)
+            output = self._forward(input_tensor)
             
             # Post-process output
-            result_image = self._postprocess_output(output_tensor)
+            result_image = self._postprocess_output(output)
             
             # Calculate processing time
             processing_time = time.time() - start_time
             
             # Calculate confidence (simplified)
-            confidence = self._calculate_confidence(output_tensor)
+            confidence = self._calculate_confidence(output)
             
             metadata = {
                 "model_version": "1.0",
                 "input_size": person_image.shape[:2],
                 "output_size": result_image.shape[:2],
-                "device": str(self.device)
+                "device": str(self.device),
+                "backend": self.backend,
+                "quantization": self.quantization
             }
             
             return TryOnResult(
@@ -253,11 +355,13 @@ class VirtualTryOnModel:
                 metadata={"error": str(e)}
             )
     
-    def _postprocess_output(self, output_tensor: torch.Tensor) -> np.ndarray:
+    def _postprocess_output(self, output: Union[torch.Tensor, np.ndarray]) -> np.ndarray:
         """Post-process model output to image"""
         try:
-            # Convert tensor to numpy
-            output_np = output_tensor.squeeze(0).permute(1, 2, 0).cpu().numpy()
+            # Convert (1, C, H, W) output to an HWC array
+            if isinstance(output, torch.Tensor):
+                output = output.detach().cpu().numpy()
+            output_np = output[0].transpose(1, 2, 0)
             
             # Denormalize from [-1, 1] to [0, 255]
             output_denorm = ((output_np + 1.0) * 127.5).astype(np.uint8)
@@ -271,12 +375,14 @@ class VirtualTryOnModel:
             logger.error(f"Error post-processing output: {e}")
             raise
     
-    def _calculate_confidence(self, output_tensor: torch.Tensor) -> float:
+    def _calculate_confidence(self, output: Union[torch.Tensor, np.ndarray]) -> float:
         """Calculate confidence score for the generated result"""
         try:
             # Simple confidence calculation based on output variance
             # Higher variance might indicate more detailed/realistic output
-            variance = torch.var(output_tensor).item()
+            if isinstance(output, torch.Tensor):
+                output = output.detach().cpu().numpy()
+            variance = float(np.var(output, ddof=1))
             confidence = min(variance * 10, 1.0)  # Scale and clamp to [0, 1]
             return confidence
             
@@ -337,6 +443,7 @@ class VirtualTryOnModel:
     
     def cleanup(self):
         """Clean up resources"""
+        self.session = None
         if hasattr(self, 'model'):
             del self.model
         if torch.cuda.is_available():
@@ -3,7 +3,6 @@ User Profiling Model for Learning User Preferences and Style Patterns
 """
 
 import numpy as np
-import pandas as pd
 from typing import Dict, List, Tuple, Optional, Any
 import logging
 from dataclasses import dataclass
@@ -381,6 +380,37 @@ class UserProfiler:
             logger.error(f"Error generating style insights: {e}")
             return []
     
+    def generate_recommendations(self, user_id: int, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Profile-based recommendations as plain data
+        
+        Args:
+            user_id: User the recommendations are for
+            context: User interaction data, as for predict_user_profile
+            
+        Returns:
+            Predicted profile fields and style insights
+        """
+        user_data = {**(context or {}), 'user_id': user_id}
+        profile = self.predict_user_profile(user_data)
+        return {
+            'style_archetype': profile.style_archetype,
+            'color_preferences': profile.color_preferences,
+            'brand_preferences': profile.brand_preferences,
+            'price_range': list(profile.price_range),
+            'occasion_preferences': profile.occasion_preferences,
+            'confidence_score': profile.confidence_score,
+            'insights': [
+                {
+                    'type': insight.insight_type,
+                    'value': insight.value,
+                    'confidence': insight.confidence,
+                    'description': insight.description
+                }
+                for insight in self.generate_style_insights(user_data)
+            ]
+        }
+    
     def update_user_profile(self, user_profile: UserProfile, 
                           new_data: Dict[str, Any]) -> UserProfile:
         """
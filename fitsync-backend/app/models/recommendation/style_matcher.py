@@ -1,5 +1,5 @@
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from sklearn.metrics.pairwise import cosine_similarity
 
 class StyleMatcher:
@@ -48,6 +48,56 @@ class StyleMatcher:
         
         return style_scores
     
+    def get_style_recommendations(self, user_id: int, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Styles matching a user's clothing history (``context['clothing_history']``), best first"""
+        scores = self.analyze_user_style((context or {}).get('clothing_history') or [])
+        ranked = sorted((style for style, score in scores.items() if score > 0), key=scores.get, reverse=True)
+        return {
+            'user_id': user_id,
+            'styles': [
+                {'style': style, 'score': round(scores[style], 3), 'colors': self.style_profiles[style]['colors']}
+                for style in ranked
+            ]
+        }
+    
+    def classify_styles(self, palettes: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Classify several garments at once from their color palettes
+        
+        Each palette (a ColorPalette as a dict) scores against every style by
+        the share of its pixels whose color name is one of that style's
+        colors; all garments are scored with one matrix product. Garments
+        with no color matching any style get None.
+        """
+        if not palettes:
+            return []
+        styles = list(self.style_profiles)
+        names = sorted({name for palette in palettes for name in palette['color_names']})
+        column = {name: i for i, name in enumerate(names)}
+        
+        # Share of each garment's pixels per color name
+        shares = np.zeros((len(palettes), len(names)))
+        for row, palette in enumerate(palettes):
+            for name, percentage in zip(palette['color_names'], palette['percentages']):
+                shares[row, column[name]] += percentage / 100.0
+        membership = np.array(
+            [[name in self.style_profiles[style]['colors'] for style in styles] for name in names],
+            dtype=float
+        )
+        scores = shares @ membership
+        
+        classifications = []
+        for row in scores:
+            if row.max() <= 0:
+                classifications.append(None)
+                continue
+            best = int(row.argmax())
+            classifications.append({
+                'style': styles[best],
+                'confidence': round(float(row[best]), 3),
+                'scores': {style: round(float(score), 3) for style, score in zip(styles, row)}
+            })
+        return classifications
+    
     def _calculate_item_style_match(self, item: Dict, style_profile: Dict) -> float:
         """Calculate how well an item matches a style profile"""
         score = 0.0
@@ -2,7 +2,7 @@
 Trends and Fashion Data Models
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -151,6 +151,11 @@ class NearbyLocation(Base):
     
     # For events - expiry date
     expires_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Bounding-box prefilter for nearby queries (see SpatialIndex)
+    __table_args__ = (
+        Index("ix_nearby_locations_type_lat_lng", "location_type", "latitude", "longitude"),
+    )
 
 class TrendInsight(Base):
     """Fashion insights by category"""
@@ -0,0 +1,916 @@
+"""
+Cache backends - storage engines behind CacheService
+
+``InMemoryBackend`` keeps entries in a private per-process cache and is the
+default for development. ``RedisBackend`` talks to a shared Redis (or any
+Redis-compatible server) through an async connection pool so that every
+worker sees the same entries and invalidations. ``TieredBackend`` puts a
+short-lived in-process L1 in front of the shared L2 and keeps the L1 copies
+coherent through a pub/sub invalidation channel.
+"""
+
+import asyncio
+import base64
+import fnmatch
+import heapq
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Iterable, Optional, Dict, List, Set, Tuple
+
+# Try to import the async Redis client at module level
+try:
+    import redis.asyncio as aioredis  # type: ignore
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+def _namespace_of(key: str) -> str:
+    """Cache namespace is the key prefix before the first ':'"""
+    return key.split(":", 1)[0]
+
+# Marker for bytes values (e.g. pre-serialized responses) in JSON payloads
+_BYTES_KEY = "__bytes__"
+
+def _json_default(value: Any) -> Any:
+    """JSON fallback: bytes round-trip as base64, anything else as str"""
+    if isinstance(value, (bytes, bytearray)):
+        return {_BYTES_KEY: base64.b64encode(value).decode("ascii")}
+    return str(value)
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and _BYTES_KEY in obj:
+        return base64.b64decode(obj[_BYTES_KEY])
+    return obj
+
+def _estimate_size(key: str, value: Any) -> int:
+    """Approximate memory footprint of an entry in bytes"""
+    try:
+        payload = len(json.dumps(value, default=_json_default))
+    except Exception:
+        payload = sys.getsizeof(value)
+    # Key string plus fixed per-entry bookkeeping overhead
+    return payload + len(key) + 200
+
+class InMemoryCache:
+    """
+    Size-bounded in-process cache with LRU or LFU eviction.
+
+    Entries are evicted once either ``max_entries`` or the approximate
+    ``max_bytes`` budget is exceeded. Expired entries are dropped lazily on
+    read and proactively by ``sweep_expired``. Entries may carry tags (e.g.
+    ``user:42``) so ``invalidate_tags`` only touches the keys registered
+    under them.
+    """
+
+    EVICTION_POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        eviction_policy: str = "lru"
+    ):
+        if eviction_policy not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction_policy}'")
+        
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        
+        # Insertion/recency ordered; the LRU victim is always the first key
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # LFU bookkeeping: access frequency -> keys in that frequency (FIFO)
+        self._freq_buckets: Dict[int, "OrderedDict[str, None]"] = {}
+        self._min_freq = 0
+        # Min-heap of (expires_at, key) used by the sweeper
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # Secondary index: tag -> keys registered under it
+        self._tags: Dict[str, Set[str]] = {}
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        )
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            stats = self._stats[_namespace_of(key)]
+            item = self._cache.get(key)
+            if item is None:
+                stats['misses'] += 1
+                return None
+            
+            if time.monotonic() >= item['expires_at']:
+                self._remove(key)
+                stats['expirations'] += 1
+                stats['misses'] += 1
+                return None
+            
+            self._touch(key, item)
+            stats['hits'] += 1
+            return item['value']
+    
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int = 300,
+        tags: Optional[Iterable[str]] = None
+    ):
+        size = _estimate_size(key, value)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            
+            if size > self.max_bytes:
+                logger.warning(f"Cache entry '{key}' ({size} bytes) exceeds max_bytes; not cached")
+                return
+            
+            expires_at = time.monotonic() + ttl_seconds
+            self._cache[key] = {
+                'value': value,
+                'expires_at': expires_at,
+                'size': size,
+                'freq': 1,
+                'tags': tuple(tags or ())
+            }
+            for tag in self._cache[key]['tags']:
+                self._tags.setdefault(tag, set()).add(key)
+            self._total_bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            
+            if self.eviction_policy == "lfu":
+                self._freq_buckets.setdefault(1, OrderedDict())[key] = None
+                self._min_freq = 1
+            
+            self._enforce_limits()
+    
+    def delete(self, key: str) -> bool:
+        """Remove ``key``; whether it was present"""
+        with self._lock:
+            if key not in self._cache:
+                return False
+            self._remove(key)
+            return True
+    
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._freq_buckets.clear()
+            self._expiry_heap.clear()
+            self._tags.clear()
+            self._min_freq = 0
+            self._total_bytes = 0
+    
+    def keys(self) -> List[str]:
+        """Snapshot of the current keys (safe to iterate while mutating)"""
+        with self._lock:
+            return list(self._cache.keys())
+    
+    def invalidate_tags(self, *tags: str) -> List[str]:
+        """Delete every key registered under any of ``tags``"""
+        with self._lock:
+            keys: Set[str] = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            return list(keys)
+    
+    def sweep_expired(self) -> int:
+        """Remove every expired entry, returning how many were dropped"""
+        removed = 0
+        with self._lock:
+            now = time.monotonic()
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                item = self._cache.get(key)
+                # Heap entries of overwritten keys are stale; skip them
+                if item is None or item['expires_at'] != expires_at:
+                    continue
+                self._remove(key)
+                self._stats[_namespace_of(key)]['expirations'] += 1
+                removed += 1
+            
+            # Compact the heap when stale entries dominate
+            if len(self._expiry_heap) > 2 * len(self._cache) + 64:
+                self._expiry_heap = [
+                    (item['expires_at'], key) for key, item in self._cache.items()
+                ]
+                heapq.heapify(self._expiry_heap)
+        return removed
+    
+    def stats(self) -> Dict[str, Any]:
+        """Global and per-namespace counters, ratios and byte estimates"""
+        with self._lock:
+            now = time.monotonic()
+            namespaces: Dict[str, Dict[str, Any]] = {}
+            expired_keys = 0
+            
+            for key, item in self._cache.items():
+                ns = namespaces.setdefault(_namespace_of(key), {"keys": 0, "bytes": 0})
+                ns["keys"] += 1
+                ns["bytes"] += item['size']
+                if now >= item['expires_at']:
+                    expired_keys += 1
+            
+            totals = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+            for name, counters in self._stats.items():
+                ns = namespaces.setdefault(name, {"keys": 0, "bytes": 0})
+                ns.update(counters)
+                lookups = counters["hits"] + counters["misses"]
+                ns["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+                ns["miss_ratio"] = round(counters["misses"] / lookups, 4) if lookups else 0.0
+                for counter, count in counters.items():
+                    totals[counter] += count
+            
+            lookups = totals["hits"] + totals["misses"]
+            return {
+                "total_keys": len(self._cache),
+                "expired_keys": expired_keys,
+                "estimated_bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "eviction_policy": self.eviction_policy,
+                "tags": len(self._tags),
+                **totals,
+                "hit_ratio": round(totals["hits"] / lookups, 4) if lookups else 0.0,
+                "miss_ratio": round(totals["misses"] / lookups, 4) if lookups else 0.0,
+                "namespaces": namespaces
+            }
+    
+    def _touch(self, key: str, item: Dict[str, Any]):
+        """Record an access for the eviction policy"""
+        if self.eviction_policy == "lru":
+            self._cache.move_to_end(key)
+            return
+        
+        freq = item['freq']
+        bucket = self._freq_buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._freq_buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        item['freq'] = freq + 1
+        self._freq_buckets.setdefault(freq + 1, OrderedDict())[key] = None
+    
+    def _remove(self, key: str):
+        item = self._cache.pop(key)
+        self._total_bytes -= item['size']
+        for tag in item['tags']:
+            tagged = self._tags.get(tag)
+            if tagged is not None:
+                tagged.discard(key)
+                if not tagged:
+                    del self._tags[tag]
+        if self.eviction_policy == "lfu":
+            bucket = self._freq_buckets.get(item['freq'])
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self._freq_buckets[item['freq']]
+    
+    def _select_victim(self) -> str:
+        if self.eviction_policy == "lru":
+            return next(iter(self._cache))
+        
+        if self._min_freq not in self._freq_buckets:
+            self._min_freq = min(self._freq_buckets)
+        return next(iter(self._freq_buckets[self._min_freq]))
+    
+    def _over_limits(self) -> bool:
+        return len(self._cache) > self.max_entries or self._total_bytes > self.max_bytes
+    
+    def _enforce_limits(self):
+        if not self._over_limits():
+            return
+        
+        # Reclaim expired entries before evicting live ones
+        self.sweep_expired()
+        while self._cache and self._over_limits():
+            victim = self._select_victim()
+            self._remove(victim)
+            self._stats[_namespace_of(victim)]['evictions'] += 1
+
+class CacheBackend(ABC):
+    """Interface every cache backend implements (all operations are async)"""
+    
+    name: str = "abstract"
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None on miss/expiry"""
+    
+    @abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        """Store a value with a time-to-live, registered under ``tags``"""
+    
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Return the cached values for ``keys`` (misses are omitted)"""
+    
+    @abstractmethod
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        """Store several values sharing the same time-to-live and tags"""
+    
+    @abstractmethod
+    async def delete(self, *keys: str) -> int:
+        """Delete keys, returning how many existed"""
+    
+    @abstractmethod
+    async def invalidate_tags(self, *tags: str) -> List[str]:
+        """Delete every key registered under any of ``tags``, returning them"""
+    
+    @abstractmethod
+    async def keys(self, pattern: Optional[str] = None) -> List[str]:
+        """List keys, optionally filtered by a glob pattern"""
+    
+    @abstractmethod
+    async def clear(self):
+        """Remove every entry owned by this backend"""
+    
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Backend statistics"""
+    
+    async def sweep_expired(self) -> int:
+        """Proactively drop expired entries (no-op when the server expires them)"""
+        return 0
+    
+    async def start(self):
+        """Start background work (e.g. invalidation listeners)"""
+    
+    async def acquire_lock(self, name: str, ttl_seconds: float) -> Optional[str]:
+        """
+        Try to take a cross-process lock, returning a release token or None.
+        Per-process backends have nothing to coordinate with and always succeed.
+        """
+        return "local"
+    
+    async def release_lock(self, name: str, token: str):
+        """Release a lock taken with ``acquire_lock``"""
+    
+    async def is_locked(self, name: str) -> bool:
+        """Whether another process currently holds the lock"""
+        return False
+    
+    async def close(self):
+        """Release connections and other resources"""
+
+class InMemoryBackend(CacheBackend):
+    """Per-process backend wrapping ``InMemoryCache``"""
+    
+    name = "in_memory"
+    
+    def __init__(self, cache: Optional[InMemoryCache] = None, **cache_kwargs):
+        self.cache = cache or InMemoryCache(**cache_kwargs)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        self.cache.set(key, value, ttl_seconds, tags)
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = self.cache.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        for key, value in items.items():
+            self.cache.set(key, value, ttl_seconds, tags)
+    
+    async def delete(self, *keys: str) -> int:
+        return sum(self.cache.delete(key) for key in keys)
+    
+    async def invalidate_tags(self, *tags: str) -> List[str]:
+        return self.cache.invalidate_tags(*tags)
+    
+    async def keys(self, pattern: Optional[str] = None) -> List[str]:
+        keys = self.cache.keys()
+        if pattern is None:
+            return keys
+        return [key for key in keys if fnmatch.fnmatchcase(key, pattern)]
+    
+    async def clear(self):
+        self.cache.clear()
+    
+    async def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+    
+    async def sweep_expired(self) -> int:
+        return self.cache.sweep_expired()
+
+class RedisBackend(CacheBackend):
+    """
+    Shared backend for Redis-compatible servers.
+
+    Values are JSON encoded, TTLs are enforced server-side with ``SET EX`` and
+    multi-key operations are pipelined into a single round trip. All keys are
+    stored under ``key_prefix`` so ``clear`` never touches foreign data.
+    Tags are sorted sets of keys scored by their expiry, so each tagged
+    write drops members whose values have already expired; writing a tagged
+    value and registering its tags is a single atomic script call.
+    Scripts declare every key they touch; on Redis Cluster give
+    ``key_prefix`` a hash tag (e.g. ``{fitsync}:``) so they share a slot.
+    An already-constructed async client (e.g. ``fakeredis.aioredis.FakeRedis``)
+    can be injected for tests.
+    """
+    
+    name = "redis"
+    SCAN_BATCH = 500
+    # SET the value, add the key to each tag set scored by its expiry, prune
+    # members that expired, and extend the tag set TTL so it outlives them all
+    # KEYS: value key, tag keys... ARGV: payload, ttl, unprefixed key, now
+    SET_TAGGED_SCRIPT = """
+    local ttl = tonumber(ARGV[2])
+    local now = tonumber(ARGV[4])
+    redis.call("set", KEYS[1], ARGV[1], "EX", ttl)
+    for i = 2, #KEYS do
+        redis.call("zadd", KEYS[i], now + ttl, ARGV[3])
+        redis.call("zremrangebyscore", KEYS[i], "-inf", now)
+        if redis.call("ttl", KEYS[i]) < ttl then
+            redis.call("expire", KEYS[i], ttl)
+        end
+    end
+    return 1
+    """
+    # Delete the value keys read from the tag sets and remove them as members
+    # (members added since the read stay registered)
+    # KEYS: tag keys (ARGV[1] of them), value keys... ARGV: tag count, members...
+    INVALIDATE_TAGS_SCRIPT = """
+    local tag_count = tonumber(ARGV[1])
+    for i = tag_count + 1, #KEYS do
+        redis.call("del", KEYS[i])
+    end
+    for i = 1, tag_count do
+        for j = 2, #ARGV do
+            redis.call("zrem", KEYS[i], ARGV[j])
+        end
+    end
+    return 1
+    """
+    # Delete the lock only if we still own it
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+    
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379",
+        max_connections: int = 50,
+        key_prefix: str = "fitsync:",
+        socket_timeout: float = 1.0,
+        client: Optional[Any] = None
+    ):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package not installed; cannot use RedisBackend")
+            pool = aioredis.ConnectionPool.from_url(
+                url,
+                max_connections=max_connections,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout
+            )
+            client = aioredis.Redis(connection_pool=pool)
+        
+        self.client = client
+        self.url = url
+        self.key_prefix = key_prefix
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+    
+    def _k(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+    
+    def _tag_key(self, tag: str) -> str:
+        # Kept outside ``key_prefix`` so tag sets never show up in keys()/clear()
+        # (renamed from __tag__ when tag sets became sorted; old ones expire)
+        return f"__tags__:{self.key_prefix}{tag}"
+    
+    def _strip(self, raw_key: Any) -> str:
+        if isinstance(raw_key, bytes):
+            raw_key = raw_key.decode()
+        return raw_key[len(self.key_prefix):]
+    
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, default=_json_default).encode()
+    
+    @staticmethod
+    def _loads(raw: Optional[bytes]) -> Optional[Any]:
+        if raw is None:
+            return None
+        return json.loads(raw, object_hook=_json_object_hook)
+    
+    def _record(self, key: str, hit: bool):
+        self._counters[_namespace_of(key)]["hits" if hit else "misses"] += 1
+    
+    async def get(self, key: str) -> Optional[Any]:
+        value = self._loads(await self.client.get(self._k(key)))
+        self._record(key, value is not None)
+        return value
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        ttl = max(1, int(ttl_seconds))
+        if not tags:
+            await self.client.set(self._k(key), self._dumps(value), ex=ttl)
+            return
+        await self.client.eval(
+            self.SET_TAGGED_SCRIPT,
+            1 + len(tags),
+            self._k(key), *[self._tag_key(tag) for tag in tags],
+            self._dumps(value), ttl, key, time.time()
+        )
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        raw_values = await self.client.mget([self._k(key) for key in keys])
+        found = {}
+        for key, raw in zip(keys, raw_values):
+            self._record(key, raw is not None)
+            if raw is not None:
+                found[key] = self._loads(raw)
+        return found
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        if not items:
+            return
+        ttl = max(1, int(ttl_seconds))
+        tag_keys = [self._tag_key(tag) for tag in tags or []]
+        now = time.time()
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                if tag_keys:
+                    pipe.eval(
+                        self.SET_TAGGED_SCRIPT, 1 + len(tag_keys),
+                        self._k(key), *tag_keys, self._dumps(value), ttl, key, now
+                    )
+                else:
+                    pipe.set(self._k(key), self._dumps(value), ex=ttl)
+            await pipe.execute()
+    
+    async def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        return int(await self.client.delete(*[self._k(key) for key in keys]))
+    
+    async def invalidate_tags(self, *tags: str) -> List[str]:
+        if not tags:
+            return []
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        # Only members whose values have not expired yet
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.zrangebyscore(tag_key, time.time(), "+inf")
+            found = await pipe.execute()
+        members = list(dict.fromkeys(
+            m.decode() if isinstance(m, bytes) else m for tagged in found for m in tagged
+        ))
+        if not members:
+            return []
+        await self.client.eval(
+            self.INVALIDATE_TAGS_SCRIPT,
+            len(tag_keys) + len(members),
+            *tag_keys, *[self._k(member) for member in members],
+            len(tag_keys), *members
+        )
+        return members
+    
+    async def keys(self, pattern: Optional[str] = None) -> List[str]:
+        match = self._k(pattern or "*")
+        return [
+            self._strip(raw_key)
+            async for raw_key in self.client.scan_iter(match=match, count=self.SCAN_BATCH)
+        ]
+    
+    async def clear(self):
+        batch: List[Any] = []
+        async for raw_key in self.client.scan_iter(match=self._k("*"), count=self.SCAN_BATCH):
+            batch.append(raw_key)
+            if len(batch) >= self.SCAN_BATCH:
+                await self.client.delete(*batch)
+                batch = []
+        if batch:
+            await self.client.delete(*batch)
+    
+    def _lock_key(self, name: str) -> str:
+        # Kept outside ``key_prefix`` so locks never show up in keys()/clear()
+        return f"__lock__:{self.key_prefix}{name}"
+    
+    async def acquire_lock(self, name: str, ttl_seconds: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        acquired = await self.client.set(
+            self._lock_key(name), token, nx=True, px=max(1, int(ttl_seconds * 1000))
+        )
+        return token if acquired else None
+    
+    async def release_lock(self, name: str, token: str):
+        await self.client.eval(self.RELEASE_LOCK_SCRIPT, 1, self._lock_key(name), token)
+    
+    async def is_locked(self, name: str) -> bool:
+        return bool(await self.client.exists(self._lock_key(name)))
+    
+    async def stats(self) -> Dict[str, Any]:
+        namespaces: Dict[str, Dict[str, Any]] = {}
+        totals = {"hits": 0, "misses": 0}
+        for name, counters in self._counters.items():
+            lookups = counters["hits"] + counters["misses"]
+            namespaces[name] = {
+                **counters,
+                "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+                "miss_ratio": round(counters["misses"] / lookups, 4) if lookups else 0.0
+            }
+            totals["hits"] += counters["hits"]
+            totals["misses"] += counters["misses"]
+        
+        keys = await self.keys()
+        for key in keys:
+            ns = namespaces.setdefault(_namespace_of(key), {"hits": 0, "misses": 0})
+            ns["keys"] = ns.get("keys", 0) + 1
+        
+        server: Dict[str, Any] = {}
+        try:
+            memory = await self.client.info("memory")
+            server = {
+                "used_memory": memory.get("used_memory"),
+                "maxmemory_policy": memory.get("maxmemory_policy")
+            }
+        except Exception as e:
+            logger.debug(f"Could not read Redis INFO: {e}")
+        
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "total_keys": len(keys),
+            "expired_keys": 0,  # expired server-side
+            **totals,
+            "hit_ratio": round(totals["hits"] / lookups, 4) if lookups else 0.0,
+            "miss_ratio": round(totals["misses"] / lookups, 4) if lookups else 0.0,
+            "server": server,
+            "namespaces": namespaces
+        }
+    
+    async def close(self):
+        try:
+            await self.client.aclose()
+        except AttributeError:
+            await self.client.close()
+
+class TieredBackend(CacheBackend):
+    """
+    Read-through L1 (in-process) + L2 (shared) cache.
+
+    Reads are served from the L1 when possible and fall back to the L2, whose
+    values are then kept locally for at most ``l1_ttl`` seconds. Every write,
+    delete and clear is published on an invalidation channel so the other
+    workers drop their L1 copies; the short L1 TTL bounds staleness if a
+    message is ever missed.
+    """
+    
+    name = "tiered"
+    
+    def __init__(self, l1: InMemoryCache, l2: RedisBackend, l1_ttl: int = 5):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.channel = f"{l2.key_prefix}__invalidate__"
+        self.instance_id = uuid.uuid4().hex
+        # Bumped on every remote invalidation; guards L1 fills against races
+        self._epoch = 0
+        self._listener_task: Optional[asyncio.Task] = None
+    
+    def _fill_l1(self, key: str, value: Any, ttl_seconds: int):
+        self.l1.set(key, value, min(self.l1_ttl, ttl_seconds))
+    
+    async def _broadcast(self, keys: Optional[List[str]] = None):
+        message = {"origin": self.instance_id, "keys": keys, "all": keys is None}
+        try:
+            await self.l2.client.publish(self.channel, json.dumps(message))
+        except Exception as e:
+            logger.warning(f"Cache invalidation broadcast failed: {e}")
+    
+    def _apply_invalidation(self, raw: Any):
+        message = json.loads(raw)
+        if message.get("origin") == self.instance_id:
+            return
+        self._epoch += 1
+        if message.get("all"):
+            self.l1.clear()
+        else:
+            for key in message.get("keys") or []:
+                self.l1.delete(key)
+    
+    async def _listen(self):
+        while True:
+            pubsub = self.l2.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything published while we were not subscribed is lost
+                self._epoch += 1
+                self.l1.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.unsubscribe(self.channel)
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+    
+    async def start(self):
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen())
+    
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        
+        epoch = self._epoch
+        value = await self.l2.get(key)
+        if value is not None and epoch == self._epoch:
+            self._fill_l1(key, value, self.l1_ttl)
+        return value
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        await self.l2.set(key, value, ttl_seconds, tags)
+        self._fill_l1(key, value, ttl_seconds)
+        await self._broadcast([key])
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.l1.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        
+        if missing:
+            epoch = self._epoch
+            from_l2 = await self.l2.get_many(missing)
+            if epoch == self._epoch:
+                for key, value in from_l2.items():
+                    self._fill_l1(key, value, self.l1_ttl)
+            found.update(from_l2)
+        return found
+    
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
+    ):
+        await self.l2.set_many(items, ttl_seconds, tags)
+        for key, value in items.items():
+            self._fill_l1(key, value, ttl_seconds)
+        await self._broadcast(list(items))
+    
+    async def delete(self, *keys: str) -> int:
+        for key in keys:
+            self.l1.delete(key)
+        deleted = await self.l2.delete(*keys)
+        if keys:
+            await self._broadcast(list(keys))
+        return deleted
+    
+    async def invalidate_tags(self, *tags: str) -> List[str]:
+        # The L1 has no tags; drop exactly the keys the L2 reports removed
+        keys = await self.l2.invalidate_tags(*tags)
+        for key in keys:
+            self.l1.delete(key)
+        if keys:
+            await self._broadcast(keys)
+        return keys
+    
+    async def keys(self, pattern: Optional[str] = None) -> List[str]:
+        return await self.l2.keys(pattern)
+    
+    async def acquire_lock(self, name: str, ttl_seconds: float) -> Optional[str]:
+        return await self.l2.acquire_lock(name, ttl_seconds)
+    
+    async def release_lock(self, name: str, token: str):
+        await self.l2.release_lock(name, token)
+    
+    async def is_locked(self, name: str) -> bool:
+        return await self.l2.is_locked(name)
+    
+    async def clear(self):
+        self.l1.clear()
+        await self.l2.clear()
+        await self._broadcast(None)
+    
+    async def stats(self) -> Dict[str, Any]:
+        stats = await self.l2.stats()
+        stats["l1"] = self.l1.stats()
+        stats["l1_ttl"] = self.l1_ttl
+        return stats
+    
+    async def sweep_expired(self) -> int:
+        return self.l1.sweep_expired()
+    
+    async def close(self):
+        task = self._listener_task
+        self._listener_task = None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.l2.close()
+
+def create_cache_backend(settings: Any) -> CacheBackend:
+    """Build the backend selected by ``settings.cache_backend``"""
+    backend = getattr(settings, "cache_backend", "memory")
+    
+    if backend in ("redis", "tiered"):
+        try:
+            shared = RedisBackend(
+                url=settings.redis_url,
+                max_connections=settings.redis_max_connections,
+                key_prefix=settings.cache_key_prefix
+            )
+            if backend == "redis":
+                return shared
+            return TieredBackend(
+                l1=InMemoryCache(
+                    max_entries=settings.cache_l1_max_entries,
+                    max_bytes=settings.cache_max_bytes,
+                    eviction_policy=settings.cache_eviction_policy
+                ),
+                l2=shared,
+                l1_ttl=settings.cache_l1_ttl
+            )
+        except Exception as e:
+            logger.error(f"Redis cache backend unavailable, falling back to in-memory: {e}")
+    elif backend != "memory":
+        logger.warning(f"Unknown cache backend '{backend}', using in-memory")
+    
+    return InMemoryBackend(
+        max_entries=settings.cache_max_entries,
+        max_bytes=settings.cache_max_bytes,
+        eviction_policy=settings.cache_eviction_policy
+    )
@@ -2,44 +2,117 @@
 Cache Service - Redis-based caching for frequently accessed data
 """
 
+import asyncio
+import gzip
+import inspect
 import json
 import logging
-from typing import Any, Optional, Dict, List
-from datetime import datetime, timedelta
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional, Dict, List, Union
 import hashlib
 
-# For development, we'll use a simple in-memory cache
-# In production, replace with Redis
-class InMemoryCache:
-    def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-    
-    def get(self, key: str) -> Optional[Any]:
-        if key in self._cache:
-            item = self._cache[key]
-            if datetime.utcnow() < item['expires_at']:
-                return item['value']
-            else:
-                del self._cache[key]
-        return None
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from app.config import settings
+from app.services.cache_backends import (
+    CacheBackend, InMemoryBackend, InMemoryCache, RedisBackend, TieredBackend,
+    create_cache_backend
+)
+from app.utils.geo import covering_geohashes
+
+logger = logging.getLogger(__name__)
+
+# Global cache backend (in-memory by default; see CACHE_BACKEND)
+_cache: CacheBackend = create_cache_backend(settings)
+
+class CachedResponse:
+    """
+    A JSON response body encoded once, kept raw and gzip-compressed with a
+    strong ETag, so cache hits skip JSON serialization and compression.
+    """
+    
+    MEDIA_TYPE = "application/json"
+    # Marker for cache entries holding an encoded response
+    _RESPONSE_KEY = "__response__"
+    
+    def __init__(self, body: bytes, gzip_body: Optional[bytes], etag: str):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.etag = etag
+    
+    @classmethod
+    def encode(cls, content: Any) -> "CachedResponse":
+        """Encode ``content`` exactly as JSONResponse would, plus its gzip form"""
+        body = json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":")
+        ).encode("utf-8")
+        gzip_body = None
+        # Below the GZipMiddleware threshold responses go out uncompressed anyway
+        if len(body) >= settings.cache_response_gzip_min_size:
+            gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        return cls(body, gzip_body, etag)
     
-    def set(self, key: str, value: Any, ttl_seconds: int = 300):
-        self._cache[key] = {
-            'value': value,
-            'expires_at': datetime.utcnow() + timedelta(seconds=ttl_seconds)
+    def to_cache(self) -> Dict[str, Any]:
+        return {
+            self._RESPONSE_KEY: True,
+            "body": self.body,
+            "gzip": self.gzip_body,
+            "etag": self.etag
         }
     
-    def delete(self, key: str):
-        if key in self._cache:
-            del self._cache[key]
+    @classmethod
+    def from_cache(cls, entry: Dict[str, Any]) -> "CachedResponse":
+        return cls(entry["body"], entry.get("gzip"), entry["etag"])
     
-    def clear(self):
-        self._cache.clear()
-
-# Global cache instance
-_cache = InMemoryCache()
-
-logger = logging.getLogger(__name__)
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header names this response's ETag"""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            # If-None-Match uses weak comparison, so W/ prefixes still match
+            if candidate == "*" or candidate.removeprefix("W/") == self.etag:
+                return True
+        return False
+    
+    @staticmethod
+    def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+        """Whether an Accept-Encoding header allows gzip (q=0 is a refusal; gzip overrides *)"""
+        qualities: Dict[str, float] = {}
+        for entry in (accept_encoding or "").split(","):
+            coding, _, params = entry.partition(";")
+            coding = coding.strip().lower()
+            quality = 1.0
+            for param in params.split(";"):
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if coding:
+                qualities[coding] = quality
+        return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+    
+    def render(self, request: Request) -> Response:
+        """Build the HTTP response: 304, pre-compressed gzip or raw body"""
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        
+        if self.gzip_body is not None and self.accepts_gzip(request.headers.get("accept-encoding")):
+            # GZipMiddleware passes responses that already set Content-Encoding through
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=self.gzip_body, media_type=self.MEDIA_TYPE, headers=headers)
+        return Response(content=self.body, media_type=self.MEDIA_TYPE, headers=headers)
 
 class CacheService:
     """Service for caching frequently accessed data"""
@@ -54,8 +127,28 @@ class CacheService:
         'trending_now': 600,  # 10 minutes
         'outfit_recommendations': 60,  # 1 minute - personalized, short cache
         'nearby_data': 180,  # 3 minutes - location-based, needs freshness
+        'nearby_map': 180,  # 3 minutes - combined map payload
+    }
+    
+    # Hard TTL values (in seconds) for get_or_compute(). CACHE_TTL is the soft
+    # TTL: past it a stale value is still served while it is refreshed in the
+    # background, until the hard TTL removes the entry. Namespaces not listed
+    # here expire at their soft TTL.
+    CACHE_HARD_TTL = {
+        'categories': 7200,
+        'trending_styles': 1800,
+        'fashion_insights': 3600,
+        'influencer_spotlight': 3600,
+        'explore_items': 900,
+        'trending_now': 1800,
     }
     
+    # Marker for entries stored by get_or_compute() with refresh metadata
+    _ENVELOPE_KEY = "__swr__"
+    
+    # Geohash length used for geo invalidation tags (~39km x 20km cells)
+    GEO_TAG_PRECISION = 4
+    
     @staticmethod
     def _generate_cache_key(prefix: str, **kwargs) -> str:
         """Generate a cache key from prefix and parameters"""
@@ -75,193 +168,290 @@ class CacheService:
         return key_string
     
     @staticmethod
-    def get_categories() -> Optional[List[str]]:
-        """Get cached categories"""
-        try:
-            key = CacheService._generate_cache_key("categories")
-            return _cache.get(key)
-        except Exception as e:
-            logger.error(f"Cache get error for categories: {e}")
-            return None
+    def _tags_for(key: str, tags: Optional[List[str]] = None) -> List[str]:
+        """Every entry is tagged with its namespace, plus any extra tags"""
+        return [f"namespace:{key.split(':', 1)[0]}", *(tags or [])]
     
     @staticmethod
-    def set_categories(categories: List[str]):
-        """Cache categories"""
-        try:
-            key = CacheService._generate_cache_key("categories")
-            _cache.set(key, categories, CacheService.CACHE_TTL['categories'])
-        except Exception as e:
-            logger.error(f"Cache set error for categories: {e}")
+    def _geo_cells(lat: float, lng: float, radius_km: float) -> List[str]:
+        """Geohash cells (GEO_TAG_PRECISION chars) overlapped by a circle"""
+        return covering_geohashes(lat, lng, radius_km, CacheService.GEO_TAG_PRECISION)
     
     @staticmethod
-    def get_trending_styles(limit: int = 10) -> Optional[List[Dict[str, Any]]]:
-        """Get cached trending styles"""
-        try:
-            key = CacheService._generate_cache_key("trending_styles", limit=limit)
-            return _cache.get(key)
-        except Exception as e:
-            logger.error(f"Cache get error for trending styles: {e}")
-            return None
+    def nearby_tags(lat: float, lng: float, radius_km: float) -> List[str]:
+        """Tags for a cached nearby payload, so invalidate_location_cache() reaches it"""
+        return [f"geo:{cell}" for cell in CacheService._geo_cells(lat, lng, radius_km)]
     
     @staticmethod
-    def set_trending_styles(styles: List[Dict[str, Any]], limit: int = 10):
-        """Cache trending styles"""
-        try:
-            key = CacheService._generate_cache_key("trending_styles", limit=limit)
-            _cache.set(key, styles, CacheService.CACHE_TTL['trending_styles'])
-        except Exception as e:
-            logger.error(f"Cache set error for trending styles: {e}")
+    def _geo_tags(lat: float, lng: float, radius_km: float) -> List[str]:
+        """
+        Tags that invalidate every geo-tagged entry overlapping a circle.
+        
+        Entries are tagged with the geohash of the area they cover (cells of
+        any length, or GEO_TAG_PRECISION cells for per-query entries). Every
+        prefix of the finest covering cells is emitted, so an entry is hit
+        exactly when its cell intersects the circle.
+        """
+        precision = max(settings.cache_nearby_precision, CacheService.GEO_TAG_PRECISION)
+        tags = set()
+        for cell in covering_geohashes(lat, lng, radius_km, precision):
+            tags.update(f"geo:{cell[:length]}" for length in range(1, len(cell) + 1))
+        return sorted(tags)
     
     @staticmethod
-    def get_explore_items(
-        category: Optional[str] = None,
-        trending: Optional[bool] = None,
-        limit: int = 20,
-        offset: int = 0
-    ) -> Optional[Dict[str, Any]]:
-        """Get cached explore items"""
+    async def get(key: str) -> Optional[Any]:
+        """Get a cache entry by key"""
         try:
-            key = CacheService._generate_cache_key(
-                "explore_items", 
-                category=category, 
-                trending=trending, 
-                limit=limit, 
-                offset=offset
-            )
-            return _cache.get(key)
+            return CacheService._unwrap(await _cache.get(key))
         except Exception as e:
-            logger.error(f"Cache get error for explore items: {e}")
+            logger.error(f"Cache get error for {key}: {e}")
             return None
     
     @staticmethod
-    def set_explore_items(
-        data: Dict[str, Any],
-        category: Optional[str] = None,
-        trending: Optional[bool] = None,
-        limit: int = 20,
-        offset: int = 0
+    async def set(
+        key: str,
+        value: Any,
+        ttl_seconds: int = 300,
+        tags: Optional[List[str]] = None
     ):
-        """Cache explore items"""
+        """Set a cache entry by key, tagged with its namespace plus ``tags``"""
         try:
-            key = CacheService._generate_cache_key(
-                "explore_items", 
-                category=category, 
-                trending=trending, 
-                limit=limit, 
-                offset=offset
-            )
-            _cache.set(key, data, CacheService.CACHE_TTL['explore_items'])
+            await _cache.set(key, value, ttl_seconds, CacheService._tags_for(key, tags))
         except Exception as e:
-            logger.error(f"Cache set error for explore items: {e}")
+            logger.error(f"Cache set error for {key}: {e}")
+    
+    # Single-flight state: one shared computation per key in this process
+    _inflight: Dict[str, asyncio.Task] = {}
+    _single_flight_stats: Dict[str, int] = {
+        "computations": 0, "coalesced": 0, "remote_waits": 0,
+        "stale_served": 0, "early_refreshes": 0
+    }
     
     @staticmethod
-    def get_trending_now(
-        scope: str = "global",
-        timeframe: str = "week",
-        limit: int = 10
-    ) -> Optional[List[Dict[str, Any]]]:
-        """Get cached trending now data"""
-        try:
-            key = CacheService._generate_cache_key(
-                "trending_now", 
-                scope=scope, 
-                timeframe=timeframe, 
-                limit=limit
-            )
-            return _cache.get(key)
-        except Exception as e:
-            logger.error(f"Cache get error for trending now: {e}")
-            return None
+    def _unwrap(entry: Any) -> Any:
+        """Strip the get_or_compute() envelope from a stored entry"""
+        if isinstance(entry, dict) and entry.get(CacheService._ENVELOPE_KEY):
+            return entry["value"]
+        return entry
     
     @staticmethod
-    def set_trending_now(
-        data: List[Dict[str, Any]],
-        scope: str = "global",
-        timeframe: str = "week",
-        limit: int = 10
-    ):
-        """Cache trending now data"""
-        try:
-            key = CacheService._generate_cache_key(
-                "trending_now", 
-                scope=scope, 
-                timeframe=timeframe, 
-                limit=limit
+    async def get_or_compute(
+        namespace: str,
+        compute: Callable[[], Union[Any, Awaitable[Any]]],
+        ttl_seconds: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        serialize: bool = False,
+        **key_params
+    ) -> Any:
+        """
+        Return the cached value for ``namespace`` + ``key_params`` or compute it once.
+
+        Concurrent misses for the same key share a single call to ``compute``
+        (sync or async). With a shared backend a cross-process lock makes the
+        other workers wait for the leader's result instead of recomputing it.
+
+        Past the soft TTL (``CACHE_TTL``) and before the hard TTL
+        (``CACHE_HARD_TTL``) the stale value is returned immediately and a
+        background refresh is scheduled. With ``cache_xfetch_beta`` > 0 a
+        refresh may also start early, with a probability that grows as the
+        soft expiry approaches (XFetch), so refreshes are spread out.
+        The entry is tagged with its namespace plus ``tags``.
+        ``compute`` must therefore not depend on request-scoped resources.
+
+        With ``serialize`` the computed value is stored as an encoded response
+        body and a ``CachedResponse`` is returned instead of the value.
+        """
+        if serialize:
+            key_params["fmt"] = "body"
+            compute = CacheService._encoded(compute)
+            value = await CacheService.get_or_compute(
+                namespace, compute, ttl_seconds, tags, **key_params
             )
-            _cache.set(key, data, CacheService.CACHE_TTL['trending_now'])
+            return CachedResponse.from_cache(value)
+        
+        key = CacheService._generate_cache_key(namespace, **key_params)
+        soft_ttl = ttl_seconds or CacheService.CACHE_TTL.get(namespace, settings.cache_ttl)
+        hard_ttl = max(soft_ttl, CacheService.CACHE_HARD_TTL.get(namespace, soft_ttl))
+        
+        try:
+            entry = await _cache.get(key)
         except Exception as e:
-            logger.error(f"Cache set error for trending now: {e}")
+            logger.error(f"Cache get error for {key}: {e}")
+            entry = None
+        
+        if entry is not None:
+            if CacheService._needs_refresh(entry):
+                if key not in CacheService._inflight:
+                    CacheService._start_flight(key, compute, soft_ttl, hard_ttl, tags)
+            return CacheService._unwrap(entry)
+        
+        task = CacheService._inflight.get(key)
+        if task is None:
+            task = CacheService._start_flight(key, compute, soft_ttl, hard_ttl, tags)
+        else:
+            CacheService._single_flight_stats["coalesced"] += 1
+        
+        # Shield so a cancelled request does not cancel the shared computation
+        return await asyncio.shield(task)
     
     @staticmethod
-    def get_fashion_insights(
-        scope: str = "global",
-        timeframe: str = "week"
-    ) -> Optional[List[Dict[str, Any]]]:
-        """Get cached fashion insights"""
-        try:
-            key = CacheService._generate_cache_key(
-                "fashion_insights", 
-                scope=scope, 
-                timeframe=timeframe
-            )
-            return _cache.get(key)
-        except Exception as e:
-            logger.error(f"Cache get error for fashion insights: {e}")
-            return None
+    def _encoded(
+        compute: Callable[[], Union[Any, Awaitable[Any]]]
+    ) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        """Wrap ``compute`` so its result is stored as an encoded response"""
+        async def encode() -> Dict[str, Any]:
+            value = compute()
+            if inspect.isawaitable(value):
+                value = await value
+            return CachedResponse.encode(value).to_cache()
+        return encode
     
     @staticmethod
-    def set_fashion_insights(
-        data: List[Dict[str, Any]],
-        scope: str = "global",
-        timeframe: str = "week"
-    ):
-        """Cache fashion insights"""
-        try:
-            key = CacheService._generate_cache_key(
-                "fashion_insights", 
-                scope=scope, 
-                timeframe=timeframe
+    async def cached_response(
+        request: Request,
+        namespace: str,
+        compute: Callable[[], Union[Any, Awaitable[Any]]],
+        ttl_seconds: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        **key_params
+    ) -> Response:
+        """
+        get_or_compute() for an endpoint whose whole JSON body is ``compute()``.
+
+        With cache_serialized_responses the pre-encoded body is served as-is
+        (gzip when accepted) with an ETag, answering If-None-Match with 304.
+        """
+        if settings.cache_serialized_responses:
+            cached = await CacheService.get_or_compute(
+                namespace, compute, ttl_seconds, tags, serialize=True, **key_params
             )
-            _cache.set(key, data, CacheService.CACHE_TTL['fashion_insights'])
-        except Exception as e:
-            logger.error(f"Cache set error for fashion insights: {e}")
+            return cached.render(request)
+        
+        content = await CacheService.get_or_compute(namespace, compute, ttl_seconds, tags, **key_params)
+        return JSONResponse(content=content)
+
+    @staticmethod
+    async def warm_response(
+        namespace: str,
+        compute: Callable[[], Union[Any, Awaitable[Any]]],
+        ttl_seconds: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        **key_params
+    ):
+        """Fill the entry cached_response() serves for ``namespace`` + ``key_params``"""
+        await CacheService.get_or_compute(
+            namespace, compute, ttl_seconds, tags,
+            serialize=settings.cache_serialized_responses, **key_params
+        )
+
+    @staticmethod
+    def _needs_refresh(entry: Any) -> bool:
+        """Whether a cached entry is stale, or due for an XFetch early refresh"""
+        if not (isinstance(entry, dict) and entry.get(CacheService._ENVELOPE_KEY)):
+            return False
+        
+        now = time.time()
+        soft_expires_at = entry["soft_expires_at"]
+        if now >= soft_expires_at:
+            CacheService._single_flight_stats["stale_served"] += 1
+            return True
+        
+        beta = settings.cache_xfetch_beta
+        delta = entry.get("delta") or 0.0
+        if beta > 0 and delta > 0:
+            # -log(U) is exponentially distributed, so slow computations and
+            # entries close to expiry are refreshed early more often
+            if now - delta * beta * math.log(1.0 - random.random()) >= soft_expires_at:
+                CacheService._single_flight_stats["early_refreshes"] += 1
+                return True
+        return False
     
     @staticmethod
-    def get_influencer_spotlight(
-        scope: str = "global",
-        limit: int = 10
-    ) -> Optional[List[Dict[str, Any]]]:
-        """Get cached influencer spotlight"""
-        try:
-            key = CacheService._generate_cache_key(
-                "influencer_spotlight", 
-                scope=scope, 
-                limit=limit
-            )
-            return _cache.get(key)
-        except Exception as e:
-            logger.error(f"Cache get error for influencer spotlight: {e}")
-            return None
+    def _start_flight(
+        key: str,
+        compute: Callable[[], Union[Any, Awaitable[Any]]],
+        soft_ttl: int,
+        hard_ttl: int,
+        tags: Optional[List[str]] = None
+    ) -> asyncio.Task:
+        task = asyncio.ensure_future(
+            CacheService._compute_and_store(key, compute, soft_ttl, hard_ttl, tags)
+        )
+        CacheService._inflight[key] = task
+        task.add_done_callback(lambda t, k=key: CacheService._finish_flight(k, t))
+        return task
     
     @staticmethod
-    def set_influencer_spotlight(
-        data: List[Dict[str, Any]],
-        scope: str = "global",
-        limit: int = 10
-    ):
-        """Cache influencer spotlight"""
+    def _finish_flight(key: str, task: asyncio.Task):
+        if CacheService._inflight.get(key) is task:
+            del CacheService._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Cache computation failed for {key}: {task.exception()}")
+    
+    @staticmethod
+    async def _compute_and_store(
+        key: str,
+        compute: Callable[[], Union[Any, Awaitable[Any]]],
+        soft_ttl: int,
+        hard_ttl: int,
+        tags: Optional[List[str]] = None
+    ) -> Any:
+        token = None
         try:
-            key = CacheService._generate_cache_key(
-                "influencer_spotlight", 
-                scope=scope, 
-                limit=limit
-            )
-            _cache.set(key, data, CacheService.CACHE_TTL['influencer_spotlight'])
+            token = await _cache.acquire_lock(key, settings.cache_lock_ttl)
         except Exception as e:
-            logger.error(f"Cache set error for influencer spotlight: {e}")
+            logger.error(f"Cache lock error for {key}: {e}")
+        
+        if token is None:
+            # Another process is computing this key; wait for its result
+            CacheService._single_flight_stats["remote_waits"] += 1
+            value = await CacheService._wait_for_remote(key)
+            if value is not None:
+                return value
+        
+        try:
+            CacheService._single_flight_stats["computations"] += 1
+            started = time.monotonic()
+            value = compute()
+            if inspect.isawaitable(value):
+                value = await value
+            envelope = {
+                CacheService._ENVELOPE_KEY: True,
+                "value": value,
+                "soft_expires_at": time.time() + soft_ttl,
+                "delta": time.monotonic() - started
+            }
+            await CacheService.set(key, envelope, hard_ttl, tags)
+            return value
+        finally:
+            if token is not None:
+                try:
+                    await _cache.release_lock(key, token)
+                except Exception as e:
+                    logger.error(f"Cache unlock error for {key}: {e}")
+    
+    @staticmethod
+    async def _wait_for_remote(key: str) -> Optional[Any]:
+        """Poll for a value another process is computing; None if it gave up"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.cache_lock_wait
+        while loop.time() < deadline:
+            await asyncio.sleep(0.05)
+            value = await CacheService.get(key)
+            if value is not None:
+                return value
+            try:
+                if not await _cache.is_locked(key):
+                    return await CacheService.get(key)
+            except Exception as e:
+                logger.error(f"Cache lock check error for {key}: {e}")
+                return None
+        logger.warning(f"Timed out waiting for another worker to compute {key}")
+        return None
     
     @staticmethod
-    def get_outfit_recommendations(
+    async def get_outfit_recommendations(
         user_id: int,
         context_hash: Optional[str] = None,
         limit: int = 10
@@ -274,13 +464,13 @@ class CacheService:
                 context=context_hash,
                 limit=limit
             )
-            return _cache.get(key)
+            return CacheService._unwrap(await _cache.get(key))
         except Exception as e:
             logger.error(f"Cache get error for outfit recommendations: {e}")
             return None
     
     @staticmethod
-    def set_outfit_recommendations(
+    async def set_outfit_recommendations(
         user_id: int,
         data: Dict[str, Any],
         context_hash: Optional[str] = None,
@@ -294,12 +484,15 @@ class CacheService:
                 context=context_hash,
                 limit=limit
             )
-            _cache.set(key, data, CacheService.CACHE_TTL['outfit_recommendations'])
+            await CacheService.set(
+                key, data, CacheService.CACHE_TTL['outfit_recommendations'],
+                tags=[f"user:{user_id}"]
+            )
         except Exception as e:
             logger.error(f"Cache set error for outfit recommendations: {e}")
     
     @staticmethod
-    def get_nearby_data(
+    async def get_nearby_data(
         data_type: str,  # people, events, hotspots, map
         lat: float,
         lng: float,
@@ -321,13 +514,13 @@ class CacheService:
                 limit=limit,
                 **kwargs
             )
-            return _cache.get(key)
+            return CacheService._unwrap(await _cache.get(key))
         except Exception as e:
             logger.error(f"Cache get error for nearby {data_type}: {e}")
             return None
     
     @staticmethod
-    def set_nearby_data(
+    async def set_nearby_data(
         data_type: str,
         data: Any,
         lat: float,
@@ -350,78 +543,158 @@ class CacheService:
                 limit=limit,
                 **kwargs
             )
-            _cache.set(key, data, CacheService.CACHE_TTL['nearby_data'])
+            await CacheService.set(
+                key, data, CacheService.CACHE_TTL['nearby_data'],
+                tags=CacheService.nearby_tags(lat, lng, radius_km)
+            )
         except Exception as e:
             logger.error(f"Cache set error for nearby {data_type}: {e}")
     
     @staticmethod
-    def invalidate_user_cache(user_id: int):
+    async def get_nearby_cells(data_type: str, cells: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get cached per-geohash-cell location records, keyed by cell (misses omitted)"""
+        try:
+            keys = {
+                CacheService._generate_cache_key(f"nearby_cell_{data_type}", cell=cell): cell
+                for cell in cells
+            }
+            found = await _cache.get_many(list(keys))
+            return {keys[key]: records for key, records in found.items()}
+        except Exception as e:
+            logger.error(f"Cache get error for nearby {data_type} cells: {e}")
+            return {}
+    
+    @staticmethod
+    async def set_nearby_cells(data_type: str, cell_records: Dict[str, List[Dict[str, Any]]]):
+        """
+        Cache location records per geohash cell.
+        
+        Each cell is tagged with its own geohash, so invalidate_location_cache()
+        drops only the cells that intersect the changed area.
+        """
+        try:
+            for cell, records in cell_records.items():
+                await CacheService.set(
+                    CacheService._generate_cache_key(f"nearby_cell_{data_type}", cell=cell),
+                    records, CacheService.CACHE_TTL['nearby_data'],
+                    tags=[f"geo:{cell}"]
+                )
+        except Exception as e:
+            logger.error(f"Cache set error for nearby {data_type} cells: {e}")
+    
+    @staticmethod
+    async def invalidate_user_cache(user_id: int):
         """Invalidate all cache entries for a specific user"""
         try:
-            # This is a simplified version for in-memory cache
-            # In Redis, you'd use pattern matching to delete keys
-            keys_to_delete = []
-            for key in _cache._cache.keys():
-                if f"user_id:{user_id}" in key:
-                    keys_to_delete.append(key)
+            keys_to_delete = await _cache.invalidate_tags(f"user:{user_id}")
             
-            for key in keys_to_delete:
-                _cache.delete(key)
-                
             logger.info(f"Invalidated {len(keys_to_delete)} cache entries for user {user_id}")
         except Exception as e:
             logger.error(f"Error invalidating user cache: {e}")
     
     @staticmethod
-    def invalidate_location_cache(lat: float, lng: float, radius_km: float = 10.0):
-        """Invalidate location-based cache entries near the given coordinates"""
+    async def invalidate_location_cache(lat: float, lng: float, radius_km: float = 10.0):
+        """Invalidate location-based cache entries whose area overlaps the given circle"""
         try:
-            # Simplified for in-memory cache
-            keys_to_delete = []
-            lat_rounded = round(lat, 3)
-            lng_rounded = round(lng, 3)
-            
-            for key in _cache._cache.keys():
-                if key.startswith("nearby_") and f"lat:{lat_rounded}" in key and f"lng:{lng_rounded}" in key:
-                    keys_to_delete.append(key)
+            keys_to_delete = await _cache.invalidate_tags(
+                *CacheService._geo_tags(lat, lng, radius_km)
+            )
             
-            for key in keys_to_delete:
-                _cache.delete(key)
-                
             logger.info(f"Invalidated {len(keys_to_delete)} location cache entries")
         except Exception as e:
             logger.error(f"Error invalidating location cache: {e}")
     
     @staticmethod
-    def clear_all_cache():
+    async def invalidate_namespace(namespace: str) -> int:
+        """Invalidate every cache entry in a namespace (e.g. 'explore_items')"""
+        try:
+            keys_to_delete = await _cache.invalidate_tags(f"namespace:{namespace}")
+            logger.info(f"Invalidated {len(keys_to_delete)} cache entries in {namespace}")
+            return len(keys_to_delete)
+        except Exception as e:
+            logger.error(f"Error invalidating namespace {namespace}: {e}")
+            return 0
+    
+    @staticmethod
+    async def clear_all_cache():
         """Clear all cache entries (use with caution)"""
         try:
-            _cache.clear()
+            await _cache.clear()
             logger.info("Cleared all cache entries")
         except Exception as e:
             logger.error(f"Error clearing cache: {e}")
     
     @staticmethod
-    def get_cache_stats() -> Dict[str, Any]:
+    async def get_cache_stats() -> Dict[str, Any]:
         """Get cache statistics"""
         try:
-            total_keys = len(_cache._cache)
-            expired_keys = 0
-            now = datetime.utcnow()
-            
-            for item in _cache._cache.values():
-                if now >= item['expires_at']:
-                    expired_keys += 1
-            
+            stats = await _cache.stats()
             return {
-                "total_keys": total_keys,
-                "active_keys": total_keys - expired_keys,
-                "expired_keys": expired_keys,
-                "cache_type": "in_memory"
+                "total_keys": stats["total_keys"],
+                "active_keys": stats["total_keys"] - stats["expired_keys"],
+                "cache_type": _cache.name,
+                **stats,
+                "single_flight": {
+                    **CacheService._single_flight_stats,
+                    "in_flight": len(CacheService._inflight)
+                }
             }
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
             return {"error": str(e)}
+    
+    # Background sweeper task (one per process)
+    _sweeper_task: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    async def _sweep_loop(interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                removed = await _cache.sweep_expired()
+                if removed:
+                    logger.debug(f"Cache sweeper removed {removed} expired entries")
+            except Exception as e:
+                logger.error(f"Cache sweeper error: {e}")
+    
+    @staticmethod
+    def start_sweeper(interval_seconds: Optional[float] = None):
+        """Start the background task that proactively drops expired entries"""
+        if CacheService._sweeper_task and not CacheService._sweeper_task.done():
+            return
+        interval = interval_seconds or settings.cache_sweep_interval
+        CacheService._sweeper_task = asyncio.create_task(CacheService._sweep_loop(interval))
+        logger.info(f"Cache sweeper started (every {interval}s)")
+    
+    @staticmethod
+    async def start():
+        """Start backend background work (invalidation listener) and the sweeper"""
+        try:
+            await _cache.start()
+        except Exception as e:
+            logger.error(f"Error starting cache backend: {e}")
+        CacheService.start_sweeper()
+    
+    @staticmethod
+    async def close():
+        """Stop background work and release backend connections"""
+        await CacheService.stop_sweeper()
+        try:
+            await _cache.close()
+        except Exception as e:
+            logger.error(f"Error closing cache backend: {e}")
+    
+    @staticmethod
+    async def stop_sweeper():
+        """Stop the background sweeper task"""
+        task = CacheService._sweeper_task
+        CacheService._sweeper_task = None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
 # Utility function to generate context hash
 def hash_context(context: Dict[str, Any]) -> str:
@@ -3,16 +3,22 @@ Enhanced ML Service with model manager integration
 """
 
 import asyncio
+import copy
 import logging
+import time
+from dataclasses import asdict
 from typing import Dict, Any, List, Optional
 import numpy as np
-from PIL import Image
-import io
 
 from app.services.ml_model_manager import ml_model_manager, get_ml_model
+from app.services.inference_executor import inference_executor
+from app.services.ml_worker_pool import ml_worker_pool
+from app.services.prediction_cache import PredictionCache, prediction_cache
+from app.services.near_duplicate_index import near_duplicate_index
+from app.config import settings
 from app.utils.image_processing import ImageProcessor
 from app.utils.color_analysis import ColorAnalyzer
-from app.core.exceptions import MLModelError
+from app.core.exceptions import MLModelError, InferenceCapacityError, InferenceTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +27,9 @@ class EnhancedMLService:
     
     def __init__(self):
         self.image_processor = ImageProcessor()
-        self.color_analyzer = ColorAnalyzer()
+        self.color_analyzer = ColorAnalyzer(
+            engine=settings.color_palette_engine, sample_size=settings.color_palette_sample_size
+        )
         self._initialized = False
     
     async def initialize(self):
@@ -36,69 +44,214 @@ class EnhancedMLService:
         await self.initialize()
         
         try:
-            # Process image
-            image = self.image_processor.process_upload(image_data)
-            image = self.image_processor.resize_image(image)
-            
-            # Detect clothing items
-            async with get_ml_model("clothing_detector") as detector:
-                detections = detector.detect_clothing(image)
-            
-            # Analyze each detection
-            analyzed_items = []
-            for detection in detections:
-                item_analysis = await self._analyze_clothing_item(image, detection)
-                analyzed_items.append(item_analysis)
-            
-            # Generate overall analysis
-            overall_analysis = self._generate_overall_analysis(analyzed_items)
-            
-            return {
-                'items': analyzed_items,
-                'item_count': len(analyzed_items),
-                'overall_analysis': overall_analysis,
-                'status': 'success'
-            }
+            # Re-uploads of the same photo reuse the stored analysis
+            version = PredictionCache.version(settings.clothing_detection_model)
+            timings: Dict[str, float] = {}
+            started = time.perf_counter()
+            result = await prediction_cache.get_or_compute(
+                "clothing_analysis",
+                version,
+                PredictionCache.hash_bytes(image_data),
+                lambda: self._analyze_clothing(image_data, user_id, version, timings),
+                user_id=user_id,
+                cache_if=self._is_complete_analysis
+            )
+            if settings.debug:
+                # Stages that ran for this call; the stored result is shared, so attach to a copy
+                result = {**result, 'metadata': {
+                    'timings_ms': {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+                    'total_ms': round((time.perf_counter() - started) * 1000, 2),
+                    'cached': 'detection' not in timings
+                }}
+            return result
             
+        except (InferenceCapacityError, InferenceTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Clothing analysis failed: {e}")
             raise MLModelError("clothing_analysis", "analysis_failed", {"error": str(e)})
     
-    async def _analyze_clothing_item(self, image: np.ndarray, detection: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze a single clothing item"""
-        try:
-            # Extract clothing region
-            bbox = detection['bbox']
-            clothing_region = image[bbox[1]:bbox[3], bbox[0]:bbox[2]]
-            
-            # Color analysis
-            color_palette = self.color_analyzer.extract_palette(clothing_region)
-            color_harmony = self.color_analyzer.analyze_color_harmony(color_palette.colors)
-            
-            # Style classification (if model is available)
-            style_classification = None
-            if await ml_model_manager.is_model_ready("style_matcher"):
+    @staticmethod
+    def _is_complete_analysis(result: Dict[str, Any]) -> bool:
+        """Only results from a working detector with every item analyzed are worth reusing"""
+        detector = ml_model_manager.status.get("clothing_detector", {})
+        return detector.get("status") == "ready" and not any('error' in item for item in result['items'])
+    
+    async def _analyze_clothing(self, image_data: bytes, user_id: Optional[int], version: str,
+                                timings: Dict[str, float]) -> Dict[str, Any]:
+        """Clothing analysis of one upload not found in the exact-hash cache; seconds per stage go to ``timings``"""
+        # Process image
+        started = time.perf_counter()
+        image, image_hash = await inference_executor.run(
+            self._decode_and_fingerprint, image_data, task="decode_image"
+        )
+        timings['decode'] = time.perf_counter() - started
+        
+        # A re-encoded or resized copy of a recent upload reuses its analysis
+        near_duplicates = user_id is not None and settings.ml_near_duplicate_enabled
+        aspect = image.shape[1] / image.shape[0]
+        index_version = f"{version}/{settings.ml_perceptual_hash}"
+        if near_duplicates:
+            match = near_duplicate_index.find(user_id, "clothing_analysis", index_version, image_hash, aspect)
+            if match:
+                distance, (width, result) = match
+                logger.info(f"Reusing clothing analysis of a near-duplicate upload ({distance} bits apart)")
+                return self._rescale_analysis(result, image.shape[1] / width)
+        
+        # Detect clothing items (micro-batched with concurrent requests)
+        started = time.perf_counter()
+        detections = await ml_model_manager.detect_clothing(image)
+        timings['detection'] = time.perf_counter() - started
+        
+        # Analyze all detections together, stage by stage
+        analyzed_items = await self._analyze_clothing_items(image, detections, timings)
+        
+        # Generate overall analysis
+        started = time.perf_counter()
+        overall_analysis = self._generate_overall_analysis(analyzed_items)
+        timings['overall_analysis'] = time.perf_counter() - started
+        
+        result = {
+            'items': analyzed_items,
+            'item_count': len(analyzed_items),
+            'overall_analysis': overall_analysis,
+            'status': 'success'
+        }
+        if near_duplicates and self._is_complete_analysis(result):
+            near_duplicate_index.add(
+                user_id, "clothing_analysis", index_version, image_hash, aspect, (image.shape[1], result)
+            )
+        return result
+    
+    @staticmethod
+    def _rescale_analysis(result: Dict[str, Any], scale: float) -> Dict[str, Any]:
+        """Copy of an analysis with item boxes scaled to a different image size"""
+        if abs(scale - 1.0) < 1e-3:
+            return result
+        result = copy.deepcopy(result)
+        for item in result['items']:
+            item['bbox'] = [int(round(v * scale)) for v in item['bbox']]
+        return result
+    
+    def _decode_and_resize(self, image_data: bytes) -> np.ndarray:
+        """Decode an upload and scale it down for analysis (blocking)"""
+        image = self.image_processor.process_upload(image_data)
+        return self.image_processor.resize_image(image)
+    
+    def _decode_and_fingerprint(self, image_data: bytes):
+        """Decoded, resized image and its perceptual hash (blocking)"""
+        image = self._decode_and_resize(image_data)
+        return image, self.image_processor.perceptual_hash(image, settings.ml_perceptual_hash)
+    
+    def _analyze_colors(self, region: np.ndarray):
+        """Palette and harmony of an image region (blocking)"""
+        color_palette = self.color_analyzer.extract_palette(region)
+        return color_palette, self.color_analyzer.analyze_color_harmony(color_palette.colors)
+    
+    async def _color_analysis(self, region: np.ndarray) -> Dict[str, Any]:
+        """
+        Palette and harmony of a region as plain dicts, memoized by pixel content.
+
+        Kept in memory only: the whole-image clothing_analysis entry already
+        persists exact repeats, so a database row per crop is rarely read.
+        """
+        async def compute():
+            # On the process pool when enabled
+            if ml_worker_pool.enabled:
+                color_palette, color_harmony = await ml_worker_pool.run("color_analysis", region)
+            else:
+                # One executor call per region, so each gets its own slot and timeout
+                color_palette, color_harmony = await inference_executor.run(
+                    self._analyze_colors, region, task="color_palette"
+                )
+            return {'color_palette': asdict(color_palette), 'color_harmony': asdict(color_harmony)}
+        
+        return await prediction_cache.get_or_compute(
+            "color_palette",
+            PredictionCache.version(self.color_analyzer.version),
+            PredictionCache.hash_array(region),
+            compute,
+            persist=False
+        )
+    
+    @staticmethod
+    def _crop_detections(image: np.ndarray, detections: List[Dict[str, Any]]) -> List[Optional[np.ndarray]]:
+        """Region of every detection with its box clipped to the image; None where nothing is left"""
+        height, width = image.shape[:2]
+        boxes = np.array([detection['bbox'] for detection in detections], dtype=np.int64).reshape(-1, 4)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+        return [
+            image[y1:y2, x1:x2] if x2 > x1 and y2 > y1 else None
+            for x1, y1, x2, y2 in boxes.tolist()
+        ]
+    
+    async def _analyze_clothing_items(self, image: np.ndarray, detections: List[Dict[str, Any]],
+                                      timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        Analyze all detected items stage by stage: crop every box, extract
+        every palette concurrently, then classify every style in one call.
+        An item whose stage fails carries an error instead of failing the others.
+        """
+        started = time.perf_counter()
+        regions = self._crop_detections(image, detections)
+        timings['crop'] = time.perf_counter() - started
+        
+        # Color analysis; cache misses run concurrently on the inference executor (or the process pool)
+        started = time.perf_counter()
+        colors = await asyncio.gather(
+            *(self._color_analysis(region) for region in regions if region is not None),
+            return_exceptions=True
+        )
+        colors_iter = iter(colors)
+        results: List[Any] = [
+            next(colors_iter) if region is not None else ValueError("empty detection box")
+            for region in regions
+        ]
+        timings['color_palette'] = time.perf_counter() - started
+        for result in results:
+            if isinstance(result, (InferenceCapacityError, InferenceTimeoutError)):
+                raise result
+        
+        # Style classification (loads the style matcher on first use; skipped if it cannot load)
+        analyzed = [i for i, result in enumerate(results) if not isinstance(result, BaseException)]
+        styles: Dict[int, Any] = {}
+        if analyzed and await self._model_available("style_matcher"):
+            started = time.perf_counter()
+            try:
                 async with get_ml_model("style_matcher") as style_model:
-                    style_classification = style_model.classify_style(clothing_region)
-            
-            return {
+                    classifications = await inference_executor.run(
+                        style_model.classify_styles, [results[i]['color_palette'] for i in analyzed],
+                        task="style_classification"
+                    )
+                styles = dict(zip(analyzed, classifications))
+            except (InferenceCapacityError, InferenceTimeoutError):
+                raise
+            except Exception as e:
+                logger.error(f"Style classification failed: {e}")
+            timings['style_classification'] = time.perf_counter() - started
+        
+        items = []
+        for i, (detection, result) in enumerate(zip(detections, results)):
+            if isinstance(result, BaseException):
+                logger.error(f"Item analysis failed: {result}")
+                items.append({
+                    'type': detection['class'],
+                    'confidence': detection['confidence'],
+                    'bbox': detection['bbox'],
+                    'error': str(result)
+                })
+                continue
+            items.append({
                 'type': detection['class'],
                 'confidence': detection['confidence'],
                 'bbox': detection['bbox'],
-                'color_palette': color_palette.dict(),
-                'color_harmony': color_harmony.dict(),
-                'style_classification': style_classification,
+                'color_palette': result['color_palette'],
+                'color_harmony': result['color_harmony'],
+                'style_classification': styles.get(i),
                 'features': detection.get('features', {})
-            }
-            
-        except Exception as e:
-            logger.error(f"Item analysis failed: {e}")
-            return {
-                'type': detection['class'],
-                'confidence': detection['confidence'],
-                'bbox': detection['bbox'],
-                'error': str(e)
-            }
+            })
+        return items
     
     def _generate_overall_analysis(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate overall analysis from individual items"""
@@ -122,65 +275,103 @@ class EnhancedMLService:
                 style_distribution[style] = style_distribution.get(style, 0) + 1
         
         return {
-            'overall_color_harmony': overall_harmony.dict() if overall_harmony else None,
+            'overall_color_harmony': asdict(overall_harmony) if overall_harmony else None,
             'style_distribution': style_distribution,
             'total_items': len(items),
             'confidence_avg': sum(item.get('confidence', 0) for item in items) / len(items)
         }
     
-    async def estimate_body_pose(self, image_data: bytes) -> Dict[str, Any]:
+    async def estimate_body_pose(self, image_data: bytes, user_id: Optional[int] = None) -> Dict[str, Any]:
         """Estimate body pose and measurements"""
         await self.initialize()
         
-        try:
-            image = self.image_processor.process_upload(image_data)
+        async def compute():
+            image = await inference_executor.run(
+                self.image_processor.process_upload, image_data, task="decode_image"
+            )
             
             async with get_ml_model("pose_estimator") as pose_model:
-                pose_landmarks = pose_model.estimate_pose(image)
-                
-                if pose_landmarks:
-                    measurements = pose_model.calculate_body_measurements(
-                        pose_landmarks, image.shape[0], image.shape[1]
-                    )
-                    body_type = pose_model.get_body_type(measurements)
-                    
-                    return {
-                        'pose_landmarks': pose_landmarks,
-                        'measurements': measurements.dict(),
-                        'body_type': body_type,
-                        'status': 'success'
-                    }
-                else:
-                    return {
-                        'status': 'error',
-                        'message': 'No pose detected in image'
-                    }
+                return await inference_executor.run(
+                    self._estimate_pose, pose_model, image, task="pose_estimation"
+                )
+        
+        try:
+            return await prediction_cache.get_or_compute(
+                "pose_estimation",
+                PredictionCache.version(settings.pose_estimation_model),
+                PredictionCache.hash_bytes(image_data),
+                compute,
+                user_id=user_id
+            )
                     
+        except (InferenceCapacityError, InferenceTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Pose estimation failed: {e}")
             raise MLModelError("pose_estimation", "estimation_failed", {"error": str(e)})
     
+    @staticmethod
+    def _estimate_pose(pose_model, image: np.ndarray) -> Dict[str, Any]:
+        """Pose landmarks, measurements and body type for one image (blocking)"""
+        pose_landmarks = pose_model.estimate_pose(image)
+        
+        if pose_landmarks:
+            measurements = pose_model.calculate_body_measurements(
+                pose_landmarks, image.shape[0], image.shape[1]
+            )
+            body_type = pose_model.get_body_type(measurements)
+            
+            return {
+                'pose_landmarks': asdict(pose_landmarks),
+                'measurements': asdict(measurements),
+                'body_type': body_type,
+                'status': 'success'
+            }
+        else:
+            return {
+                'status': 'error',
+                'message': 'No pose detected in image'
+            }
+    
     async def generate_virtual_tryon(self, person_image: bytes, clothing_image: bytes) -> Dict[str, Any]:
         """Generate virtual try-on visualization"""
         await self.initialize()
         
         try:
-            person_img = self.image_processor.process_upload(person_image)
-            clothing_img = self.image_processor.process_upload(clothing_image)
+            person_img = await inference_executor.run(
+                self.image_processor.process_upload, person_image, task="decode_image"
+            )
+            clothing_img = await inference_executor.run(
+                self.image_processor.process_upload, clothing_image, task="decode_image"
+            )
             
             async with get_ml_model("virtual_tryon") as tryon_model:
-                result = tryon_model.generate_tryon(person_img, clothing_img)
+                result = await inference_executor.run(
+                    tryon_model.generate_tryon, person_img, clothing_img, task="virtual_tryon"
+                )
                 
                 return {
-                    'tryon_image': result.tryon_image.tolist(),
+                    'tryon_image': result.result_image.tolist(),
                     'confidence': result.confidence,
                     'status': 'success'
                 }
                 
+        except (InferenceCapacityError, InferenceTimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Virtual try-on failed: {e}")
             raise MLModelError("virtual_tryon", "generation_failed", {"error": str(e)})
     
+    @staticmethod
+    async def _model_available(model_name: str) -> bool:
+        """Load ``model_name`` if needed; False (logged) when it cannot be loaded"""
+        try:
+            await ml_model_manager.load(model_name)
+            return True
+        except Exception as e:
+            logger.warning(f"{model_name} unavailable: {e}")
+            return False
+    
     async def get_user_recommendations(self, user_id: int, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Get personalized recommendations for user"""
         await self.initialize()
@@ -188,14 +379,14 @@ class EnhancedMLService:
         try:
             recommendations = {}
             
-            # Style recommendations
-            if await ml_model_manager.is_model_ready("style_matcher"):
+            # Style recommendations (models load on first use)
+            if await self._model_available("style_matcher"):
                 async with get_ml_model("style_matcher") as style_model:
                     style_recs = style_model.get_style_recommendations(user_id, context)
                     recommendations['style'] = style_recs
             
             # User profiling recommendations
-            if await ml_model_manager.is_model_ready("user_profiler"):
+            if await self._model_available("user_profiler"):
                 async with get_ml_model("user_profiler") as profiler:
                     profile_recs = profiler.generate_recommendations(user_id, context)
                     recommendations['profile'] = profile_recs
@@ -211,7 +402,13 @@ class EnhancedMLService:
     
     async def get_model_status(self) -> Dict[str, Any]:
         """Get status of all ML models"""
-        return await ml_model_manager.get_model_status()
+        status = await ml_model_manager.get_model_status()
+        return {
+            **status,
+            'worker_pool': ml_worker_pool.stats(),
+            'prediction_cache': prediction_cache.stats(),
+            'near_duplicates': near_duplicate_index.stats()
+        }
 
 # Global instance
 enhanced_ml_service = EnhancedMLService()
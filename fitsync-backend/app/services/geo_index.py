@@ -0,0 +1,207 @@
+"""
+Geo Index - in-process uniform grid over point locations, split by type
+"""
+
+import heapq
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.utils.geo import bounding_box, haversine_km_many, nearest_within
+
+class GridEntry(NamedTuple):
+    """A location held by the index; ``expires_at`` is a UNIX timestamp or None"""
+    location_type: str
+    latitude: float
+    longitude: float
+    expires_at: Optional[float]
+    payload: Any
+
+class GridIndex:
+    """
+    Uniform lat/lng grid of point locations, one grid per location type.
+
+    Each cell holds the ids of the entries whose point falls inside it, so a
+    radius query only visits the cells overlapping the radius's bounding box.
+    Entries with an expiry are dropped once it passes, lazily from an expiry
+    heap at the start of every query, so they are never returned late. All
+    methods are thread-safe; ``replace`` swaps in a full rebuild atomically.
+    """
+
+    def __init__(self, cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        self._lock = threading.RLock()
+        # Changes recorded while a replace() is in progress, replayed after the swap
+        self._journal: Optional[List[Tuple[int, Optional[GridEntry]]]] = None
+        self._entries: Dict[int, GridEntry] = {}
+        self._cells: Dict[str, Dict[Tuple[int, int], Set[int]]] = {}
+        self._counts: Dict[str, int] = {}
+        # (expires_at, id) pairs; stale pairs are skipped when popped
+        self._expiries: List[Tuple[float, int]] = []
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def _add(self, entry_id: int, entry: GridEntry):
+        self._entries[entry_id] = entry
+        cells = self._cells.setdefault(entry.location_type, {})
+        cells.setdefault(self._cell(entry.latitude, entry.longitude), set()).add(entry_id)
+        self._counts[entry.location_type] = self._counts.get(entry.location_type, 0) + 1
+        if entry.expires_at is not None:
+            heapq.heappush(self._expiries, (entry.expires_at, entry_id))
+
+    def _discard(self, entry_id: int) -> bool:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return False
+        cells = self._cells[entry.location_type]
+        key = self._cell(entry.latitude, entry.longitude)
+        members = cells.get(key)
+        if members is not None:
+            members.discard(entry_id)
+            if not members:
+                del cells[key]
+        self._counts[entry.location_type] -= 1
+        return True
+
+    def _purge_expired(self, now: float) -> int:
+        purged = 0
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, entry_id = heapq.heappop(self._expiries)
+            entry = self._entries.get(entry_id)
+            # Skip pairs left behind by an update that changed or cleared the expiry
+            if entry is not None and entry.expires_at == expires_at:
+                self._discard(entry_id)
+                purged += 1
+        return purged
+
+    def upsert(self, entry_id: int, entry: GridEntry) -> bool:
+        """Insert or move an entry; returns False (and drops it) if already expired"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((entry_id, entry))
+            self._discard(entry_id)
+            if entry.expires_at is not None and entry.expires_at <= time.time():
+                return False
+            self._add(entry_id, entry)
+            return True
+
+    def remove(self, entry_id: int) -> bool:
+        """Remove an entry; returns whether it was present"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((entry_id, None))
+            return self._discard(entry_id)
+
+    def replace(self, entries: Iterable[Tuple[int, GridEntry]]):
+        """
+        Replace the whole index with ``entries``, built aside and swapped under the lock.
+
+        Upserts and removals made while ``entries`` is being consumed are
+        replayed on top of it, so a rebuild never loses a concurrent change.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            staged = GridIndex(self.cell_deg)
+            now = time.time()
+            for entry_id, entry in entries:
+                if entry.expires_at is None or entry.expires_at > now:
+                    staged._add(entry_id, entry)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._entries = staged._entries
+            self._cells = staged._cells
+            self._counts = staged._counts
+            self._expiries = staged._expiries
+            now = time.time()
+            for entry_id, entry in journal:
+                self._discard(entry_id)
+                if entry is not None and (entry.expires_at is None or entry.expires_at > now):
+                    self._add(entry_id, entry)
+
+    def purge_expired(self) -> int:
+        """Drop every entry whose expiry has passed; returns how many were dropped"""
+        with self._lock:
+            return self._purge_expired(time.time())
+
+    def nearest(
+        self,
+        location_type: str,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        limit: int
+    ) -> List[Tuple[float, Any]]:
+        """Closest ``limit`` payloads of a type within ``radius_km`` as (distance_km, payload)"""
+        return self.nearest_by_type({location_type: limit}, lat, lng, radius_km)[location_type]
+
+    def nearest_by_type(
+        self,
+        limits: Dict[str, int],
+        lat: float,
+        lng: float,
+        radius_km: float
+    ) -> Dict[str, List[Tuple[float, Any]]]:
+        """
+        Closest payloads of several types in one pass, keyed by type.
+
+        Candidates of every type in ``limits`` are gathered from the same cell
+        range and measured with a single distance computation; each type then
+        keeps its own closest ``limits[type]``.
+        """
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        (row_lo, col_lo), (row_hi, col_hi) = self._cell(min_lat, min_lng), self._cell(max_lat, max_lng)
+        span = (row_hi - row_lo + 1) * (col_hi - col_lo + 1)
+
+        candidates: List[GridEntry] = []
+        bounds = [0]
+        with self._lock:
+            self._purge_expired(time.time())
+            for location_type in limits:
+                cells = self._cells.get(location_type, {})
+                # Visit the overlapping cells, or every occupied cell when that is fewer
+                if span <= len(cells):
+                    keys = [
+                        (row, col)
+                        for row in range(row_lo, row_hi + 1)
+                        for col in range(col_lo, col_hi + 1)
+                        if (row, col) in cells
+                    ]
+                else:
+                    keys = [
+                        key for key in cells
+                        if row_lo <= key[0] <= row_hi and col_lo <= key[1] <= col_hi
+                    ]
+                candidates.extend(self._entries[entry_id] for key in keys for entry_id in cells[key])
+                bounds.append(len(candidates))
+
+        results: Dict[str, List[Tuple[float, Any]]] = {location_type: [] for location_type in limits}
+        if not candidates:
+            return results
+        distances = haversine_km_many(
+            lat, lng,
+            [entry.latitude for entry in candidates],
+            [entry.longitude for entry in candidates]
+        )
+        # Candidates are grouped by type, so each type selects from its own slice
+        for (location_type, limit), start, end in zip(limits.items(), bounds, bounds[1:]):
+            results[location_type] = [
+                (float(distances[start + i]), candidates[start + i].payload)
+                for i in nearest_within(distances[start:end], radius_km, limit)
+            ]
+        return results
+
+    def sizes(self) -> Dict[str, int]:
+        """Number of indexed entries per location type"""
+        with self._lock:
+            return dict(self._counts)
+
+    def __len__(self) -> int:
+        return len(self._entries)
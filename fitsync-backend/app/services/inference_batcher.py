@@ -0,0 +1,148 @@
+"""
+Inference Batcher - async micro-batching in front of batch-capable models
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Gauge, Histogram
+
+from app.config import settings
+from app.services.inference_executor import inference_executor
+
+logger = logging.getLogger(__name__)
+
+ML_BATCH_SIZE = Histogram(
+    "ml_batch_size", "Items per batched forward pass", ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+ML_BATCH_QUEUE_DEPTH = Gauge(
+    "ml_batch_queue_depth", "Requests waiting for the next batch", ["model"]
+)
+ML_BATCH_WAIT_SECONDS = Histogram(
+    "ml_batch_wait_seconds", "Time a request waits before its batch starts", ["model"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests into batches for one model.
+
+    A batch is dispatched once ``max_batch_size`` items are queued or
+    ``max_wait_ms`` has passed since its first item, whichever comes first.
+    ``batch_fn`` is a blocking callable taking a list of items and returning
+    one result per item in the same order; it runs on the inference pool and
+    each awaiting request receives its own result (or the batch's error).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size or settings.batch_size)
+        self.max_wait = (settings.ml_batch_max_wait_ms if max_wait_ms is None else max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stats = {"requests": 0, "batches": 0, "max_batch": 0, "errors": 0}
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        # Created lazily so the queue and task belong to the running loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        return self._queue
+
+    async def submit(self, item: Any) -> Any:
+        """Queue ``item`` for the next batch and wait for its result"""
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((item, future, time.perf_counter()))
+        self._stats["requests"] += 1
+        ML_BATCH_QUEUE_DEPTH.labels(model=self.name).set(queue.qsize())
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[Any, asyncio.Future, float]]:
+        batch = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = await self._collect(queue)
+            ML_BATCH_QUEUE_DEPTH.labels(model=self.name).set(queue.qsize())
+
+            # Requests cancelled while queued don't need a slot in the batch
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, queued_at in batch:
+                ML_BATCH_WAIT_SECONDS.labels(model=self.name).observe(started - queued_at)
+            ML_BATCH_SIZE.labels(model=self.name).observe(len(batch))
+            self._stats["batches"] += 1
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+
+            items = [item for item, _, _ in batch]
+            try:
+                # One batch takes one slot on the bounded inference pool
+                results = await inference_executor.run(self.batch_fn, items, task=self.name)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} inputs")
+            except Exception as e:
+                logger.error(f"Batched inference failed for {self.name}: {e}")
+                self._stats["errors"] += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Request/batch counters and current queue depth"""
+        requests, batches = self._stats["requests"], self._stats["batches"]
+        return {
+            **self._stats,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "avg_batch": round(requests / batches, 2) if batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+    async def close(self):
+        """Stop the worker; requests still queued fail with CancelledError"""
+        worker, self._worker = self._worker, None
+        if worker and not worker.done():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        if self._queue:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
@@ -0,0 +1,153 @@
+"""
+Inference Executor - bounded worker pool that keeps blocking ML calls off the event loop
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import settings
+from app.core.exceptions import InferenceCapacityError, InferenceTimeoutError
+
+logger = logging.getLogger(__name__)
+
+ML_INFERENCE_RUNNING = Gauge("ml_inference_running", "ML calls currently executing")
+ML_INFERENCE_QUEUED = Gauge("ml_inference_queued", "ML calls waiting for a free inference slot")
+ML_INFERENCE_REJECTED = Counter("ml_inference_rejected_total", "ML calls rejected because the queue was full", ["task"])
+ML_INFERENCE_TIMEOUTS = Counter("ml_inference_timeouts_total", "ML calls that exceeded their timeout", ["task"])
+ML_INFERENCE_SECONDS = Histogram(
+    "ml_inference_seconds", "Execution time of ML calls on the inference pool", ["task"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+class InferenceExecutor:
+    """
+    Runs blocking inference (YOLO, MediaPipe, KMeans, torch) on a dedicated pool.
+
+    At most ``max_concurrent`` calls execute at once and at most ``max_queue``
+    more wait for a slot; anything beyond that is rejected immediately with
+    InferenceCapacityError (HTTP 503) rather than piling up. A call that
+    exceeds its timeout raises InferenceTimeoutError to the caller, but keeps
+    its slot until the worker thread actually finishes, so a slow model can
+    never oversubscribe the pool.
+
+    The pool is thread-based: the heavy parts of these libraries run in
+    native code that releases the GIL.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.max_concurrent = max(1, max_concurrent or settings.max_concurrent_requests)
+        self.max_queue = settings.ml_queue_size if max_queue is None else max_queue
+        self.timeout = settings.ml_inference_timeout if timeout is None else timeout
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running = 0
+        self._waiting = 0
+        self._stats = {"completed": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+
+    def _ensure_started(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_concurrent, thread_name_prefix="inference"
+            )
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+    async def _acquire(self, task: str):
+        if self._slots.locked():
+            if self._waiting >= self.max_queue:
+                self._stats["rejected"] += 1
+                ML_INFERENCE_REJECTED.labels(task=task).inc()
+                raise InferenceCapacityError(task, {
+                    "running": self._running, "queued": self._waiting
+                })
+        self._waiting += 1
+        ML_INFERENCE_QUEUED.set(self._waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+            ML_INFERENCE_QUEUED.set(self._waiting)
+        self._running += 1
+        ML_INFERENCE_RUNNING.set(self._running)
+
+    def _release(self, task: str, started: float, future: asyncio.Future):
+        self._running -= 1
+        ML_INFERENCE_RUNNING.set(self._running)
+        self._slots.release()
+        ML_INFERENCE_SECONDS.labels(task=task).observe(time.perf_counter() - started)
+        if future.cancelled() or future.exception() is not None:
+            self._stats["errors"] += 1
+        else:
+            self._stats["completed"] += 1
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        task: Optional[str] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` on the pool and return its result.
+
+        ``task`` names the call in metrics and errors. ``timeout`` overrides
+        ``ml_inference_timeout`` (0 or None there means no timeout).
+        """
+        self._ensure_started()
+        task = task or getattr(fn, "__name__", "inference")
+        timeout = self.timeout if timeout is None else timeout
+
+        await self._acquire(task)
+        started = time.perf_counter()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._pool, functools.partial(fn, *args, **kwargs)
+            )
+        except Exception:
+            self._running -= 1
+            ML_INFERENCE_RUNNING.set(self._running)
+            self._slots.release()
+            raise
+        # The slot is returned when the work finishes, not when the caller stops waiting
+        future.add_done_callback(functools.partial(self._release, task, started))
+
+        try:
+            # Shield so a timeout or a cancelled request doesn't orphan the slot
+            return await asyncio.wait_for(asyncio.shield(future), timeout or None)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            ML_INFERENCE_TIMEOUTS.labels(task=task).inc()
+            raise InferenceTimeoutError(task, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool limits, current load and call counters"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "running": self._running,
+            "queued": self._waiting,
+            **self._stats
+        }
+
+    def shutdown(self):
+        """Stop accepting work; running calls finish in the background"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._slots = None
+
+# Global instance
+inference_executor = InferenceExecutor()
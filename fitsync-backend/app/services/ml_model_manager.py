@@ -1,22 +1,172 @@
 # app/services/ml_model_manager.py
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import hashlib
 import logging
-from typing import Dict, Any
+import os
+import resource
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Gauge
 
 from app.config import settings
-from app.models.detection.clothing_detector import ClothingDetector
+from app.services.inference_batcher import MicroBatcher
 
 logger = logging.getLogger(__name__)
 
+ML_MODEL_LOAD_SECONDS = Gauge(
+    "ml_model_load_seconds", "Seconds the current version of a model took to load and warm up", ["model"]
+)
+ML_MODEL_MEMORY_BYTES = Gauge(
+    "ml_model_memory_bytes", "Resident memory added by loading the current version of a model", ["model"]
+)
+ML_MODEL_IN_FLIGHT = Gauge(
+    "ml_model_in_flight", "Requests currently using a model (all loaded versions)", ["model"]
+)
+
+@dataclass
+class ModelSpec:
+    """How to build, warm up and describe one model"""
+    name: str
+    # Builds the model; runs on the event loop, so blocking work belongs in a thread
+    load: Callable[[], Awaitable[Any]]
+    # Version string of what ``load`` would build right now (weights file, backend, ...)
+    version: Callable[[], str]
+    # Blocking representative inference, so the first request doesn't pay for lazy allocation
+    warmup: Optional[Callable[[Any], Any]] = None
+    # Blocking batch function for a MicroBatcher in front of the model
+    batch: Optional[Callable[[Any], Callable[[List[Any]], List[Any]]]] = None
+    # Extra status fields (device, backend, ...); may override "status", e.g. "disabled"
+    describe: Optional[Callable[[Any], Dict[str, Any]]] = None
+    # Whether the model may be built before workers fork and shared copy-on-write
+    # (no threads or native sessions); ``prepare_shared`` then does any lazy weight
+    # rewrites, such as layer fusion, up front so workers never copy those pages
+    shareable: Callable[[], bool] = lambda: False
+    prepare_shared: Optional[Callable[[Any], Any]] = None
+
+def _rss_bytes() -> int:
+    """Current resident set size (peak on platforms without /proc)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def file_version(path: Optional[str], *suffixes: str) -> str:
+    """Model file name plus a short content hash, so replaced weights show up as a new version"""
+    name = os.path.basename(path) if path else "builtin"
+    if path and os.path.isfile(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        name = f"{name}@{digest.hexdigest()[:12]}"
+    return "+".join([name, *[suffix for suffix in suffixes if suffix]])
+
+class LoadedModel:
+    """One loaded version of a model and the requests currently using it"""
+
+    def __init__(self, spec: ModelSpec, model: Any, version: str, load_time: float,
+                 warmup_time: float, memory_bytes: int):
+        self.spec = spec
+        self.model = model
+        self.version = version
+        self.load_time = load_time
+        self.warmup_time = warmup_time
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+        self.batcher = MicroBatcher(spec.name, spec.batch(model)) if spec.batch else None
+        # Built by the pre-fork master and shared with the other workers
+        self.shared = False
+        self.in_flight = 0
+        self.retired = False
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def acquire(self):
+        self.in_flight += 1
+        self._drained.clear()
+        ML_MODEL_IN_FLIGHT.labels(model=self.spec.name).inc()
+
+    def release(self):
+        self.in_flight -= 1
+        ML_MODEL_IN_FLIGHT.labels(model=self.spec.name).dec()
+        if self.in_flight == 0:
+            self._drained.set()
+
+    async def retire(self, timeout: float):
+        """Wait up to ``timeout`` seconds for in-flight requests, then free the model"""
+        self.retired = True
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"{self.spec.name} {self.version}: {self.in_flight} requests still running "
+                f"after {timeout}s; releasing the old version anyway"
+            )
+        await self.close()
+
+    async def close(self):
+        if self.batcher is not None:
+            await self.batcher.close()
+        cleanup = getattr(self.model, "cleanup", None)
+        if callable(cleanup):
+            try:
+                cleanup()
+            except Exception as e:
+                logger.warning(f"Cleanup of {self.spec.name} {self.version} failed: {e}")
+
+    def info(self) -> Dict[str, Any]:
+        info = {
+            "status": "ready",
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_time": round(self.load_time, 3),
+            "warmup_time": round(self.warmup_time, 3),
+            "memory_bytes": self.memory_bytes,
+            "in_flight": self.in_flight,
+            "shared": self.shared,
+        }
+        if self.spec.describe:
+            info.update(self.spec.describe(self.model))
+        if self.batcher is not None:
+            info["batching"] = self.batcher.stats()
+        return info
+
 class MLModelManager:
+    """
+    Registry of ML models, loaded on first use or eagerly at startup.
+
+    Each model is registered as a ModelSpec. ``lease(name)`` loads it if
+    needed (once, however many requests arrive together) and keeps it
+    marked in use for the duration. ``reload`` builds and warms the new
+    version next to the old one, swaps it in for new requests, then frees
+    the old version once its in-flight requests finish, so a reload never
+    fails or blocks traffic.
+    """
+
     def __init__(self) -> None:
+        self.specs: Dict[str, ModelSpec] = {}
+        # Current model object and status per name
         self.models: Dict[str, Any] = {}
         self.status: Dict[str, Dict[str, Any]] = {}
+        # Micro-batching schedulers for models that accept batched input
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self._loaded: Dict[str, LoadedModel] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # (version, model) built by preload() before fork, adopted by the first load
+        self._preloaded: Dict[str, Tuple[str, Any]] = {}
 
-    async def initialize(self) -> None:
-        logger.info("Initializing ML Model Manager...")
+    def register(self, spec: ModelSpec) -> None:
+        self.specs[spec.name] = spec
+        self.status.setdefault(spec.name, {"status": "not_loaded"})
 
+    def _register_defaults(self) -> None:
         # Resolve device
         device = None
         try:
@@ -27,62 +177,339 @@ class MLModelManager:
         except Exception:
             device = "cpu"
 
-        # Clothing detector
-        try:
-            model_path = getattr(settings, "CLOTHING_DETECTION_MODEL", "yolov8n.pt")
-            cd = ClothingDetector(model_path=model_path, device=device)
-            await cd.load()
-            self.models["clothing_detector"] = cd
-            self.status["clothing_detector"] = {
-                "status": "ready" if cd.available else "disabled",
-                "device": device,
-                "model_path": model_path,
-            }
-            if not cd.available:
-                logger.warning("clothing_detector not available (Ultralytics missing or load failed).")
-        except Exception as e:
-            logger.exception(f"Error loading clothing_detector: {e}")
-            self.status["clothing_detector"] = {"status": "error", "error": str(e)}
+        for spec in default_model_specs(device):
+            if spec.name not in self.specs:
+                self.register(spec)
+
+    def _eager_models(self) -> List[str]:
+        if "all" in settings.ml_eager_models:
+            return list(self.specs)
+        unknown = [name for name in settings.ml_eager_models if name not in self.specs]
+        if unknown:
+            logger.warning(f"Unknown models in ml_eager_models: {unknown}")
+        return [name for name in settings.ml_eager_models if name in self.specs]
+
+    async def initialize(self) -> None:
+        logger.info("Initializing ML Model Manager...")
+        self._register_defaults()
+
+        for name in self._eager_models():
+            try:
+                await self.load(name)
+            except Exception:
+                # Recorded in status; lazy loading retries on first use
+                pass
 
         logger.info("ML Model Manager initialization complete.")
 
+    def preload(self) -> Dict[str, float]:
+        """
+        Build the shareable eager models now, before this process forks workers (blocking).
+
+        The gunicorn master calls this with preload_app (see gunicorn.conf.py).
+        Each worker adopts these objects on its first load instead of building
+        its own, so the weights and the libraries behind them stay shared
+        copy-on-write. No inference runs here; warmup happens per worker.
+        Models with threads or native sessions (ONNX Runtime, MediaPipe) are
+        not fork-safe and still load in each worker. Returns seconds per model.
+        """
+        self._register_defaults()
+        timings: Dict[str, float] = {}
+        if getattr(settings, "ENABLE_GPU", False):
+            # A CUDA context does not survive fork
+            logger.warning("Model preloading is CPU-only; workers will load their own models")
+            return timings
+        for name in self._eager_models():
+            spec = self.specs[name]
+            if not spec.shareable() or name in self._preloaded:
+                continue
+            started = time.perf_counter()
+            try:
+                version = spec.version()
+                model = asyncio.run(spec.load())
+                if spec.prepare_shared:
+                    spec.prepare_shared(model)
+            except Exception as e:
+                logger.warning(f"Preloading {name} failed; workers will load it themselves: {e}")
+                continue
+            self._preloaded[name] = (version, model)
+            timings[name] = time.perf_counter() - started
+            logger.info(f"Preloaded {name} {version} for sharing in {timings[name]:.2f}s")
+        return timings
+
+    def _lock(self, name: str) -> asyncio.Lock:
+        if name not in self._locks:
+            self._locks[name] = asyncio.Lock()
+        return self._locks[name]
+
+    async def _build(self, spec: ModelSpec) -> LoadedModel:
+        """Load and warm up a new version of ``spec`` without touching the current one"""
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        preloaded = self._preloaded.pop(spec.name, None)
+        if preloaded is not None:
+            version, model = preloaded
+        else:
+            version = await asyncio.to_thread(spec.version)
+            model = await spec.load()
+        load_time = time.perf_counter() - started
+
+        warmup_time = 0.0
+        if spec.warmup and settings.ml_model_warmup:
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(spec.warmup, model)
+            except Exception as e:
+                logger.warning(f"Warmup of {spec.name} failed: {e}")
+            warmup_time = time.perf_counter() - started
+
+        loaded = LoadedModel(spec, model, version, load_time, warmup_time, max(0, _rss_bytes() - rss_before))
+        loaded.shared = preloaded is not None
+        logger.info(
+            f"Loaded {spec.name} {version} in {load_time:.2f}s "
+            f"(warmup {warmup_time:.2f}s, ~{loaded.memory_bytes / 2 ** 20:.0f} MB)"
+        )
+        return loaded
+
+    def _install(self, name: str, loaded: LoadedModel) -> Optional[LoadedModel]:
+        """Make ``loaded`` the version new requests get; returns the one it replaces"""
+        previous = self._loaded.get(name)
+        self._loaded[name] = loaded
+        self.models[name] = loaded.model
+        if loaded.batcher is not None:
+            self.batchers[name] = loaded.batcher
+        else:
+            self.batchers.pop(name, None)
+        self.status[name] = loaded.info()
+        ML_MODEL_LOAD_SECONDS.labels(model=name).set(loaded.load_time + loaded.warmup_time)
+        ML_MODEL_MEMORY_BYTES.labels(model=name).set(loaded.memory_bytes)
+        return previous
+
+    async def load(self, name: str) -> LoadedModel:
+        """Current version of ``name``, loading it first if needed"""
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            return loaded
+        spec = self.specs.get(name)
+        if spec is None:
+            raise ValueError(f"Model '{name}' not found or not initialized")
+
+        async with self._lock(name):
+            loaded = self._loaded.get(name)
+            if loaded is None:
+                self.status[name] = {"status": "loading"}
+                try:
+                    loaded = await self._build(spec)
+                except Exception as e:
+                    logger.exception(f"Error loading {name}: {e}")
+                    self.status[name] = {"status": "error", "error": str(e)}
+                    raise
+                self._install(name, loaded)
+            return loaded
+
+    async def reload(self, name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Load a fresh version of ``name`` (default: every loaded model) and swap it in.
+
+        Requests already holding the old version finish on it; it is freed
+        once they drain (or after ``ml_reload_drain_timeout``). If the new
+        version fails to load, the old one keeps serving.
+        """
+        names = [name] if name else list(self._loaded)
+        results: Dict[str, Dict[str, Any]] = {}
+        for model_name in names:
+            spec = self.specs.get(model_name)
+            if spec is None:
+                raise ValueError(f"Model '{model_name}' not found or not initialized")
+            async with self._lock(model_name):
+                try:
+                    loaded = await self._build(spec)
+                except Exception as e:
+                    logger.exception(f"Reload of {model_name} failed; keeping the current version: {e}")
+                    self.status.setdefault(model_name, {})["reload_error"] = str(e)
+                    results[model_name] = {"status": "error", "error": str(e)}
+                    continue
+                previous = self._install(model_name, loaded)
+            if previous is not None:
+                await previous.retire(settings.ml_reload_drain_timeout)
+            results[model_name] = {
+                "status": "reloaded",
+                "version": loaded.version,
+                "previous_version": previous.version if previous else None,
+            }
+        return results
+
+    @contextlib.asynccontextmanager
+    async def lease(self, name: str) -> AsyncIterator[LoadedModel]:
+        """Hold the current version of ``name`` for one request"""
+        loaded = await self.load(name)
+        loaded.acquire()
+        try:
+            yield loaded
+        finally:
+            loaded.release()
+
     async def cleanup(self) -> None:
-        # Add any GPU memory cleanup if needed
+        loaded, self._loaded = list(self._loaded.values()), {}
+        for model in loaded:
+            await model.close()
+        self.models.clear()
+        self.batchers.clear()
+        for name in self.specs:
+            self.status[name] = {"status": "not_loaded"}
         logger.info("ML Model Manager cleanup complete.")
 
     async def get_model_status(self) -> Dict[str, Dict[str, Any]]:
         # Ensure keys exist even if initialize() never ran
         if "clothing_detector" not in self.status:
             self.status["clothing_detector"] = {"status": "not_initialized"}
+        for name, loaded in self._loaded.items():
+            self.status[name] = {**self.status.get(name, {}), **loaded.info()}
         return self.status
-    
+
     async def is_model_ready(self, model_name: str) -> bool:
-        """Check if a specific model is ready for use"""
+        """Check if a specific model is loaded and ready for use (never triggers a load)"""
         if model_name not in self.models:
             return False
         if model_name not in self.status:
             return False
         return self.status[model_name].get("status") == "ready"
 
+    async def detect_clothing(self, image: Any) -> List[Dict[str, Any]]:
+        """Detect clothing in one image, batched with concurrent requests"""
+        async with self.lease("clothing_detector") as loaded:
+            if loaded.batcher is None:
+                raise ValueError("Model 'clothing_detector' not found or not initialized")
+            return await loaded.batcher.submit(image)
+
+def default_model_specs(device: str) -> List[ModelSpec]:
+    """The models the ML services use; heavy libraries are imported when a model loads"""
+
+    async def load_clothing_detector():
+        from app.models.detection.clothing_detector import ClothingDetector
+
+        cd = ClothingDetector(
+            model_path=settings.clothing_detection_model,
+            device=device,
+            backend=settings.ml_inference_backend,
+            onnx_path=settings.clothing_detection_onnx_model or None,
+            intra_op_threads=settings.onnx_intra_op_threads,
+            inter_op_threads=settings.onnx_inter_op_threads,
+        )
+        await cd.load()
+        if not cd.available:
+            logger.warning("clothing_detector not available (Ultralytics missing or load failed).")
+        return cd
+
+    def describe_clothing_detector(cd) -> Dict[str, Any]:
+        return {
+            "status": "ready" if cd.available else "disabled",
+            "device": device,
+            "model_path": cd.onnx_path if cd.backend == "onnx" else cd.model_path,
+            "backend": cd.backend,
+        }
+
+    async def load_virtual_tryon():
+        from app.models.generation.virtual_tryon import VirtualTryOnModel
+
+        return await asyncio.to_thread(
+            VirtualTryOnModel,
+            model_path=settings.virtual_tryon_model,
+            device=device,
+            backend=settings.ml_inference_backend,
+            onnx_path=settings.virtual_tryon_onnx_model or None,
+            intra_op_threads=settings.onnx_intra_op_threads,
+            inter_op_threads=settings.onnx_inter_op_threads,
+            quantization=settings.virtual_tryon_quantization,
+            calibration_dir=settings.virtual_tryon_calibration_dir or None,
+            calibration_samples=settings.virtual_tryon_calibration_samples,
+        )
+
+    def describe_virtual_tryon(tryon) -> Dict[str, Any]:
+        if tryon.quantization != "none":
+            model_path = tryon.quantized_path(tryon.quantization)
+        else:
+            model_path = tryon.onnx_path if tryon.backend == "onnx" else settings.virtual_tryon_model
+        return {
+            "device": str(tryon.device),
+            "model_path": model_path,
+            "backend": tryon.backend,
+            "quantization": tryon.quantization,
+        }
+
+    def warmup_virtual_tryon(tryon):
+        width, height = tryon.TARGET_SIZE
+        blank = np.zeros((height, width, 3), dtype=np.uint8)
+        return tryon.generate_tryon(blank, blank)
+
+    async def load_pose_estimator():
+        from app.models.detection.pose_estimator import PoseEstimator
+
+        # One graph per inference slot, so requests on the executor never wait for one
+        return await asyncio.to_thread(
+            PoseEstimator,
+            static_mode=True,
+            pool_size=settings.pose_pool_size or settings.max_concurrent_requests,
+            checkout_timeout=settings.ml_inference_timeout or None,
+        )
+
+    async def load_style_matcher():
+        from app.models.recommendation.style_matcher import StyleMatcher
+
+        return await asyncio.to_thread(StyleMatcher)
+
+    async def load_user_profiler():
+        from app.models.personalization.user_profiler import UserProfiler
+
+        return await asyncio.to_thread(UserProfiler, None)
+
+    tryon_suffixes = lambda: (
+        settings.ml_inference_backend if settings.ml_inference_backend != "torch" else "",
+        f"int8-{settings.virtual_tryon_quantization}" if settings.virtual_tryon_quantization != "none" else "",
+    )
+    return [
+        ModelSpec(
+            name="clothing_detector",
+            load=load_clothing_detector,
+            version=lambda: file_version(
+                settings.clothing_detection_model,
+                settings.ml_inference_backend if settings.ml_inference_backend != "torch" else ""
+            ),
+            warmup=lambda cd: cd.detect_batch([np.zeros((cd.imgsz, cd.imgsz, 3), dtype=np.uint8)]),
+            batch=lambda cd: cd.detect_batch,
+            describe=describe_clothing_detector,
+            shareable=lambda: settings.ml_inference_backend == "torch",
+            # Ultralytics fuses conv+bn on the first prediction, which would rewrite the weights per worker
+            prepare_shared=lambda cd: cd.model.fuse(verbose=False) if cd.model is not None else None,
+        ),
+        ModelSpec(
+            name="virtual_tryon",
+            load=load_virtual_tryon,
+            version=lambda: file_version(settings.virtual_tryon_model, *tryon_suffixes()),
+            warmup=warmup_virtual_tryon,
+            describe=describe_virtual_tryon,
+            shareable=lambda: settings.ml_inference_backend == "torch" and settings.virtual_tryon_quantization == "none",
+        ),
+        ModelSpec(
+            name="pose_estimator",
+            load=load_pose_estimator,
+            version=lambda: "mediapipe-pose",
+            warmup=lambda pose: pose.estimate_pose(np.zeros((256, 256, 3), dtype=np.uint8)),
+            describe=lambda pose: {"pools": pose.pool_stats()},
+        ),
+        ModelSpec(name="style_matcher", load=load_style_matcher, version=lambda: "rules", shareable=lambda: True),
+        ModelSpec(name="user_profiler", load=load_user_profiler, version=lambda: "untrained", shareable=lambda: True),
+    ]
+
 # Singleton
 ml_model_manager = MLModelManager()
 
-async def get_ml_model(model_name: str):
-    """Async context manager to get a specific ML model"""
-    if model_name not in ml_model_manager.models:
-        raise ValueError(f"Model '{model_name}' not found or not initialized")
-    
-    model = ml_model_manager.models[model_name]
-    
-    class ModelContextManager:
-        def __init__(self, model):
-            self.model = model
-        
-        async def __aenter__(self):
-            return self.model
-        
-        async def __aexit__(self, exc_type, exc_val, exc_tb):
-            # No cleanup needed for now
-            pass
-    
-    return ModelContextManager(model)
+def get_ml_model(model_name: str):
+    """Async context manager holding the current version of a model, loaded on first use"""
+
+    @contextlib.asynccontextmanager
+    async def model_context():
+        async with ml_model_manager.lease(model_name) as loaded:
+            yield loaded.model
+
+    return model_context()
@@ -1,42 +1,76 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
-from app.models.detection.clothing_detector import ClothingDetector
+from app.config import settings
+from app.services.ml_model_manager import ml_model_manager
+from app.services.inference_executor import inference_executor
+from app.services.prediction_cache import PredictionCache, prediction_cache
+from app.services.near_duplicate_index import near_duplicate_index
 from app.utils.image_processing import ImageProcessor
 
 class MLService:
     def __init__(self):
-        self.clothing_detector = ClothingDetector()
         self.image_processor = ImageProcessor()
     
-    async def analyze_clothing_image(self, image_data: bytes) -> Dict[str, Any]:
+    def _decode_and_fingerprint(self, image_data: bytes):
+        image = self.image_processor.process_upload(image_data)
+        image = self.image_processor.resize_image(image)
+        return image, self.image_processor.perceptual_hash(image, settings.ml_perceptual_hash)
+    
+    async def analyze_clothing_image(self, image_data: bytes, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Clothing analysis, reusing the stored result for a repeated upload"""
+        version = PredictionCache.version(settings.clothing_detection_model)
+        return await prediction_cache.get_or_compute(
+            "clothing_detection",
+            version,
+            PredictionCache.hash_bytes(image_data),
+            lambda: self._analyze_clothing(image_data, user_id, version),
+            user_id=user_id,
+            cache_if=self._is_cacheable
+        )
+    
+    @staticmethod
+    def _is_cacheable(result: Dict[str, Any]) -> bool:
+        detector = ml_model_manager.status.get("clothing_detector", {})
+        return result['status'] == 'success' and detector.get("status") == "ready"
+    
+    async def _analyze_clothing(self, image_data: bytes, user_id: Optional[int], version: str) -> Dict[str, Any]:
         """Complete clothing analysis pipeline"""
         try:
-            # Process image
-            image = self.image_processor.process_upload(image_data)
-            image = self.image_processor.resize_image(image)
+            # Process image off the event loop
+            image, image_hash = await inference_executor.run(
+                self._decode_and_fingerprint, image_data, task="decode_image"
+            )
             
-            # Detect clothing items
-            detections = self.clothing_detector.detect_clothing(image)
+            # A re-encoded or resized copy of a recent upload reuses its analysis
+            near_duplicates = user_id is not None and settings.ml_near_duplicate_enabled
+            aspect = image.shape[1] / image.shape[0]
+            index_version = f"{version}/{settings.ml_perceptual_hash}"
+            if near_duplicates:
+                match = near_duplicate_index.find(user_id, "clothing_detection", index_version, image_hash, aspect)
+                if match:
+                    return match[1]
+            
+            # Detect clothing items (micro-batched with concurrent requests)
+            detections = await ml_model_manager.detect_clothing(image)
             
             # Extract features for each detection
             analyzed_items = []
             for detection in detections:
-                features = self.clothing_detector.extract_clothing_features(
-                    image, detection['bbox']
-                )
-                
                 item = {
                     'type': detection['class'],
                     'confidence': detection['confidence'],
-                    'features': features
+                    'features': detection.get('features', {})
                 }
                 analyzed_items.append(item)
             
-            return {
+            result = {
                 'items': analyzed_items,
                 'item_count': len(analyzed_items),
                 'status': 'success'
             }
+            if near_duplicates and self._is_cacheable(result):
+                near_duplicate_index.add(user_id, "clothing_detection", index_version, image_hash, aspect, result)
+            return result
             
         except Exception as e:
             return {
@@ -0,0 +1,155 @@
+"""
+ML Worker Pool - process-based tier for CPU-bound inference that holds the GIL
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.inference_executor import inference_executor
+
+logger = logging.getLogger(__name__)
+
+# (shared memory block name, shape, dtype) - all a worker needs to map an image
+ImageHandle = Tuple[str, Tuple[int, ...], str]
+
+def share_image(image: np.ndarray) -> Tuple[shared_memory.SharedMemory, ImageHandle]:
+    """Copy ``image`` into a new shared memory block; the caller must unlink it"""
+    block = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+    view = np.ndarray(image.shape, dtype=image.dtype, buffer=block.buf)
+    view[...] = image
+    del view
+    return block, (block.name, image.shape, image.dtype.str)
+
+# --- Worker side -------------------------------------------------------------
+# Models are loaded once per worker process by _init_worker and reused by every task
+
+_worker_models: Dict[str, Any] = {}
+
+def _init_worker():
+    from app.utils.color_analysis import ColorAnalyzer
+
+    analyzer = _worker_models["color_analyzer"] = ColorAnalyzer(
+        engine=settings.color_palette_engine, sample_size=settings.color_palette_sample_size
+    )
+    # Palette extraction imports cv2 and sklearn on first use; pay for that before taking tasks
+    analyzer.extract_palette(np.random.default_rng(0).integers(0, 256, size=(16, 16, 3), dtype=np.uint8))
+    logger.info(f"ML worker {os.getpid()} loaded models: {sorted(_worker_models)}")
+
+def _color_analysis(image: np.ndarray):
+    analyzer = _worker_models["color_analyzer"]
+    color_palette = analyzer.extract_palette(image)
+    return color_palette, analyzer.analyze_color_harmony(color_palette.colors)
+
+WORKER_TASKS: Dict[str, Callable[..., Any]] = {
+    "color_analysis": _color_analysis,
+}
+
+def _ping() -> int:
+    return os.getpid()
+
+def _run_task(task: str, handle: ImageHandle, kwargs: Dict[str, Any]) -> Any:
+    name, shape, dtype = handle
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        try:
+            return WORKER_TASKS[task](image, **kwargs)
+        finally:
+            # The view must be gone before the mapping can be closed
+            del image
+    finally:
+        block.close()
+
+# --- Parent side -------------------------------------------------------------
+
+class MLWorkerPool:
+    """
+    Pool of worker processes for inference that is CPU-bound in Python.
+
+    KMeans palette extraction and the colour bookkeeping around it hold the
+    GIL for much of their runtime, so on the thread-based InferenceExecutor
+    concurrent requests serialize. Here each task runs in its own process.
+    Images are not pickled: the parent copies the decoded array into a
+    ``multiprocessing.shared_memory`` block and only its name, shape and
+    dtype cross the process boundary. Each worker loads its models once in
+    its initializer.
+
+    Calls still go through ``inference_executor`` so the pool shares its
+    concurrency cap, queue limit and timeouts.
+    """
+
+    def __init__(self, workers: Optional[int] = None, start_method: Optional[str] = None):
+        self.workers = max(1, workers or settings.ml_process_workers or os.cpu_count() or 1)
+        self.start_method = start_method or settings.ml_process_start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._stats = {"tasks": 0, "errors": 0, "bytes_shared": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ml_execution_mode == "process"
+
+    def _ensure_started(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker
+            )
+        return self._pool
+
+    def start(self) -> float:
+        """Spawn every worker and wait for its models to load; returns seconds taken"""
+        started = time.perf_counter()
+        pool = self._ensure_started()
+        pids = {future.result() for future in [pool.submit(_ping) for _ in range(self.workers)]}
+        elapsed = time.perf_counter() - started
+        logger.info(f"ML worker pool ready: {len(pids)} processes in {elapsed:.2f}s")
+        return elapsed
+
+    def call(self, task: str, image: np.ndarray, **kwargs: Any) -> Any:
+        """Run a worker task on ``image`` and block for its result"""
+        if task not in WORKER_TASKS:
+            raise ValueError(f"Unknown ML worker task: {task}")
+        pool = self._ensure_started()
+        block, handle = share_image(np.ascontiguousarray(image))
+        try:
+            self._stats["tasks"] += 1
+            self._stats["bytes_shared"] += image.nbytes
+            return pool.submit(_run_task, task, handle, kwargs).result()
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            block.close()
+            block.unlink()
+
+    async def run(self, task: str, image: np.ndarray, **kwargs: Any) -> Any:
+        """Async ``call`` under the inference executor's limits and timeout"""
+        return await inference_executor.run(self.call, task, image, task=task, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration and task counters"""
+        return {
+            "enabled": self.enabled,
+            "started": self._pool is not None,
+            "workers": self.workers,
+            "start_method": self.start_method,
+            **self._stats
+        }
+
+    def shutdown(self):
+        """Stop the worker processes once their current tasks finish"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+# Global instance
+ml_worker_pool = MLWorkerPool()
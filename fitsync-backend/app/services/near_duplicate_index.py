@@ -0,0 +1,118 @@
+"""
+Near-Duplicate Index - recent perceptual hashes per user, matched by Hamming distance
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+
+from prometheus_client import Counter
+
+from app.config import settings
+from app.utils.image_processing import ImageProcessor
+
+ML_NEAR_DUPLICATES = Counter(
+    "ml_near_duplicate_lookups_total", "Near-duplicate upload lookups by outcome", ["model", "result"]
+)
+
+class NearDuplicateIndex:
+    """
+    Remembers the last few analysed uploads of each user by perceptual hash.
+
+    Exact-hash caching misses a photo that was re-encoded or resized by the
+    client, but its perceptual hash stays within a few bits. ``find``
+    returns the payload of the closest recent upload of the same user and
+    model within ``max_distance`` bits, if its aspect ratio also matches.
+    Each user keeps at most ``per_user`` entries, so a lookup is a short
+    linear scan. Users idle longest are dropped past ``max_users``.
+    """
+
+    # Relative aspect ratio difference still treated as the same picture
+    ASPECT_TOLERANCE = 0.02
+
+    def __init__(
+        self,
+        max_distance: Optional[int] = None,
+        per_user: Optional[int] = None,
+        ttl: Optional[int] = None,
+        max_users: int = 10000
+    ):
+        self.max_distance = settings.ml_near_duplicate_max_distance if max_distance is None else max_distance
+        self.per_user = per_user or settings.ml_near_duplicate_per_user
+        self.ttl = ttl or settings.ml_near_duplicate_ttl
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        # (user_id, model, version) -> recent (hash, aspect, stored_at, payload), newest last
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Deque[Tuple[int, float, float, Any]]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, model: str, result: str):
+        counters = self._stats.setdefault(model, {"hits": 0, "misses": 0})
+        counters[result] += 1
+        ML_NEAR_DUPLICATES.labels(model=model, result=result).inc()
+
+    def find(
+        self,
+        user_id: Hashable,
+        model: str,
+        version: str,
+        image_hash: int,
+        aspect: float
+    ) -> Optional[Tuple[int, Any]]:
+        """Closest recent match as (distance, payload), or None"""
+        best: Optional[Tuple[int, Any]] = None
+        with self._lock:
+            key = (user_id, model, version)
+            recent = self._entries.get(key)
+            if recent:
+                self._entries.move_to_end(key)
+                cutoff = time.time() - self.ttl
+                while recent and recent[0][2] < cutoff:
+                    recent.popleft()
+                for stored_hash, stored_aspect, _, payload in recent:
+                    if abs(stored_aspect - aspect) > self.ASPECT_TOLERANCE * aspect:
+                        continue
+                    distance = ImageProcessor.hamming_distance(stored_hash, image_hash)
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, payload)
+        self._record(model, "hits" if best else "misses")
+        return best
+
+    def add(
+        self,
+        user_id: Hashable,
+        model: str,
+        version: str,
+        image_hash: int,
+        aspect: float,
+        payload: Any
+    ):
+        """Remember an analysed upload, evicting the user's oldest past ``per_user``"""
+        key = (user_id, model, version)
+        with self._lock:
+            recent = self._entries.get(key)
+            if recent is None:
+                recent = self._entries[key] = deque(maxlen=self.per_user)
+            recent.append((image_hash, aspect, time.time(), payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per model and current index size"""
+        with self._lock:
+            hashes = sum(len(recent) for recent in self._entries.values())
+            users = len({key[0] for key in self._entries})
+        models = {}
+        for model, counters in self._stats.items():
+            lookups = counters["hits"] + counters["misses"]
+            models[model] = {**counters, "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0}
+        return {"users": users, "hashes": hashes, "max_distance": self.max_distance, "models": models}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Global instance
+near_duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,354 @@
+"""
+Nearby Service - location queries answered from per-geohash-cell caches
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from datetime import datetime, timezone
+from prometheus_client import Gauge
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import asyncio
+import logging
+import time
+
+from app.config import settings
+from app.database import session_scope
+from app.models.trends import NearbyLocation
+from app.schemas.trends import LocationTypeEnum
+from app.services.cache_service import CacheService
+from app.services.geo_index import GridEntry, GridIndex
+from app.services.spatial_index import SpatialIndex
+from app.services.trends_service import TrendsService
+from app.utils.geo import covering_geohashes, geohash_bbox, geohash_encode, haversine_km_many, nearest_within
+
+logger = logging.getLogger(__name__)
+
+NEARBY_INDEX_SIZE = Gauge(
+    "nearby_index_size", "Locations held by the in-process nearby index", ["location_type"]
+)
+NEARBY_INDEX_REBUILD_SECONDS = Gauge(
+    "nearby_index_rebuild_seconds", "Duration of the last full nearby index rebuild"
+)
+
+# Pending index changes of a session, keyed by location id (None = removed)
+_INDEX_CHANGES_KEY = "nearby_index_changes"
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """UNIX timestamp of a DB datetime (naive values are UTC, as written by utcnow())"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+class NearbyService:
+    """
+    Service for nearby people/events/hotspots backed by a spatial cache.
+
+    Location records are cached per geohash cell rather than per query, so any
+    point and radius is answered by merging the covering cells and filtering
+    precisely; users a few hundred meters apart (or asking for a different
+    radius) share the same cells.
+    """
+
+    LOCATION_TYPES: Dict[str, str] = {
+        'people': LocationTypeEnum.PERSON.value,
+        'events': LocationTypeEnum.EVENT.value,
+        'hotspots': LocationTypeEnum.HOTSPOT.value,
+    }
+
+    RESPONSE_BUILDERS: Dict[str, Callable[[NearbyLocation, float], Any]] = {
+        'people': TrendsService.build_person_response,
+        'events': TrendsService.build_event_response,
+        'hotspots': TrendsService.build_hotspot_response,
+    }
+
+    DATA_TYPES: Dict[str, str] = {value: key for key, value in LOCATION_TYPES.items()}
+
+    # Optional in-process grid of every active public location (nearby_index_enabled)
+    index = GridIndex(settings.nearby_index_cell_deg)
+    _index_ready: bool = False
+    _index_task: Optional[asyncio.Task] = None
+    _index_stats: Dict[str, Any] = {}
+
+    @staticmethod
+    def covering_cells(lat: float, lng: float, radius_km: float) -> List[str]:
+        """Geohash cells covering a circle, coarsened until within cache_nearby_max_cells"""
+        precision = settings.cache_nearby_precision
+        cells = covering_geohashes(lat, lng, radius_km, precision)
+        while len(cells) > settings.cache_nearby_max_cells and precision > 1:
+            precision -= 1
+            cells = covering_geohashes(lat, lng, radius_km, precision)
+        return cells
+
+    @staticmethod
+    def _to_record(data_type: str, location: NearbyLocation) -> Dict[str, Any]:
+        """Cacheable record for a location; distance is filled in per query"""
+        record = NearbyService.RESPONSE_BUILDERS[data_type](location, 0.0).dict()
+        record['_expires_at'] = _timestamp(location.expires_at)
+        return record
+
+    @staticmethod
+    def load_cells(db: Session, data_type: str, cells: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Load location records for ``cells`` with a single bounding-box query"""
+        boxes = [geohash_bbox(cell) for cell in cells]
+        locations = TrendsService.get_locations_in_bbox(
+            db, NearbyService.LOCATION_TYPES[data_type],
+            min(box[0] for box in boxes), max(box[1] for box in boxes),
+            min(box[2] for box in boxes), max(box[3] for box in boxes)
+        )
+
+        # Empty cells are cached too, so they don't hit the database again
+        cell_records: Dict[str, List[Dict[str, Any]]] = {cell: [] for cell in cells}
+        precision = len(cells[0])
+        for location in locations:
+            cell = geohash_encode(location.latitude, location.longitude, precision)
+            if cell in cell_records:
+                cell_records[cell].append(NearbyService._to_record(data_type, location))
+        return cell_records
+
+    @staticmethod
+    def select_nearest(
+        records: List[Dict[str, Any]],
+        lat: float,
+        lng: float,
+        radius_km: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Filter cell records to the circle, drop expired events and return the closest ``limit``"""
+        now = time.time()
+        live = [
+            record for record in records
+            if record.get('_expires_at') is None or record['_expires_at'] > now
+        ]
+        if not live:
+            return []
+
+        distances = haversine_km_many(
+            lat, lng,
+            [record['latitude'] for record in live],
+            [record['longitude'] for record in live]
+        )
+        in_range = [(float(distances[i]), live[i]) for i in nearest_within(distances, radius_km, limit)]
+
+        return [NearbyService._to_result(record, distance_km) for distance_km, record in in_range]
+
+    @staticmethod
+    def _to_result(record: Dict[str, Any], distance_km: float) -> Dict[str, Any]:
+        """Response item for a cached record at ``distance_km``"""
+        result = {k: v for k, v in record.items() if not k.startswith('_')}
+        result['distance'] = f"{distance_km:.1f} km"
+        return result
+
+    @staticmethod
+    async def get_nearby(
+        db: Session,
+        data_type: str,  # people, events, hotspots
+        lat: float,
+        lng: float,
+        radius_km: float = 5.0,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Get nearby locations of a type, from the in-process index or cached cells"""
+        if NearbyService.index_ready():
+            return [
+                NearbyService._to_result(record, distance_km)
+                for distance_km, record in NearbyService.index.nearest(
+                    NearbyService.LOCATION_TYPES[data_type], lat, lng, radius_km, limit
+                )
+            ]
+
+        cells = NearbyService.covering_cells(lat, lng, radius_km)
+        cell_records = await CacheService.get_nearby_cells(data_type, cells)
+
+        missing = [cell for cell in cells if cell not in cell_records]
+        if missing:
+            try:
+                loaded = NearbyService.load_cells(db, data_type, missing)
+            except Exception as e:
+                logger.error(f"Error loading nearby {data_type} cells: {e}")
+                loaded = {}
+            else:
+                await CacheService.set_nearby_cells(data_type, loaded)
+            cell_records.update(loaded)
+
+        records = [record for records in cell_records.values() for record in records]
+        return NearbyService.select_nearest(records, lat, lng, radius_km, limit)
+
+    @staticmethod
+    def get_nearby_map(
+        db: Optional[Session],
+        lat: float,
+        lng: float,
+        radius_km: float,
+        limits: Dict[str, int]  # data type (people, events, hotspots) -> limit
+    ) -> Dict[str, Any]:
+        """
+        Map overlay payload: every requested data type from a single spatial pass.
+
+        Served from the in-process index when it is ready (``db`` unused),
+        otherwise from one bounding-box query over all requested types.
+        """
+        type_limits = {NearbyService.LOCATION_TYPES[data_type]: limit for data_type, limit in limits.items()}
+        map_data: Dict[str, Any] = {"center": {"latitude": lat, "longitude": lng}}
+
+        if NearbyService.index_ready():
+            found = NearbyService.index.nearest_by_type(type_limits, lat, lng, radius_km)
+            for data_type in limits:
+                map_data[data_type] = [
+                    NearbyService._to_result(record, distance_km)
+                    for distance_km, record in found[NearbyService.LOCATION_TYPES[data_type]]
+                ]
+            return map_data
+
+        found = SpatialIndex.nearest_by_type(db, type_limits, lat, lng, radius_km)
+        for data_type in limits:
+            build = NearbyService.RESPONSE_BUILDERS[data_type]
+            map_data[data_type] = [
+                build(location, distance_km).dict()
+                for distance_km, location in found[NearbyService.LOCATION_TYPES[data_type]]
+            ]
+        return map_data
+
+    # ------------------------------------------------------------------
+    # In-process spatial index
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def index_ready() -> bool:
+        """Whether nearby queries are answered from the in-process index"""
+        return NearbyService._index_ready
+
+    @staticmethod
+    def _to_entry(location: NearbyLocation) -> Optional[GridEntry]:
+        """Index entry for a location, or None if it should not be listed"""
+        data_type = NearbyService.DATA_TYPES.get(location.location_type)
+        if data_type is None or not location.is_active or not location.is_public:
+            return None
+        return GridEntry(
+            location.location_type, location.latitude, location.longitude,
+            _timestamp(location.expires_at), NearbyService._to_record(data_type, location)
+        )
+
+    @staticmethod
+    def rebuild_index():
+        """Reload every active public location into the index (blocking)"""
+        started = time.perf_counter()
+        with session_scope() as db:
+            locations = db.query(NearbyLocation).filter(
+                NearbyLocation.location_type.in_(list(NearbyService.DATA_TYPES)),
+                NearbyLocation.is_active == True,
+                NearbyLocation.is_public == True
+            ).yield_per(5000)
+            NearbyService.index.replace(
+                (location.id, entry)
+                for location in locations
+                if (entry := NearbyService._to_entry(location)) is not None
+            )
+        elapsed = time.perf_counter() - started
+
+        NEARBY_INDEX_REBUILD_SECONDS.set(elapsed)
+        NearbyService._update_size_metrics()
+        NearbyService._index_stats = {
+            "last_rebuild_seconds": round(elapsed, 3),
+            "last_rebuild_at": datetime.utcnow().isoformat()
+        }
+        logger.info(f"Nearby index rebuilt with {len(NearbyService.index)} locations in {elapsed:.2f}s")
+
+    @staticmethod
+    def _update_size_metrics():
+        sizes = NearbyService.index.sizes()
+        for location_type in NearbyService.DATA_TYPES:
+            NEARBY_INDEX_SIZE.labels(location_type=location_type).set(sizes.get(location_type, 0))
+
+    @staticmethod
+    def index_stats() -> Dict[str, Any]:
+        """Index size per location type and last rebuild timing"""
+        return {
+            "enabled": NearbyService._index_ready,
+            "size": len(NearbyService.index),
+            "by_type": NearbyService.index.sizes(),
+            **NearbyService._index_stats
+        }
+
+    @staticmethod
+    def _collect_index_changes(session: Session, flush_context):
+        """Snapshot flushed NearbyLocation changes; applied only once the session commits"""
+        for location in session.new | session.dirty | session.deleted:
+            if isinstance(location, NearbyLocation):
+                entry = None if location in session.deleted else NearbyService._to_entry(location)
+                session.info.setdefault(_INDEX_CHANGES_KEY, {})[location.id] = entry
+
+    @staticmethod
+    def _apply_index_changes(session: Session):
+        changes = session.info.pop(_INDEX_CHANGES_KEY, None)
+        if not changes:
+            return
+        for location_id, entry in changes.items():
+            if entry is None:
+                NearbyService.index.remove(location_id)
+            else:
+                NearbyService.index.upsert(location_id, entry)
+        NearbyService._update_size_metrics()
+
+    @staticmethod
+    def _discard_index_changes(session: Session):
+        session.info.pop(_INDEX_CHANGES_KEY, None)
+
+    _SESSION_HOOKS = (
+        ("after_flush", "_collect_index_changes"),
+        ("after_commit", "_apply_index_changes"),
+        ("after_rollback", "_discard_index_changes"),
+    )
+
+    @staticmethod
+    def _set_session_hooks(enabled: bool):
+        for name, handler in NearbyService._SESSION_HOOKS:
+            fn = getattr(NearbyService, handler)
+            if enabled and not event.contains(Session, name, fn):
+                event.listen(Session, name, fn)
+            elif not enabled and event.contains(Session, name, fn):
+                event.remove(Session, name, fn)
+
+    @staticmethod
+    async def _rebuild_loop(interval_seconds: float):
+        # Periodic rebuilds pick up writes made by other processes
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(NearbyService.rebuild_index)
+            except Exception as e:
+                logger.error(f"Nearby index rebuild error: {e}")
+
+    @staticmethod
+    async def start_index():
+        """Build the in-process index and keep it current (no-op unless nearby_index_enabled)"""
+        if not settings.nearby_index_enabled or NearbyService._index_ready:
+            return
+        # Hooks go in first; commits made while the build reads are replayed by replace()
+        NearbyService._set_session_hooks(True)
+        try:
+            await asyncio.to_thread(NearbyService.rebuild_index)
+        except Exception as e:
+            logger.error(f"Nearby index build failed, serving nearby queries from the database: {e}")
+            NearbyService._set_session_hooks(False)
+            return
+        NearbyService._index_ready = True
+
+        interval = settings.nearby_index_rebuild_interval
+        if interval > 0:
+            NearbyService._index_task = asyncio.create_task(NearbyService._rebuild_loop(interval))
+
+    @staticmethod
+    async def stop_index():
+        """Stop maintaining the index and fall back to database/cache queries"""
+        NearbyService._index_ready = False
+        NearbyService._set_session_hooks(False)
+        task = NearbyService._index_task
+        NearbyService._index_task = None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,196 @@
+"""
+Prediction Cache - memoizes ML results by input content, model and version
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import numpy as np
+from prometheus_client import Counter
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import IS_ASYNC, session_scope
+from app.models.analytics import ModelPrediction, ModelTypeEnum
+from app.services.cache_backends import InMemoryCache
+
+logger = logging.getLogger(__name__)
+
+ML_PREDICTION_CACHE = Counter(
+    "ml_prediction_cache_lookups_total", "Prediction cache lookups by outcome", ["model", "result"]
+)
+
+class PredictionCache:
+    """
+    Two-level cache of ML predictions keyed by a SHA-256 of the input.
+
+    Users re-upload the same photos, and the models are deterministic for a
+    given version, so a repeat input can reuse the earlier result. Lookups
+    hit an in-process LRU first, then the ``model_predictions`` table
+    (``input_hash`` plus ``model_type`` and ``model_version``). Misses are
+    computed, then written to both. Rows need a user, so anonymous results
+    stay in memory only, as do all results on async database engines.
+
+    The version belongs to the key: changing a model's weights or its
+    ``ml_prediction_version`` makes its old results unreachable.
+    """
+
+    # Cached model names -> ModelPrediction.model_type
+    MODEL_TYPES = {
+        "clothing_analysis": ModelTypeEnum.CLOTHING_DETECTION,
+        "clothing_detection": ModelTypeEnum.CLOTHING_DETECTION,
+        "pose_estimation": ModelTypeEnum.BODY_TYPE_ANALYSIS,
+        "color_palette": ModelTypeEnum.COLOR_ANALYSIS,
+    }
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        persist: Optional[bool] = None
+    ):
+        self.memory = InMemoryCache(
+            max_entries=max_entries or settings.ml_prediction_cache_size,
+            max_bytes=settings.cache_max_bytes,
+            eviction_policy="lru"
+        )
+        self.ttl = ttl or settings.ml_prediction_cache_ttl
+        self.persist = (settings.ml_prediction_cache_persist if persist is None else persist) and not IS_ASYNC
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Cache key for raw input such as an uploaded file"""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_array(array: np.ndarray) -> str:
+        """Cache key for decoded pixels; shape and dtype are part of the hash"""
+        digest = hashlib.sha256(f"{array.shape}{array.dtype.str}".encode())
+        digest.update(np.ascontiguousarray(array).data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def version(*parts: Any) -> str:
+        """Model version string: the given model identifiers plus ``ml_prediction_version``"""
+        return "/".join([*(os.path.basename(str(part)) for part in parts), settings.ml_prediction_version])
+
+    @staticmethod
+    def _stored_version(model: str, version: str) -> str:
+        # Several models share a model_type, so the stored version names the model too
+        stored = f"{model}:{version}"
+        if len(stored) > ModelPrediction.model_version.type.length:
+            stored = f"{model}:{hashlib.sha1(version.encode()).hexdigest()[:16]}"
+        return stored
+
+    def _record(self, model: str, result: str):
+        counters = self._stats.setdefault(model, {"memory_hits": 0, "db_hits": 0, "misses": 0})
+        counters[result] += 1
+        ML_PREDICTION_CACHE.labels(model=model, result=result).inc()
+
+    def _load(self, model: str, version: str, input_hash: str) -> Optional[Any]:
+        with session_scope() as db:
+            return db.execute(
+                select(ModelPrediction.prediction_result)
+                .where(
+                    ModelPrediction.input_hash == input_hash,
+                    ModelPrediction.model_type == self.MODEL_TYPES[model],
+                    ModelPrediction.model_version == self._stored_version(model, version)
+                )
+                .order_by(ModelPrediction.id.desc())
+                .limit(1)
+            ).scalar_one_or_none()
+
+    def _save(self, model: str, version: str, input_hash: str, result: Any,
+              user_id: int, processing_time: float):
+        with session_scope() as db:
+            db.add(ModelPrediction(
+                user_id=user_id,
+                model_type=self.MODEL_TYPES[model],
+                input_hash=input_hash,
+                prediction_result=result,
+                processing_time=processing_time,
+                model_version=self._stored_version(model, version)
+            ))
+            db.commit()
+
+    async def get_or_compute(
+        self,
+        model: str,
+        version: str,
+        input_hash: str,
+        compute: Callable[[], Awaitable[Any]],
+        user_id: Optional[int] = None,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+        persist: bool = True
+    ) -> Any:
+        """
+        Cached result for ``input_hash``, or ``await compute()`` stored under it.
+
+        ``compute`` must return JSON-serializable data. ``cache_if`` can veto
+        storing a result (e.g. an error payload). ``persist=False`` keeps it
+        in memory only, skipping the database on lookup and store. Database
+        failures only cost the cache level; they never fail the prediction.
+        """
+        key = f"{model}:{version}:{input_hash}"
+        result = self.memory.get(key)
+        if result is not None:
+            self._record(model, "memory_hits")
+            return result
+
+        if self.persist and persist:
+            try:
+                result = await asyncio.to_thread(self._load, model, version, input_hash)
+            except Exception as e:
+                logger.warning(f"Prediction cache lookup failed for {model}: {e}")
+            if result is not None:
+                self._record(model, "db_hits")
+                self.memory.set(key, result, ttl_seconds=self.ttl)
+                return result
+
+        self._record(model, "misses")
+        started = time.perf_counter()
+        result = await compute()
+        if cache_if is not None and not cache_if(result):
+            return result
+
+        self.memory.set(key, result, ttl_seconds=self.ttl)
+        if self.persist and persist and user_id is not None:
+            try:
+                await asyncio.to_thread(
+                    self._save, model, version, input_hash, result, user_id,
+                    time.perf_counter() - started
+                )
+            except Exception as e:
+                logger.warning(f"Prediction cache write failed for {model}: {e}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model hit/miss counters and hit rates, plus the LRU's size"""
+        models = {}
+        for model, counters in self._stats.items():
+            lookups = sum(counters.values())
+            hits = counters["memory_hits"] + counters["db_hits"]
+            models[model] = {
+                **counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0
+            }
+        memory = self.memory.stats()
+        return {
+            "persist": self.persist,
+            "entries": memory["total_keys"],
+            "estimated_bytes": memory["estimated_bytes"],
+            "evictions": memory["evictions"],
+            "models": models
+        }
+
+    def clear(self):
+        """Drop the in-memory entries (persisted predictions are kept)"""
+        self.memory.clear()
+
+# Global instance
+prediction_cache = PredictionCache()
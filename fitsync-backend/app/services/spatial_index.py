@@ -0,0 +1,235 @@
+"""
+Spatial Index - bounding-box and R*Tree backed nearby queries over NearbyLocation
+"""
+
+from typing import Dict, List, Sequence, Tuple, Union
+from datetime import datetime
+from sqlalchemy import Column, Float, Integer, MetaData, Table, func, literal_column, or_, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Query, Session
+import logging
+import numpy as np
+
+from app.models.trends import NearbyLocation
+from app.schemas.trends import LocationTypeEnum
+from app.utils.geo import EARTH_RADIUS_KM, bounding_box, haversine_km_many, nearest_within
+
+logger = logging.getLogger(__name__)
+
+RTREE_TABLE = "nearby_locations_rtree"
+
+# R*Tree virtual table mirroring nearby_locations points, kept in sync by triggers.
+# Not part of any declarative metadata so create_all() never tries to create it.
+nearby_locations_rtree = Table(
+    RTREE_TABLE, MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float),
+    Column("max_lat", Float),
+    Column("min_lng", Float),
+    Column("max_lng", Float),
+)
+
+SQLITE_RTREE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_insert AFTER INSERT ON nearby_locations BEGIN
+        INSERT OR REPLACE INTO {RTREE_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_update AFTER UPDATE OF latitude, longitude ON nearby_locations BEGIN
+        INSERT OR REPLACE INTO {RTREE_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_delete AFTER DELETE ON nearby_locations BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+    END""",
+]
+
+SQLITE_RTREE_BACKFILL = f"""
+    INSERT INTO {RTREE_TABLE}
+    SELECT id, latitude, latitude, longitude, longitude FROM nearby_locations
+    WHERE id NOT IN (SELECT id FROM {RTREE_TABLE})
+"""
+
+# Dialects whose SQL has the trig functions needed to rank by distance in the database
+SQL_DISTANCE_DIALECTS = {"postgresql", "mysql", "mariadb"}
+
+class SpatialIndex:
+    """
+    Nearby queries that only touch rows inside the search radius's bounding box.
+
+    On SQLite the box is resolved through an R*Tree virtual table; elsewhere
+    through the latitude/longitude B-tree indexes. Exact distance and top-k
+    run in SQL where the database has trig functions, otherwise vectorized
+    with NumPy over the (small) candidate set.
+    """
+
+    # Whether each engine has the R*Tree table, detected once per process
+    _rtree_available: Dict[int, bool] = {}
+
+    @staticmethod
+    def ensure_rtree(conn: Connection) -> bool:
+        """Create (and backfill) the SQLite R*Tree and its sync triggers if missing"""
+        if conn.dialect.name != "sqlite":
+            return False
+        try:
+            for statement in SQLITE_RTREE_DDL:
+                conn.execute(text(statement))
+            conn.execute(text(SQLITE_RTREE_BACKFILL))
+            SpatialIndex._rtree_available[id(conn.engine)] = True
+            return True
+        except Exception as e:
+            # Older SQLite builds without the rtree module, or no nearby_locations table yet
+            logger.warning(f"SQLite R*Tree spatial index unavailable: {e}")
+            SpatialIndex._rtree_available[id(conn.engine)] = False
+            return False
+
+    @staticmethod
+    def has_rtree(db: Session) -> bool:
+        """Whether the session's database has the R*Tree table"""
+        bind = db.get_bind()
+        if bind.dialect.name != "sqlite":
+            return False
+        key = id(getattr(bind, "engine", bind))
+        if key not in SpatialIndex._rtree_available:
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": RTREE_TABLE}
+            ).first()
+            SpatialIndex._rtree_available[key] = found is not None
+        return SpatialIndex._rtree_available[key]
+
+    @staticmethod
+    def _base_query(db: Session, location_type: Union[str, Sequence[str]], rtree: bool = False) -> Query:
+        """Active public locations of a type, or of any of several types (expired events excluded)"""
+        types = [location_type] if isinstance(location_type, str) else list(location_type)
+        if len(types) == 1:
+            type_match = NearbyLocation.location_type == types[0]
+        else:
+            type_match = NearbyLocation.location_type.in_(types)
+        if rtree:
+            # Mark the type filter as unselective so SQLite drives the lookup
+            # from the R*Tree instead of scanning the location_type index
+            type_match = func.likelihood(type_match, literal_column("0.9"))
+        query = db.query(NearbyLocation).filter(
+            type_match,
+            NearbyLocation.is_active == True,
+            NearbyLocation.is_public == True
+        )
+        if LocationTypeEnum.EVENT.value in types:
+            not_expired = or_(
+                NearbyLocation.expires_at.is_(None),
+                NearbyLocation.expires_at > datetime.utcnow()
+            )
+            if len(types) > 1:
+                not_expired = or_(NearbyLocation.location_type != LocationTypeEnum.EVENT.value, not_expired)
+            query = query.filter(not_expired)
+        return query
+
+    @staticmethod
+    def within_bbox(
+        db: Session,
+        location_type: Union[str, Sequence[str]],
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float
+    ) -> Query:
+        """Query for locations of a type (or types) inside a lat/lng box"""
+        if SpatialIndex.has_rtree(db):
+            rtree = nearby_locations_rtree
+            # R*Tree coordinates are 32-bit floats rounded outwards, so use
+            # overlap tests; exact filtering happens on the distance
+            return SpatialIndex._base_query(db, location_type, rtree=True).join(
+                rtree, rtree.c.id == NearbyLocation.id
+            ).filter(
+                rtree.c.max_lat >= min_lat,
+                rtree.c.min_lat <= max_lat,
+                rtree.c.max_lng >= min_lng,
+                rtree.c.min_lng <= max_lng
+            )
+        return SpatialIndex._base_query(db, location_type).filter(
+            NearbyLocation.latitude.between(min_lat, max_lat),
+            NearbyLocation.longitude.between(min_lng, max_lng)
+        )
+
+    @staticmethod
+    def _sql_distance(lat: float, lng: float):
+        """Haversine distance (km) from (lat, lng) as a SQL expression"""
+        dlat = func.radians(NearbyLocation.latitude - lat)
+        dlng = func.radians(NearbyLocation.longitude - lng)
+        a = (
+            func.power(func.sin(dlat / 2), 2)
+            + func.cos(func.radians(lat)) * func.cos(func.radians(NearbyLocation.latitude))
+            * func.power(func.sin(dlng / 2), 2)
+        )
+        # least() guards asin against rounding just above 1 for antipodal points
+        return 2 * EARTH_RADIUS_KM * func.asin(func.least(func.sqrt(a), 1.0))
+
+    @staticmethod
+    def nearest(
+        db: Session,
+        location_type: str,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        limit: int
+    ) -> List[Tuple[float, NearbyLocation]]:
+        """Closest ``limit`` locations within ``radius_km`` as (distance_km, location), nearest first"""
+        query = SpatialIndex.within_bbox(db, location_type, *bounding_box(lat, lng, radius_km))
+
+        if db.get_bind().dialect.name in SQL_DISTANCE_DIALECTS:
+            distance = SpatialIndex._sql_distance(lat, lng).label("distance_km")
+            rows = (
+                query.add_columns(distance)
+                .filter(distance <= radius_km)
+                .order_by(distance)
+                .limit(limit)
+                .all()
+            )
+            return [(float(distance_km), location) for location, distance_km in rows]
+
+        candidates = query.all()
+        if not candidates:
+            return []
+        distances = haversine_km_many(
+            lat, lng,
+            [location.latitude for location in candidates],
+            [location.longitude for location in candidates]
+        )
+        return [
+            (float(distances[i]), candidates[i])
+            for i in nearest_within(distances, radius_km, limit)
+        ]
+
+    @staticmethod
+    def nearest_by_type(
+        db: Session,
+        limits: Dict[str, int],
+        lat: float,
+        lng: float,
+        radius_km: float
+    ) -> Dict[str, List[Tuple[float, NearbyLocation]]]:
+        """
+        Closest locations of several types from one bounding-box query, keyed by type.
+
+        Every type in ``limits`` is read in the same pass, distances are
+        computed once, and each type keeps its closest ``limits[type]``.
+        """
+        results: Dict[str, List[Tuple[float, NearbyLocation]]] = {location_type: [] for location_type in limits}
+        candidates = SpatialIndex.within_bbox(
+            db, list(limits), *bounding_box(lat, lng, radius_km)
+        ).all()
+        if not candidates:
+            return results
+
+        distances = haversine_km_many(
+            lat, lng,
+            [location.latitude for location in candidates],
+            [location.longitude for location in candidates]
+        )
+        types = np.array([location.location_type for location in candidates])
+        for location_type, limit in limits.items():
+            positions = np.flatnonzero(types == location_type)
+            results[location_type] = [
+                (float(distances[positions[i]]), candidates[positions[i]])
+                for i in nearest_within(distances[positions], radius_km, limit)
+            ]
+        return results
@@ -2,7 +2,6 @@
 Trends Service - Real data operations for fashion trends and content discovery
 """
 
-import math
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
@@ -20,6 +19,8 @@ from app.schemas.trends import (
     OutfitSuggestionItem, LocationTypeEnum
 )
 from app.services.enhanced_ml_service import enhanced_ml_service
+from app.services.spatial_index import SpatialIndex
+from app.utils.geo import haversine_km
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,20 +31,7 @@ class TrendsService:
     @staticmethod
     def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two points using Haversine formula"""
-        R = 6371  # Earth's radius in kilometers
-        
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-        
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return R * c
+        return haversine_km(lat1, lon1, lat2, lon2)
 
     @staticmethod
     async def get_outfit_recommendations(
@@ -537,6 +525,77 @@ class TrendsService:
                 )
             ]
 
+    @staticmethod
+    def get_locations_in_bbox(
+        db: Session,
+        location_type: str,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float
+    ) -> List[NearbyLocation]:
+        """Active public locations of a type inside a lat/lng box (expired events excluded)"""
+        return SpatialIndex.within_bbox(db, location_type, min_lat, max_lat, min_lng, max_lng).all()
+
+    @staticmethod
+    def build_person_response(location: NearbyLocation, distance_km: float) -> NearbyPersonResponse:
+        """Convert a person location to its response format"""
+        metadata = location.location_metadata or {}
+        return NearbyPersonResponse(
+            id=f"u_{location.id}",
+            name=location.name,
+            avatar=location.image_url or "https://example.com/avatar.jpg",
+            distance=f"{distance_km:.1f} km",
+            style=metadata.get('style', 'casual'),
+            mutualConnections=metadata.get('mutualConnections', 0),
+            recentOutfit=metadata.get('recentOutfit', 'Stylish look'),
+            isOnline=metadata.get('isOnline', False),
+            latitude=location.latitude,
+            longitude=location.longitude
+        )
+
+    @staticmethod
+    def build_event_response(location: NearbyLocation, distance_km: float) -> NearbyEventResponse:
+        """Convert an event location to its response format"""
+        metadata = location.location_metadata or {}
+
+        event_date = metadata.get('date', datetime.utcnow().isoformat())
+        if isinstance(event_date, str):
+            try:
+                parsed_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
+                event_date = parsed_date.isoformat() + 'Z'
+            except:
+                event_date = datetime.utcnow().isoformat() + 'Z'
+
+        return NearbyEventResponse(
+            id=f"ev_{location.id}",
+            title=location.name,
+            location=location.address or "Event Location",
+            distance=f"{distance_km:.1f} km",
+            date=event_date,
+            attendees=metadata.get('attendees', 0),
+            image=location.image_url or "https://example.com/event.jpg",
+            category=metadata.get('category', 'fashion'),
+            latitude=location.latitude,
+            longitude=location.longitude
+        )
+
+    @staticmethod
+    def build_hotspot_response(location: NearbyLocation, distance_km: float) -> NearbyHotspotResponse:
+        """Convert a hotspot location to its response format"""
+        metadata = location.location_metadata or {}
+        return NearbyHotspotResponse(
+            id=f"hs_{location.id}",
+            name=location.name,
+            type=metadata.get('type', 'boutique'),
+            distance=f"{distance_km:.1f} km",
+            popularStyles=metadata.get('popularStyles', ['fashion']),
+            rating=metadata.get('rating', 4.0),
+            checkIns=metadata.get('checkIns', 0),
+            latitude=location.latitude,
+            longitude=location.longitude
+        )
+
     @staticmethod
     def get_nearby_people(
         db: Session,
@@ -547,52 +606,16 @@ class TrendsService:
     ) -> List[NearbyPersonResponse]:
         """Get nearby people from database"""
         try:
-            # Query for nearby people within radius
-            # Note: This is a simplified version. For production, use PostGIS or similar for efficient geo queries
-            people_locations = db.query(NearbyLocation).filter(
-                NearbyLocation.location_type == LocationTypeEnum.PERSON.value,
-                NearbyLocation.is_active == True,
-                NearbyLocation.is_public == True
-            ).all()
-            
-            nearby_people = []
-            for location in people_locations:
-                distance_km = TrendsService.calculate_distance(
-                    user_lat, user_lng, location.latitude, location.longitude
-                )
-                
-                if distance_km <= radius_km:
-                    metadata = location.location_metadata or {}
-                    nearby_people.append({
-                        'location': location,
-                        'distance_km': distance_km,
-                        'metadata': metadata
-                    })
-            
-            # Sort by distance and limit results
-            nearby_people.sort(key=lambda x: x['distance_km'])
-            nearby_people = nearby_people[:limit]
+            # Only rows inside the radius's bounding box are read (R*Tree on SQLite)
+            nearby_people = SpatialIndex.nearest(
+                db, LocationTypeEnum.PERSON.value, user_lat, user_lng, radius_km, limit
+            )
             
             # Convert to response format
-            people_responses = []
-            for item in nearby_people:
-                location = item['location']
-                metadata = item['metadata']
-                
-                people_responses.append(NearbyPersonResponse(
-                    id=f"u_{location.id}",
-                    name=location.name,
-                    avatar=location.image_url or "https://example.com/avatar.jpg",
-                    distance=f"{item['distance_km']:.1f} km",
-                    style=metadata.get('style', 'casual'),
-                    mutualConnections=metadata.get('mutualConnections', 0),
-                    recentOutfit=metadata.get('recentOutfit', 'Stylish look'),
-                    isOnline=metadata.get('isOnline', False),
-                    latitude=location.latitude,
-                    longitude=location.longitude
-                ))
-            
-            return people_responses
+            return [
+                TrendsService.build_person_response(location, distance_km)
+                for distance_km, location in nearby_people
+            ]
             
         except Exception as e:
             logger.error(f"Error getting nearby people: {e}")
@@ -608,64 +631,16 @@ class TrendsService:
     ) -> List[NearbyEventResponse]:
         """Get nearby events from database"""
         try:
-            # Query for nearby events within radius and not expired
-            now = datetime.utcnow()
-            event_locations = db.query(NearbyLocation).filter(
-                NearbyLocation.location_type == LocationTypeEnum.EVENT.value,
-                NearbyLocation.is_active == True,
-                NearbyLocation.is_public == True,
-                or_(
-                    NearbyLocation.expires_at.is_(None),
-                    NearbyLocation.expires_at > now
-                )
-            ).all()
-            
-            nearby_events = []
-            for location in event_locations:
-                distance_km = TrendsService.calculate_distance(
-                    user_lat, user_lng, location.latitude, location.longitude
-                )
-                
-                if distance_km <= radius_km:
-                    metadata = location.location_metadata or {}
-                    nearby_events.append({
-                        'location': location,
-                        'distance_km': distance_km,
-                        'metadata': metadata
-                    })
-            
-            # Sort by distance and limit results
-            nearby_events.sort(key=lambda x: x['distance_km'])
-            nearby_events = nearby_events[:limit]
+            # Only rows inside the radius's bounding box are read (R*Tree on SQLite)
+            nearby_events = SpatialIndex.nearest(
+                db, LocationTypeEnum.EVENT.value, user_lat, user_lng, radius_km, limit
+            )
             
             # Convert to response format
-            event_responses = []
-            for item in nearby_events:
-                location = item['location']
-                metadata = item['metadata']
-                
-                event_date = metadata.get('date', datetime.utcnow().isoformat())
-                if isinstance(event_date, str):
-                    try:
-                        parsed_date = datetime.fromisoformat(event_date.replace('Z', '+00:00'))
-                        event_date = parsed_date.isoformat() + 'Z'
-                    except:
-                        event_date = datetime.utcnow().isoformat() + 'Z'
-                
-                event_responses.append(NearbyEventResponse(
-                    id=f"ev_{location.id}",
-                    title=location.name,
-                    location=location.address or "Event Location",
-                    distance=f"{item['distance_km']:.1f} km",
-                    date=event_date,
-                    attendees=metadata.get('attendees', 0),
-                    image=location.image_url or "https://example.com/event.jpg",
-                    category=metadata.get('category', 'fashion'),
-                    latitude=location.latitude,
-                    longitude=location.longitude
-                ))
-            
-            return event_responses
+            return [
+                TrendsService.build_event_response(location, distance_km)
+                for distance_km, location in nearby_events
+            ]
             
         except Exception as e:
             logger.error(f"Error getting nearby events: {e}")
@@ -681,50 +656,16 @@ class TrendsService:
     ) -> List[NearbyHotspotResponse]:
         """Get nearby hotspots from database"""
         try:
-            # Query for nearby hotspots within radius
-            hotspot_locations = db.query(NearbyLocation).filter(
-                NearbyLocation.location_type == LocationTypeEnum.HOTSPOT.value,
-                NearbyLocation.is_active == True,
-                NearbyLocation.is_public == True
-            ).all()
-            
-            nearby_hotspots = []
-            for location in hotspot_locations:
-                distance_km = TrendsService.calculate_distance(
-                    user_lat, user_lng, location.latitude, location.longitude
-                )
-                
-                if distance_km <= radius_km:
-                    metadata = location.location_metadata or {}
-                    nearby_hotspots.append({
-                        'location': location,
-                        'distance_km': distance_km,
-                        'metadata': metadata
-                    })
-            
-            # Sort by distance and limit results
-            nearby_hotspots.sort(key=lambda x: x['distance_km'])
-            nearby_hotspots = nearby_hotspots[:limit]
+            # Only rows inside the radius's bounding box are read (R*Tree on SQLite)
+            nearby_hotspots = SpatialIndex.nearest(
+                db, LocationTypeEnum.HOTSPOT.value, user_lat, user_lng, radius_km, limit
+            )
             
             # Convert to response format
-            hotspot_responses = []
-            for item in nearby_hotspots:
-                location = item['location']
-                metadata = item['metadata']
-                
-                hotspot_responses.append(NearbyHotspotResponse(
-                    id=f"hs_{location.id}",
-                    name=location.name,
-                    type=metadata.get('type', 'boutique'),
-                    distance=f"{item['distance_km']:.1f} km",
-                    popularStyles=metadata.get('popularStyles', ['fashion']),
-                    rating=metadata.get('rating', 4.0),
-                    checkIns=metadata.get('checkIns', 0),
-                    latitude=location.latitude,
-                    longitude=location.longitude
-                ))
-            
-            return hotspot_responses
+            return [
+                TrendsService.build_hotspot_response(location, distance_km)
+                for distance_km, location in nearby_hotspots
+            ]
             
         except Exception as e:
             logger.error(f"Error getting nearby hotspots: {e}")
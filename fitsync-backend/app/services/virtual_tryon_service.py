@@ -363,20 +363,30 @@ class VirtualTryOnService:
         }
 
     @staticmethod
-    async def get_available_features(db: Session) -> List[TryOnFeature]:
+    async def get_available_features(db: Session) -> List[Dict[str, Any]]:
         """Get available try-on features"""
         try:
             # Check cache first
-            cached_features = CacheService.get("tryon_features")
+            cached_features = await CacheService.get("tryon_features")
             if cached_features:
                 return cached_features
             
-            features = db.query(TryOnFeature).filter(
-                TryOnFeature.is_available == True
-            ).all()
+            features = [
+                {
+                    "id": feature.id,
+                    "name": feature.name,
+                    "description": feature.description,
+                    "is_premium": feature.is_premium,
+                    "is_available": feature.is_available,
+                    "requires_gpu": feature.requires_gpu
+                }
+                for feature in db.query(TryOnFeature).filter(
+                    TryOnFeature.is_available == True
+                ).all()
+            ]
             
-            # Cache for 1 hour
-            CacheService.set("tryon_features", features, 3600)
+            # Cache for 1 hour (plain dicts so any backend can serialize them)
+            await CacheService.set("tryon_features", features, 3600)
             
             return features
             
@@ -2,17 +2,24 @@
 Color Analysis Utility for Extracting and Analyzing Color Palettes from Images
 """
 
-import cv2
 import numpy as np
 from typing import List, Tuple, Dict, Any
 import logging
 from dataclasses import dataclass
-from sklearn.cluster import KMeans
-from collections import Counter
 import colorsys
 
 logger = logging.getLogger(__name__)
 
+# Ways ColorAnalyzer.extract_palette can find the colors (see its docstring)
+PALETTE_ENGINES = ("kmeans", "minibatch", "histogram", "median_cut")
+
+# Histogram engines bin each channel to 5 bits (32 x 32 x 32 bins)
+HISTOGRAM_BITS = 5
+# Populated bins closer than this (RGB distance) to a palette color are merged into it
+HISTOGRAM_MERGE_DISTANCE = 40.0
+# Weighted k-means passes over the bins that refine the histogram engines' colors
+HISTOGRAM_ITERATIONS = 10
+
 @dataclass
 class ColorPalette:
     """Color palette data structure"""
@@ -32,14 +39,20 @@ class ColorHarmony:
 class ColorAnalyzer:
     """Color analysis and palette extraction from images"""
     
-    def __init__(self, n_colors: int = 8):
+    def __init__(self, n_colors: int = 8, engine: str = "kmeans", sample_size: int = 20000):
         """
         Initialize color analyzer
         
         Args:
             n_colors: Number of colors to extract from image
+            engine: Palette engine, one of PALETTE_ENGINES (see extract_palette)
+            sample_size: Pixels the minibatch engine clusters
         """
+        if engine not in PALETTE_ENGINES:
+            raise ValueError(f"Unknown palette engine '{engine}'; expected one of {PALETTE_ENGINES}")
         self.n_colors = n_colors
+        self.engine = engine
+        self.sample_size = max(1, sample_size)
         self.color_names = {
             'red': (255, 0, 0),
             'orange': (255, 165, 0),
@@ -63,50 +76,60 @@ class ColorAnalyzer:
             'gold': (255, 215, 0)
         }
     
+    @property
+    def version(self) -> str:
+        """Palette engine configuration, for keying cached palettes"""
+        suffix = f"-{self.sample_size}" if self.engine == "minibatch" else ""
+        return f"{self.engine}-{self.n_colors}{suffix}"
+    
     def extract_palette(self, image: np.ndarray) -> ColorPalette:
         """
         Extract color palette from image
         
+        Engines:
+            kmeans: KMeans with 10 restarts over every pixel; the reference, and the slowest
+            minibatch: MiniBatchKMeans over about sample_size pixels on an evenly spaced grid
+            histogram: 32x32x32 color histogram, most populated bins merged into n_colors colors
+            median_cut: median cut over the same histogram
+        
+        Both histogram engines finish with a few k-means passes over the bins.
+        The faster engines list colors from most to least common and return
+        fewer than n_colors only when the image has fewer distinct colors.
+        
         Args:
             image: Input image (BGR format)
             
         Returns:
             ColorPalette object
         """
+        import cv2
+        
         try:
             # Convert BGR to RGB
             rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             
-            # Reshape image for clustering
-            pixels = rgb_image.reshape(-1, 3)
-            
-            # Apply K-means clustering
-            kmeans = KMeans(n_clusters=self.n_colors, random_state=42, n_init=10)
-            kmeans.fit(pixels)
+            # Palette colors and the number of pixels each one stands for
+            centers, counts = getattr(self, f"_{self.engine}_palette")(rgb_image)
             
             # Get cluster centers (colors)
-            colors = kmeans.cluster_centers_.astype(int)
-            
-            # Get cluster labels and count occurrences
-            labels = kmeans.labels_
-            color_counts = Counter(labels)
+            colors = centers.astype(int)
             
             # Calculate percentages
-            total_pixels = len(labels)
-            percentages = [color_counts[i] / total_pixels * 100 for i in range(self.n_colors)]
+            total_pixels = counts.sum()
+            percentages = [float(count / total_pixels * 100) for count in counts]
             
             # Convert to hex colors
             hex_colors = [self._rgb_to_hex(color) for color in colors]
             
             # Find dominant color
-            dominant_idx = max(range(self.n_colors), key=lambda i: color_counts[i])
-            dominant_color = tuple(colors[dominant_idx])
+            dominant_idx = int(np.argmax(counts))
+            dominant_color = tuple(int(c) for c in colors[dominant_idx])
             
             # Get color names
             color_names = [self._get_color_name(color) for color in colors]
             
             return ColorPalette(
-                colors=[tuple(color) for color in colors],
+                colors=[tuple(int(c) for c in color) for color in colors],
                 percentages=percentages,
                 hex_colors=hex_colors,
                 dominant_color=dominant_color,
@@ -117,6 +140,124 @@ class ColorAnalyzer:
             logger.error(f"Error extracting color palette: {e}")
             raise
     
+    def _kmeans_palette(self, rgb_image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """KMeans over every pixel"""
+        from sklearn.cluster import KMeans
+        
+        # Reshape image for clustering
+        pixels = rgb_image.reshape(-1, 3)
+        
+        # Apply K-means clustering
+        kmeans = KMeans(n_clusters=self.n_colors, random_state=42, n_init=10)
+        kmeans.fit(pixels)
+        return kmeans.cluster_centers_, np.bincount(kmeans.labels_, minlength=self.n_colors)
+    
+    def _minibatch_palette(self, rgb_image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """MiniBatchKMeans over a grid sample; the sample's cluster sizes estimate the image's"""
+        from sklearn.cluster import MiniBatchKMeans
+        
+        # An evenly spaced grid keeps every region of the image represented
+        height, width = rgb_image.shape[:2]
+        step = max(1, int(np.sqrt(height * width / self.sample_size)))
+        sample = rgb_image[step // 2::step, step // 2::step].reshape(-1, 3).astype(np.float32)
+        
+        n_clusters = min(self.n_colors, len(np.unique(sample, axis=0)))
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=2048)
+        kmeans.fit(sample)
+        return self._by_count(kmeans.cluster_centers_, np.bincount(kmeans.labels_, minlength=n_clusters))
+    
+    def _histogram_palette(self, rgb_image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Most populated histogram bins merged with nearby ones, then refined by weighted k-means (_refine_bins)"""
+        means, counts = self._color_histogram(rgb_image)
+        
+        # Walk bins from most to least populated: a bin close to a palette color joins it,
+        # any other starts a new color until there are n_colors
+        centers: List[np.ndarray] = []
+        weights: List[float] = []
+        for i in np.argsort(counts, kind="stable")[::-1][:1024]:
+            if centers:
+                distances = np.linalg.norm(np.asarray(centers) - means[i], axis=1)
+                nearest = int(distances.argmin())
+                if distances[nearest] < HISTOGRAM_MERGE_DISTANCE:
+                    total = weights[nearest] + counts[i]
+                    centers[nearest] = (centers[nearest] * weights[nearest] + means[i] * counts[i]) / total
+                    weights[nearest] = total
+                    continue
+            if len(centers) < self.n_colors:
+                centers.append(means[i].astype(np.float64))
+                weights.append(float(counts[i]))
+        
+        return self._refine_bins(means, counts, np.asarray(centers))
+    
+    def _median_cut_palette(self, rgb_image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Median cut over histogram bins"""
+        means, counts = self._color_histogram(rgb_image)
+        
+        boxes = [np.arange(len(counts))]
+        while len(boxes) < self.n_colors:
+            # Split the box with the largest squared error, along its widest channel, at the
+            # weighted median; large uniform regions stay whole and keep their share
+            best, best_score, best_channel = None, 0.0, 0
+            for b, box in enumerate(boxes):
+                if len(box) < 2:
+                    continue
+                weights = counts[box]
+                deviations = means[box] - np.average(means[box], axis=0, weights=weights)
+                errors = (weights[:, None] * deviations ** 2).sum(axis=0)
+                channel = int(errors.argmax())
+                score = errors.sum()
+                if score > best_score:
+                    best, best_score, best_channel = b, score, channel
+            if best is None:
+                break
+            box = boxes.pop(best)
+            box = box[np.argsort(means[box, best_channel], kind="stable")]
+            cumulative = np.cumsum(counts[box])
+            cut = int(np.searchsorted(cumulative, cumulative[-1] / 2)) + 1
+            cut = min(max(cut, 1), len(box) - 1)
+            boxes += [box[:cut], box[cut:]]
+        
+        centers = np.array([np.average(means[box], axis=0, weights=counts[box]) for box in boxes])
+        # A median split can cut through a color; refining moves such bins to the right side
+        return self._refine_bins(means, counts, centers)
+    
+    @staticmethod
+    def _color_histogram(rgb_image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Populated bins of a 32x32x32 RGB histogram: mean color and pixel count of each"""
+        pixels = rgb_image.reshape(-1, 3)
+        shift = 8 - HISTOGRAM_BITS
+        quantized = (pixels >> shift).astype(np.int32)
+        bins = (quantized[:, 0] << (2 * HISTOGRAM_BITS)) | (quantized[:, 1] << HISTOGRAM_BITS) | quantized[:, 2]
+        size = 1 << (3 * HISTOGRAM_BITS)
+        counts = np.bincount(bins, minlength=size)
+        populated = np.flatnonzero(counts)
+        sums = np.stack(
+            [np.bincount(bins, weights=pixels[:, c], minlength=size)[populated] for c in range(3)], axis=1
+        )
+        counts = counts[populated]
+        return sums / counts[:, None], counts
+    
+    def _refine_bins(self, means: np.ndarray, counts: np.ndarray,
+                     centers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """K-means over histogram bins weighted by pixel count, from the given colors"""
+        labels = None
+        for _ in range(HISTOGRAM_ITERATIONS):
+            new_labels = ((means[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            # Colors left without bins drop out
+            labels = np.unique(new_labels, return_inverse=True)[1]
+            totals = np.bincount(labels, weights=counts)
+            sums = np.stack([np.bincount(labels, weights=counts * means[:, c]) for c in range(3)], axis=1)
+            centers = sums / totals[:, None]
+        return self._by_count(centers, totals)
+    
+    @staticmethod
+    def _by_count(centers: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Palette colors ordered from most to least common"""
+        order = np.argsort(counts, kind="stable")[::-1]
+        return centers[order], counts[order]
+    
     def analyze_color_harmony(self, colors: List[Tuple[int, int, int]]) -> ColorHarmony:
         """
         Analyze color harmony between colors
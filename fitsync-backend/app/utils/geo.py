@@ -0,0 +1,174 @@
+"""
+Geo utilities - distances, bounding boxes and geohash cells for nearby queries
+"""
+
+import math
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_DECODE = {char: index for index, char in enumerate(_GEOHASH_BASE32)}
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometers"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlon = math.radians(lon2 - lon1)
+
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def haversine_km_many(
+    lat: float,
+    lng: float,
+    lats: Union[Sequence[float], np.ndarray],
+    lngs: Union[Sequence[float], np.ndarray]
+) -> np.ndarray:
+    """Great-circle distances (km) from (lat, lng) to every point of ``lats``/``lngs`` in one pass"""
+    lats_rad = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lats_rad - math.radians(lat)
+    dlng = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+
+    a = np.sin(dlat / 2) ** 2 + math.cos(math.radians(lat)) * np.cos(lats_rad) * np.sin(dlng / 2) ** 2
+    # clip guards arcsin against rounding just above 1 for antipodal points
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearest_within(distances: np.ndarray, radius_km: float, limit: int) -> np.ndarray:
+    """
+    Indices of the ``limit`` smallest distances that are within ``radius_km``, nearest first.
+
+    Uses argpartition so only the selected top-k are sorted, not every candidate.
+    """
+    in_range = np.flatnonzero(distances <= radius_km)
+    if limit <= 0 or in_range.size == 0:
+        return in_range[:0]
+    if in_range.size > limit:
+        in_range = in_range[np.argpartition(distances[in_range], limit - 1)[:limit]]
+    # Stable sort keeps input order among equal distances, like list.sort()
+    return in_range[np.argsort(distances[in_range], kind="stable")]
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Lat/lng box that contains every point within ``radius_km`` of (lat, lng).
+
+    Returns (min_lat, max_lat, min_lng, max_lng), clamped to valid ranges
+    (queries crossing the antimeridian are clipped).
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    # Widest longitude span of the circle, reached poleward of its center
+    cos_lat = math.cos(math.radians(lat))
+    ratio = math.sin(min(angle, math.pi / 2)) / cos_lat if cos_lat > 1e-12 else math.inf
+    dlng = 180.0 if ratio >= 1.0 else math.degrees(math.asin(ratio))
+    return (
+        max(lat - dlat, -90.0),
+        min(lat + dlat, 90.0),
+        max(lng - dlng, -180.0),
+        min(lng + dlng, 180.0)
+    )
+
+def geohash_encode(lat: float, lng: float, precision: int = 5) -> str:
+    """Encode a point as a geohash of ``precision`` characters"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+def geohash_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """Bounds of a geohash cell as (min_lat, max_lat, min_lng, max_lng)"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _GEOHASH_DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width (degrees) of a geohash cell at ``precision``"""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+def _lng_gap(a: float, b: float) -> float:
+    """Angular gap between two longitudes in degrees, across the antimeridian if shorter"""
+    return abs((a - b + 180.0) % 360.0 - 180.0)
+
+def min_distance_to_box_km(lat: float, lng: float, box: Tuple[float, float, float, float]) -> float:
+    """Great-circle distance from a point to the nearest point of a lat/lng box"""
+    min_lat, max_lat, min_lng, max_lng = box
+    if min_lng <= lng <= max_lng:
+        # Straight along the point's meridian
+        return haversine_km(lat, lng, min(max(lat, min_lat), max_lat), lng)
+
+    # Otherwise the nearest point is on the closer meridian edge, but not at the
+    # point's latitude: along a meridian the distance is smallest at ``closest``
+    edge = min_lng if _lng_gap(lng, min_lng) <= _lng_gap(lng, max_lng) else max_lng
+    lat_rad = math.radians(lat)
+    closest = math.degrees(math.atan2(
+        math.sin(lat_rad), math.cos(lat_rad) * math.cos(math.radians(edge - lng))
+    ))
+    candidates = [min_lat, max_lat]
+    if min_lat <= closest <= max_lat:
+        candidates.append(closest)
+    return min(haversine_km(lat, lng, candidate, edge) for candidate in candidates)
+
+def covering_geohashes(lat: float, lng: float, radius_km: float, precision: int) -> List[str]:
+    """Geohash cells at ``precision`` that intersect the circle around (lat, lng)"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    cell_lat, cell_lng = geohash_cell_size(precision)
+
+    cells = []
+    seen = set()
+    row_lat = min_lat
+    while True:
+        col_lng = min_lng
+        while True:
+            cell = geohash_encode(min(row_lat, 90.0), min(col_lng, 180.0), precision)
+            if cell not in seen:
+                seen.add(cell)
+                # The margin keeps cells that touch the circle despite rounding
+                if min_distance_to_box_km(lat, lng, geohash_bbox(cell)) <= radius_km + 1e-6:
+                    cells.append(cell)
+            if col_lng >= max_lng:
+                break
+            col_lng = min(col_lng + cell_lng, max_lng)
+        if row_lat >= max_lat:
+            break
+        row_lat = min(row_lat + cell_lat, max_lat)
+
+    return cells
@@ -1,6 +1,4 @@
-import cv2
 import numpy as np
-from PIL import Image
 import io
 import base64
 from typing import Tuple, Optional
@@ -9,6 +7,9 @@ class ImageProcessor:
     @staticmethod
     def process_upload(image_data: bytes) -> np.ndarray:
         """Convert uploaded image to OpenCV format"""
+        import cv2
+        from PIL import Image
+        
         image = Image.open(io.BytesIO(image_data))
         image = image.convert('RGB')
         return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
@@ -16,6 +17,8 @@ class ImageProcessor:
     @staticmethod
     def resize_image(image: np.ndarray, max_size: int = 800) -> np.ndarray:
         """Resize image while maintaining aspect ratio"""
+        import cv2
+        
         height, width = image.shape[:2]
         
         if max(height, width) <= max_size:
@@ -27,6 +30,35 @@ class ImageProcessor:
         
         return cv2.resize(image, (new_width, new_height))
     
+    @staticmethod
+    def perceptual_hash(image: np.ndarray, method: str = "dhash") -> int:
+        """
+        64-bit perceptual hash of a BGR image, stable under re-encoding and resizing
+        
+        dhash compares neighbouring pixels of a 9x8 grayscale thumbnail; phash
+        thresholds the low-frequency 8x8 DCT coefficients of a 32x32 one at
+        their median. Compare hashes of the same method with hamming_distance.
+        """
+        import cv2
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        if method == "dhash":
+            thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+            bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+        elif method == "phash":
+            thumb = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+            low = cv2.dct(thumb)[:8, :8].flatten()
+            # The DC term only carries overall brightness
+            bits = low > np.median(low[1:])
+        else:
+            raise ValueError(f"Unknown perceptual hash method '{method}'")
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+    
+    @staticmethod
+    def hamming_distance(hash_a: int, hash_b: int) -> int:
+        """Number of differing bits between two perceptual hashes"""
+        return bin(hash_a ^ hash_b).count("1")
+    
     @staticmethod
     def extract_dominant_colors(image: np.ndarray, k: int = 5) -> list:
         """Extract dominant colors using K-means"""
@@ -0,0 +1,113 @@
+"""
+Pool of pre-built instances of an object that is expensive to create and not thread-safe
+"""
+
+import contextlib
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+INSTANCE_POOL_WAIT_SECONDS = Histogram(
+    "instance_pool_wait_seconds", "Time a caller waits to check out a pooled model instance", ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+INSTANCE_POOL_IN_USE = Gauge(
+    "instance_pool_in_use", "Pooled model instances currently checked out", ["pool"]
+)
+
+class InstancePool:
+    """
+    Fixed set of instances built up front, each used by one caller at a time.
+
+    ``checkout()`` hands out an idle instance, blocking while all ``size``
+    are in use, and takes it back when the block exits; ``reset`` (if
+    given) runs on the way back so no state leaks to the next caller.
+    Checkouts block, so call it from inference threads, not the event loop.
+    Idle instances are reused most-recently-returned first, which keeps a
+    small working set warm when traffic is light.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        size: int,
+        reset: Optional[Callable[[Any], Any]] = None,
+        close: Optional[Callable[[Any], Any]] = None
+    ):
+        self.name = name
+        self.size = max(1, size)
+        self._reset = reset
+        self._close = close
+        self._instances = [factory() for _ in range(self.size)]
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        for instance in self._instances:
+            self._idle.put(instance)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._stats = {"checkouts": 0, "waits": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    @contextlib.contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Borrow an instance for the duration of the block.
+
+        Raises TimeoutError if none frees up within ``timeout`` seconds
+        (0 fails at once when all are in use, None waits forever).
+        """
+        started = time.perf_counter()
+        waited = False
+        try:
+            instance = self._idle.get_nowait()
+        except queue.Empty:
+            waited = True
+            try:
+                instance = self._idle.get(timeout=None if timeout is None else timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No free {self.name} instance after {timeout}s ({self.size} in use)")
+        wait = time.perf_counter() - started
+        INSTANCE_POOL_WAIT_SECONDS.labels(pool=self.name).observe(wait)
+        INSTANCE_POOL_IN_USE.labels(pool=self.name).inc()
+        with self._lock:
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += wait
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+        try:
+            yield instance
+        finally:
+            if self._reset is not None:
+                try:
+                    self._reset(instance)
+                except Exception as e:
+                    logger.warning(f"Resetting a {self.name} instance failed: {e}")
+            with self._lock:
+                self._in_use -= 1
+            INSTANCE_POOL_IN_USE.labels(pool=self.name).dec()
+            self._idle.put(instance)
+
+    def close(self):
+        """Release every instance; the pool must not be used afterwards"""
+        if self._close is None:
+            return
+        for instance in self._instances:
+            try:
+                self._close(instance)
+            except Exception as e:
+                logger.warning(f"Closing a {self.name} instance failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            in_use = self._in_use
+        stats["wait_seconds"] = round(stats["wait_seconds"], 4)
+        stats["max_wait_seconds"] = round(stats["max_wait_seconds"], 4)
+        return {"size": self.size, "in_use": in_use, **stats}
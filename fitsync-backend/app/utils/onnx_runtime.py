@@ -0,0 +1,208 @@
+"""
+ONNX Runtime helpers - tuned CPU sessions, INT8 quantization and YOLO pre/post-processing without torch
+"""
+
+import ast
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Try to import ONNX Runtime at module level
+try:
+    import onnxruntime as ort  # type: ignore
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+    ort = None
+
+logger = logging.getLogger(__name__)
+
+def create_session(model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0):
+    """
+    CPU inference session for an ONNX model.
+
+    ``intra_op_threads`` parallelizes inside an operator (convolutions, GEMMs)
+    and is what matters for these sequential conv nets; ``inter_op_threads``
+    only helps graphs with independent branches, so parallel execution is
+    enabled just when it is above 1. 0 leaves the choice to ONNX Runtime.
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise RuntimeError("onnxruntime is not installed")
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = (
+        ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1 else ort.ExecutionMode.ORT_SEQUENTIAL
+    )
+    session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    logger.info(
+        f"ONNX Runtime session for {model_path} "
+        f"(intra_op_threads={intra_op_threads}, inter_op_threads={inter_op_threads})"
+    )
+    return session
+
+def model_metadata(session) -> Dict[str, str]:
+    """Custom metadata stored in the model (Ultralytics exports keep class names there)"""
+    return dict(session.get_modelmeta().custom_metadata_map)
+
+def yolo_class_names(session) -> Dict[int, str]:
+    names = model_metadata(session).get("names")
+    return {int(k): v for k, v in ast.literal_eval(names).items()} if names else {}
+
+def letterbox(image: np.ndarray, size: int = 640, color: int = 114) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping aspect ratio and pad to ``size`` x ``size``, as Ultralytics does.
+
+    Returns the padded image, the scale applied and the (left, top) padding.
+    """
+    h, w = image.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    dw, dh = (size - new_w) / 2, (size - new_h) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(color,) * 3)
+    return padded, ratio, (left, top)
+
+def yolo_input(images: List[np.ndarray], size: int = 640) -> Tuple[np.ndarray, List[Tuple[float, Tuple[int, int]]]]:
+    """NCHW float32 RGB batch in [0, 1] from BGR images, plus each image's letterbox transform"""
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    transforms = []
+    for i, image in enumerate(images):
+        padded, ratio, pad = letterbox(image, size)
+        batch[i] = padded[:, :, ::-1].transpose(2, 0, 1) / 255.0
+        transforms.append((ratio, pad))
+    return batch, transforms
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression; indices kept, highest score first"""
+    order = scores.argsort()[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+def yolo_postprocess(
+    prediction: np.ndarray,
+    transform: Tuple[float, Tuple[int, int]],
+    image_shape: Tuple[int, ...],
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.7,
+    max_det: int = 300
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Boxes (xyxy, original image pixels), confidences and class ids from one
+    YOLOv8 output of shape (4 + classes, anchors), with per-class NMS and the
+    Ultralytics default thresholds.
+    """
+    prediction = prediction.T
+    class_scores = prediction[:, 4:]
+    classes = class_scores.argmax(1)
+    confidences = class_scores[np.arange(len(classes)), classes]
+    mask = confidences > conf_threshold
+    xywh, confidences, classes = prediction[mask, :4], confidences[mask], classes[mask]
+
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    # Offset boxes by class so one NMS pass never suppresses across classes
+    keep = nms(boxes + classes[:, None] * 7680.0, confidences, iou_threshold)[:max_det]
+    boxes, confidences, classes = boxes[keep], confidences[keep], classes[keep]
+
+    ratio, (left, top) = transform
+    boxes = (boxes - [left, top, left, top]) / ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+    return boxes, confidences, classes
+
+QUANTIZATION_MODES = ("dynamic", "static")
+
+def quantize(
+    model_path: str,
+    output_path: str,
+    mode: str = "static",
+    calibration_batches: Optional[Iterable[np.ndarray]] = None
+) -> str:
+    """
+    Write an INT8 copy of an fp32 ONNX model; returns ``output_path``.
+
+    ``dynamic`` quantizes the weights only and scales activations per run, so
+    it needs no calibration but runs convolutions through the slow
+    ConvInteger kernel. ``static`` (QDQ, per-channel weights) fixes the
+    activation ranges from ``calibration_batches`` (model inputs, MinMax)
+    and is the mode that speeds conv nets up on CPU.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode {mode!r}; expected one of {QUANTIZATION_MODES}")
+    if not ONNXRUNTIME_AVAILABLE:
+        raise RuntimeError("onnxruntime is not installed")
+    from onnxruntime import quantization as ortq
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if mode == "dynamic":
+        ortq.quantize_dynamic(model_path, output_path, weight_type=ortq.QuantType.QInt8, per_channel=True)
+        logger.info(f"Quantized {model_path} to {output_path} (dynamic)")
+        return output_path
+
+    batches = list(calibration_batches or [])
+    if not batches:
+        raise ValueError("Static quantization needs calibration batches")
+
+    class _Reader(ortq.CalibrationDataReader):
+        def __init__(self, name: str):
+            self.feeds = iter([{name: batch.astype(np.float32)} for batch in batches])
+
+        def get_next(self):
+            return next(self.feeds, None)
+
+    input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    # Shape inference and graph cleanup first, as ONNX Runtime recommends before static quantization
+    prepared = f"{output_path}.prep.onnx"
+    quant_pre_process(model_path, prepared)
+    try:
+        ortq.quantize_static(
+            prepared, output_path, _Reader(input_name),
+            quant_format=ortq.QuantFormat.QDQ,
+            activation_type=ortq.QuantType.QUInt8,
+            weight_type=ortq.QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=ortq.CalibrationMethod.MinMax
+        )
+    finally:
+        if os.path.exists(prepared):
+            os.remove(prepared)
+    logger.info(f"Quantized {model_path} to {output_path} ({mode}, {len(batches)} calibration batches)")
+    return output_path
+
+def session_input(session) -> Tuple[str, List[Any]]:
+    """Name and shape (ints, or strings for dynamic axes) of the model's first input"""
+    node = session.get_inputs()[0]
+    return node.name, list(node.shape)
+
+def run(session, batch: np.ndarray) -> np.ndarray:
+    """First output of ``session`` for ``batch``, split into chunks if the model has a fixed batch size"""
+    name, shape = session_input(session)
+    fixed = shape[0] if isinstance(shape[0], int) else None
+    if not fixed or len(batch) <= fixed:
+        return session.run(None, {name: batch})[0]
+    return np.concatenate([
+        session.run(None, {name: batch[i:i + fixed]})[0] for i in range(0, len(batch), fixed)
+    ])
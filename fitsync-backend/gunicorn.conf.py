@@ -0,0 +1,30 @@
+"""
+Gunicorn settings for production
+Run from the fitsync-backend directory with: gunicorn -c gunicorn.conf.py app.main:app
+
+With ML_PRELOAD_MODELS=true the master imports the app and builds the
+fork-safe eager models before forking, so every worker shares torch,
+ultralytics and the weights copy-on-write instead of loading its own copy.
+"""
+
+import gc
+
+from app.config import settings
+
+bind = f"{settings.host}:{settings.port}"
+workers = settings.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+preload_app = settings.ml_preload_models
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker forks
+    if not settings.ml_preload_models:
+        return
+    from app.services.ml_model_manager import ml_model_manager
+
+    timings = ml_model_manager.preload()
+    # Move everything built so far out of the collector's reach, so a worker's
+    # GC passes don't write to (and so copy) the shared pages
+    gc.freeze()
+    server.log.info(f"Preloaded models for {workers} workers: {sorted(timings)}")
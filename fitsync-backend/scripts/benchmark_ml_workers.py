@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark ML execution modes on palette extraction
+
+Runs the same batch of synthetic clothing crops through ColorAnalyzer
+in-process (one after another), on a thread pool and on MLWorkerPool
+(worker processes fed through shared memory) and reports throughput.
+Run this from the fitsync-backend directory with:
+    python scripts/benchmark_ml_workers.py --images 64 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Single-threaded BLAS/OpenMP (set before numpy loads) so the comparison measures the execution mode
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import numpy as np
+
+from app.services.ml_worker_pool import MLWorkerPool
+from app.utils.color_analysis import ColorAnalyzer
+
+def make_images(count: int, size: int):
+    """Blocky multi-colour crops with noise, roughly like resized clothing regions"""
+    rng = np.random.default_rng(7)
+    images = []
+    for _ in range(count):
+        blocks = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+        image = np.kron(blocks, np.ones((size // 8, size // 8, 1), dtype=np.uint8))
+        noise = rng.integers(-12, 13, size=image.shape)
+        images.append(np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+    return images
+
+def analyze(analyzer: ColorAnalyzer, image: np.ndarray):
+    palette = analyzer.extract_palette(image)
+    return palette, analyzer.analyze_color_harmony(palette.colors)
+
+def run_in_process(images):
+    analyzer = ColorAnalyzer()
+    return [analyze(analyzer, image) for image in images]
+
+def run_thread_pool(images, workers: int):
+    analyzer = ColorAnalyzer()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda image: analyze(analyzer, image), images))
+
+def run_process_pool(pool: MLWorkerPool, images, workers: int):
+    with ThreadPoolExecutor(max_workers=workers) as dispatch:
+        return list(dispatch.map(lambda image: pool.call("color_analysis", image), images))
+
+def report(name: str, count: int, elapsed: float, baseline: float):
+    print(f"  {name:<14} {elapsed:8.2f}s  {count / elapsed:8.2f} img/s  x{baseline / elapsed:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--size", type=int, default=256, help="Crop edge in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--start-method", default="spawn")
+    args = parser.parse_args()
+
+    images = make_images(args.images, args.size)
+    print(f"{args.images} images of {args.size}x{args.size}, {args.workers} workers")
+
+    started = time.perf_counter()
+    expected = run_in_process(images)
+    baseline = time.perf_counter() - started
+    report("in-process", args.images, baseline, baseline)
+
+    started = time.perf_counter()
+    threaded = run_thread_pool(images, args.workers)
+    report("thread pool", args.images, time.perf_counter() - started, baseline)
+
+    pool = MLWorkerPool(workers=args.workers, start_method=args.start_method)
+    print(f"  process pool startup (model load): {pool.start():.2f}s")
+    try:
+        started = time.perf_counter()
+        processed = run_process_pool(pool, images, args.workers)
+        report("process pool", args.images, time.perf_counter() - started, baseline)
+    finally:
+        pool.shutdown()
+
+    for results in (threaded, processed):
+        assert [p.hex_colors for p, _ in results] == [p.hex_colors for p, _ in expected], "palettes differ"
+    print("All modes produced identical palettes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark nearby location queries on a synthetic SQLite database
+
+Compares the old full-table scan (load every location of a type, Python
+haversine, full sort) with SpatialIndex using the lat/lng B-tree bounding-box
+prefilter and the SQLite R*Tree.
+Run this from the fitsync-backend directory with:
+    python scripts/benchmark_nearby.py --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Column, Integer, Table, create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.trends import NearbyLocation
+from app.schemas.trends import LocationTypeEnum
+from app.services.spatial_index import SpatialIndex
+from app.utils.geo import haversine_km
+
+# Synthetic population: clusters around city centers plus uniform background
+CITY_CENTERS = [
+    (40.71, -74.01), (34.05, -118.24), (41.88, -87.63), (29.76, -95.37),
+    (33.45, -112.07), (39.95, -75.17), (29.42, -98.49), (32.72, -117.16),
+    (32.78, -96.80), (37.34, -121.89), (30.27, -97.74), (47.61, -122.33),
+    (39.74, -104.99), (42.36, -71.06), (25.76, -80.19), (45.52, -122.68),
+]
+LOCATION_TYPES = [t.value for t in (LocationTypeEnum.PERSON, LocationTypeEnum.EVENT, LocationTypeEnum.HOTSPOT)]
+
+def build_database(path: str, rows: int):
+    """Create nearby_locations with ``rows`` synthetic locations and the R*Tree"""
+    engine = create_engine(f"sqlite:///{path}")
+    # nearby_locations references users.id, which lives in another metadata
+    if "users" not in NearbyLocation.metadata.tables:
+        Table("users", NearbyLocation.metadata, Column("id", Integer, primary_key=True))
+    NearbyLocation.metadata.create_all(engine, tables=[NearbyLocation.__table__])
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        batch = []
+        for i in range(rows):
+            if rng.random() < 0.8:
+                lat, lng = rng.choice(CITY_CENTERS)
+                lat, lng = rng.gauss(lat, 0.2), rng.gauss(lng, 0.2)
+            else:
+                lat, lng = rng.uniform(25.0, 49.0), rng.uniform(-125.0, -67.0)
+            location_type = rng.choice(LOCATION_TYPES)
+            expires_at = None
+            if location_type == LocationTypeEnum.EVENT.value:
+                expires_at = now + timedelta(days=rng.choice([-1, 7]))
+            batch.append((location_type, f"loc {i}", lat, lng, "{}", 1, 1, expires_at))
+            if len(batch) == 50000:
+                conn.exec_driver_sql(
+                    "INSERT INTO nearby_locations (location_type, name, latitude, longitude, "
+                    "location_metadata, is_active, is_public, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+                batch = []
+        if batch:
+            conn.exec_driver_sql(
+                "INSERT INTO nearby_locations (location_type, name, latitude, longitude, "
+                "location_metadata, is_active, is_public, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+    print(f"Inserted {rows:,} locations in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        SpatialIndex.ensure_rtree(conn)
+    print(f"Built R*Tree in {time.perf_counter() - started:.1f}s")
+    return engine
+
+def full_scan(db, location_type, lat, lng, radius_km, limit):
+    """The pre-index implementation: every row of the type, Python distance, full sort"""
+    query = SpatialIndex._base_query(db, location_type)
+    nearby = []
+    for location in query.all():
+        distance_km = haversine_km(lat, lng, location.latitude, location.longitude)
+        if distance_km <= radius_km:
+            nearby.append((distance_km, location))
+    nearby.sort(key=lambda x: x[0])
+    return nearby[:limit]
+
+def run(name, engine, method, points, radius_km, limit, use_rtree=True):
+    """Time ``method`` over ``points`` for every location type"""
+    db = sessionmaker(bind=engine)()
+    SpatialIndex._rtree_available[id(engine)] = use_rtree
+    timings = []
+    results = []
+    for lat, lng in points:
+        for location_type in LOCATION_TYPES:
+            db.expunge_all()
+            started = time.perf_counter()
+            found = method(db, location_type, lat, lng, radius_km, limit)
+            timings.append((time.perf_counter() - started) * 1000)
+            results.append([location.id for _, location in found])
+    db.close()
+
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<22} mean {statistics.mean(timings):9.2f} ms   p50 {statistics.median(timings):9.2f} ms   p95 {p95:9.2f} ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic locations")
+    parser.add_argument("--queries", type=int, default=50, help="Query points for the indexed methods")
+    parser.add_argument("--full-scan-queries", type=int, default=3, help="Query points for the full-scan baseline (0 skips it)")
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--db", help="SQLite file to use (default: a temporary file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "nearby_benchmark.db")
+    if os.path.exists(path):
+        os.remove(path)
+    engine = build_database(path, args.rows)
+
+    rng = random.Random(7)
+    points = [
+        (lat + rng.uniform(-0.1, 0.1), lng + rng.uniform(-0.1, 0.1))
+        for lat, lng in (rng.choice(CITY_CENTERS) for _ in range(args.queries))
+    ]
+
+    with engine.connect() as conn:
+        db = sessionmaker(bind=conn)()
+        SpatialIndex._rtree_available[id(engine)] = True
+        query = SpatialIndex.within_bbox(db, LOCATION_TYPES[0], 40.6, 40.8, -74.1, -73.9)
+        plan = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + str(query.statement.compile(compile_kwargs={"literal_binds": True}))
+        ).fetchall()
+        print("R*Tree query plan: " + " | ".join(row[-1] for row in plan))
+
+    print(f"\n{args.rows:,} locations, radius {args.radius_km} km, limit {args.limit}, 3 types per point")
+    if args.full_scan_queries:
+        baseline = run("full table scan", engine, full_scan, points[:args.full_scan_queries], args.radius_km, args.limit)
+    btree = run("bbox (lat/lng B-tree)", engine, SpatialIndex.nearest, points, args.radius_km, args.limit, use_rtree=False)
+    rtree = run("bbox (R*Tree)", engine, SpatialIndex.nearest, points, args.radius_km, args.limit, use_rtree=True)
+
+    assert btree == rtree, "B-tree and R*Tree results differ"
+    if args.full_scan_queries:
+        assert baseline == rtree[:len(baseline)], "Indexed results differ from the full scan"
+    print("\nResults identical across methods")
+
+    engine.dispose()
+    if not args.db:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark ColorAnalyzer palette engines: quality (ΔE against full KMeans) versus latency
+
+Extracts the palette of every image with each engine and compares it with
+the full-pixel KMeans palette in CIELAB: for each reference color the
+distance to the nearest engine color and vice versa, weighted by their
+percentages (CIE76 ΔE; below ~2.3 is barely noticeable). Also reports the
+dominant-color ΔE, the mean ΔE of each pixel to its nearest palette color
+(how well the palette covers the image, whatever KMeans found) and the
+milliseconds per image.
+Run this from the fitsync-backend directory with:
+    python scripts/benchmark_palette_engines.py --image-dir uploads --images 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.utils.color_analysis import PALETTE_ENGINES, ColorAnalyzer
+
+def make_images(count: int, size: int, image_dir: str = None):
+    """BGR images from image_dir (resized like uploads), or synthetic garment-like ones"""
+    import cv2
+
+    from app.utils.image_processing import ImageProcessor
+
+    images = []
+    if image_dir:
+        for name in sorted(os.listdir(image_dir)):
+            image = cv2.imread(os.path.join(image_dir, name))
+            if image is not None:
+                images.append(ImageProcessor.resize_image(image, size))
+            if len(images) == count:
+                break
+    if not images:
+        rng = np.random.default_rng(5)
+        for _ in range(count):
+            # A few smooth color regions with shading and sensor noise
+            coarse = rng.integers(0, 256, size=(4, 3, 3), dtype=np.uint8)
+            image = cv2.resize(coarse, (size * 3 // 4, size), interpolation=cv2.INTER_NEAREST)
+            shade = np.linspace(0.7, 1.1, image.shape[0])[:, None, None]
+            noise = rng.normal(0, 6, image.shape)
+            images.append(np.clip(image * shade + noise, 0, 255).astype(np.uint8))
+    return images
+
+def to_lab(colors) -> np.ndarray:
+    import cv2
+
+    rgb = np.asarray(colors, dtype=np.float32).reshape(-1, 1, 3) / 255.0
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2Lab).reshape(-1, 3)
+
+def palette_delta_e(reference, palette) -> float:
+    """Percentage-weighted nearest-color ΔE, averaged over both directions"""
+    ref_lab, lab = to_lab(reference.colors), to_lab(palette.colors)
+    distances = np.linalg.norm(ref_lab[:, None] - lab[None], axis=2)
+    forward = np.average(distances.min(axis=1), weights=reference.percentages)
+    backward = np.average(distances.min(axis=0), weights=palette.percentages)
+    return float((forward + backward) / 2)
+
+def pixel_delta_e(image: np.ndarray, palette) -> float:
+    """Mean ΔE between each pixel (every 4th row and column) and its nearest palette color"""
+    import cv2
+
+    pixels = to_lab(cv2.cvtColor(image[::4, ::4], cv2.COLOR_BGR2RGB).reshape(-1, 3))
+    distances = np.linalg.norm(pixels[:, None] - to_lab(palette.colors)[None], axis=2)
+    return float(distances.min(axis=1).mean())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--size", type=int, default=800, help="longest side, as after upload resizing")
+    parser.add_argument("--image-dir", default=None, help="photos to use (synthetic if empty)")
+    parser.add_argument("--n-colors", type=int, default=8)
+    parser.add_argument("--sample-size", type=int, default=20000, help="pixels for the minibatch engine")
+    args = parser.parse_args()
+
+    images = make_images(args.images, args.size, args.image_dir)
+    results = {}
+    for engine in PALETTE_ENGINES:
+        analyzer = ColorAnalyzer(args.n_colors, engine=engine, sample_size=args.sample_size)
+        # First call pays for imports
+        analyzer.extract_palette(images[0][:16, :16])
+        palettes, elapsed = [], 0.0
+        for image in images:
+            started = time.perf_counter()
+            palettes.append(analyzer.extract_palette(image))
+            elapsed += time.perf_counter() - started
+        results[engine] = (elapsed / len(images), palettes)
+
+    reference_latency, reference = results["kmeans"]
+    shape = images[0].shape
+    print(f"{len(images)} images of about {shape[1]}x{shape[0]}, {args.n_colors} colors, {os.cpu_count()} CPUs")
+    print(f"  {'engine':<12} {'ms/image':>9} {'speedup':>8} {'palette ΔE':>11} {'max ΔE':>7} "
+          f"{'dominant ΔE':>12} {'pixel ΔE':>9}")
+    for engine, (latency, palettes) in results.items():
+        delta_e = [palette_delta_e(ref, palette) for ref, palette in zip(reference, palettes)]
+        dominant = [
+            float(np.linalg.norm(to_lab([ref.dominant_color]) - to_lab([palette.dominant_color])))
+            for ref, palette in zip(reference, palettes)
+        ]
+        coverage = [pixel_delta_e(image, palette) for image, palette in zip(images, palettes)]
+        print(f"  {engine:<12} {latency * 1000:9.1f} {reference_latency / latency:7.1f}x "
+              f"{np.mean(delta_e):11.2f} {np.max(delta_e):7.2f} {np.mean(dominant):12.2f} {np.mean(coverage):9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark INT8 quantization of the try-on generator against fp32
+
+Runs the same person/clothing pairs through the generator in torch fp32,
+ONNX Runtime fp32 and ONNX Runtime INT8 (dynamic and static), each in a
+fresh process, and reports generator latency per image, peak memory
+added by the model (Linux), model file size and PSNR of the generator
+output against torch fp32.
+Run this from the fitsync-backend directory with:
+    python scripts/benchmark_tryon_quantization.py --calibration-dir data/tryon_samples --images 16
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+MODES = {
+    # name: (backend, quantization)
+    "torch fp32": ("torch", "none"),
+    "onnx fp32": ("onnx", "none"),
+    "onnx int8 dyn": ("onnx", "dynamic"),
+    "onnx int8 static": ("onnx", "static"),
+}
+
+def make_pairs(count: int, image_dir: str = None):
+    """(person, clothing) BGR pairs from image_dir, or smooth synthetic images"""
+    import cv2
+
+    images = []
+    if image_dir:
+        for name in sorted(os.listdir(image_dir)):
+            image = cv2.imread(os.path.join(image_dir, name))
+            if image is not None:
+                images.append(image)
+    if len(images) < 2:
+        rng = np.random.default_rng(11)
+        images = [
+            cv2.GaussianBlur(cv2.resize(rng.integers(0, 256, size=(8, 6, 3), dtype=np.uint8), (384, 512),
+                                        interpolation=cv2.INTER_CUBIC), (0, 0), 6)
+            for _ in range(count + 1)
+        ]
+    return [(images[i % len(images)], images[(i + 1) % len(images)]) for i in range(count)]
+
+def memory_mb(field: str) -> float:
+    """VmRSS (current) or VmHWM (peak) of this process from /proc, in MB (Linux only)"""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def measure(mode: str, args, model_path: str, onnx_path: str):
+    """Runs in a fresh process: (seconds per image, peak MB added by the model, generator outputs)"""
+    from app.models.generation.virtual_tryon import VirtualTryOnModel
+
+    backend, quantization = MODES[mode]
+    pairs = make_pairs(args.images, args.eval_dir)
+    baseline = memory_mb("VmRSS")
+    # Reset the peak so imports before this point do not count
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    model = VirtualTryOnModel(
+        model_path, "cpu", backend=backend, onnx_path=onnx_path,
+        intra_op_threads=args.intra_op_threads, quantization=quantization
+    )
+    inputs = [model.preprocess_images(person, clothing) for person, clothing in pairs]
+    model._forward(inputs[0])
+
+    outputs = []
+    started = time.perf_counter()
+    for input_tensor in inputs:
+        outputs.append(model._forward(input_tensor))
+    elapsed = (time.perf_counter() - started) / len(inputs)
+    return elapsed, memory_mb("VmHWM") - baseline, outputs
+
+def psnr(reference, outputs) -> float:
+    """PSNR of generator outputs against the reference; outputs span [-1, 1], a range of 2"""
+    mse = np.mean([np.mean((r.astype(np.float64) - o.astype(np.float64)) ** 2) for r, o in zip(reference, outputs)])
+    return float("inf") if mse == 0 else 10 * np.log10(2.0 ** 2 / mse)
+
+def file_mb(path: str) -> float:
+    return sum(os.path.getsize(p) for p in (path, path + ".data") if os.path.exists(p)) / 2 ** 20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=None, help="generator weights (default: VIRTUAL_TRYON_MODEL, random if missing)")
+    parser.add_argument("--images", type=int, default=16, help="image pairs timed per mode")
+    parser.add_argument("--eval-dir", default=None, help="images to evaluate on (synthetic if empty)")
+    parser.add_argument("--calibration-dir", default=None, help="images to calibrate static quantization on")
+    parser.add_argument("--calibration-samples", type=int, default=32)
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    args = parser.parse_args()
+
+    import torch
+
+    from app.config import settings
+    from app.models.generation.virtual_tryon import VirtualTryOnModel
+
+    work_dir = tempfile.mkdtemp(prefix="tryon-quant-")
+    model_path = args.model or settings.virtual_tryon_model
+    if not os.path.exists(model_path):
+        print(f"{model_path} not found; using random weights (PSNR then only reflects quantization error)")
+        model_path = os.path.join(work_dir, "tryon_model.pt")
+        torch.save(VirtualTryOnModel(device="cpu").model.state_dict(), model_path)
+
+    # Export and quantize up front so the timed processes only load the files
+    onnx_path = os.path.join(work_dir, "tryon_model.onnx")
+    model = VirtualTryOnModel(model_path, "cpu", onnx_path=onnx_path)
+    model.export_onnx()
+    paths = {"torch fp32": model_path, "onnx fp32": onnx_path}
+    for name, (_, quantization) in MODES.items():
+        if quantization != "none":
+            started = time.perf_counter()
+            paths[name] = model.quantize(quantization, args.calibration_dir, args.calibration_samples)
+            print(f"{quantization} quantization took {time.perf_counter() - started:.1f}s")
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for mode in MODES:
+        with ctx.Pool(1) as pool:
+            results[mode] = pool.apply(measure, (mode, args, model_path, onnx_path))
+
+    reference = results["torch fp32"][2]
+    base_latency = results["torch fp32"][0]
+    print(f"\n{args.images} images, {os.cpu_count()} CPUs")
+    print(f"  {'mode':<18} {'ms/image':>9} {'speedup':>8} {'peak MB':>8} {'file MB':>8} {'PSNR dB':>8}")
+    for mode, (elapsed, peak_mb, outputs) in results.items():
+        print(f"  {mode:<18} {elapsed * 1000:9.1f} {base_latency / elapsed:7.2f}x {peak_mb:8.1f} "
+              f"{file_mb(paths[mode]):8.1f} {psnr(reference, outputs):8.1f}")
+
+if __name__ == "__main__":
+    main()
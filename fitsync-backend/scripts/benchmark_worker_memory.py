@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory with and without pre-fork model preloading
+
+Mimics gunicorn: a master process forks N workers that each initialize the
+model registry (clothing detector and try-on generator eager) and serve a
+few requests. With --preload the master first runs ml_model_manager.preload()
+and gc.freeze(), as gunicorn.conf.py does. Each mode runs in a fresh
+process; reports RSS, PSS (shared pages split between the processes
+mapping them) and private memory per worker, from /proc (Linux only).
+Run this from the fitsync-backend directory with:
+    python scripts/benchmark_worker_memory.py --workers 4
+"""
+
+import argparse
+import asyncio
+import gc
+import multiprocessing as mp
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+def memory_mb() -> dict:
+    """Rss, Pss and Private (clean + dirty) of this process in MB, from smaps_rollup"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            match = re.match(r"(\w+):\s+(\d+) kB", line)
+            if match:
+                fields[match.group(1)] = int(match.group(2)) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "private": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+async def serve(requests: int):
+    """What a worker does: start up the registry, then run a few detections and try-ons"""
+    from app.services.ml_model_manager import ml_model_manager
+
+    await ml_model_manager.initialize()
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+    for _ in range(requests):
+        await ml_model_manager.detect_clothing(image)
+        async with ml_model_manager.lease("virtual_tryon") as loaded:
+            loaded.model.generate_tryon(image, image)
+    shared = [name for name, status in (await ml_model_manager.get_model_status()).items() if status.get("shared")]
+    return shared
+
+def run_master(preload: bool, workers: int, requests: int, output):
+    """Runs in a fresh process: fork the workers and report their memory, measured while all are alive"""
+    if preload:
+        from app.services.ml_model_manager import ml_model_manager
+
+        ml_model_manager.preload()
+        gc.freeze()
+
+    ctx = mp.get_context("fork")
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+
+    def worker():
+        try:
+            shared = asyncio.run(serve(requests))
+        except BaseException:
+            # Don't leave the master and the other workers waiting for this one
+            barrier.abort()
+            raise
+        # Measure only once every worker is up, so shared pages are split between all of them
+        barrier.wait()
+        results.put((memory_mb(), shared))
+        barrier.wait()
+
+    processes = [ctx.Process(target=worker) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    collected = [results.get() for _ in processes]
+    barrier.wait()
+    for process in processes:
+        process.join()
+    output.put(collected)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2, help="detections and try-ons per worker")
+    parser.add_argument("--backend", default="torch", help="ML_INFERENCE_BACKEND for the workers")
+    args = parser.parse_args()
+
+    # Read by app.config in the fresh processes below
+    os.environ["ML_EAGER_MODELS"] = '["clothing_detector", "virtual_tryon"]'
+    os.environ["ML_INFERENCE_BACKEND"] = args.backend
+
+    ctx = mp.get_context("spawn")
+    print(f"{args.workers} workers, {args.backend} backend, {os.cpu_count()} CPUs (MB per worker)")
+    print(f"  {'mode':<12} {'RSS':>8} {'PSS':>8} {'private':>8}  shared models")
+    for preload in (False, True):
+        output = ctx.Queue()
+        master = ctx.Process(target=run_master, args=(preload, args.workers, args.requests, output))
+        master.start()
+        collected = output.get()
+        master.join()
+        mean = {key: np.mean([memory[key] for memory, _ in collected]) for key in ("rss", "pss", "private")}
+        shared = ", ".join(collected[0][1]) or "-"
+        print(f"  {'preload' if preload else 'per-worker':<12} {mean['rss']:8.0f} {mean['pss']:8.0f} "
+              f"{mean['private']:8.0f}  {shared}")
+
+if __name__ == "__main__":
+    main()
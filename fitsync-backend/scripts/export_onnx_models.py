@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Export the clothing detector and try-on generator to ONNX and check them
+
+Each model is exported (to the configured *_onnx_model path, or next to its
+weights), then the raw network output of ONNX Runtime is compared with the
+torch model on the same input batch and both are timed. Exits non-zero if
+any output differs by more than --tolerance.
+Run this from the fitsync-backend directory with:
+    python scripts/export_onnx_models.py --batch 4 --runs 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+
+from app.config import settings
+from app.utils import onnx_runtime
+
+def timed(fn, runs: int) -> float:
+    """Mean seconds per call after one warmup call"""
+    fn()
+    started = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - started) / runs
+
+def make_images(count: int):
+    rng = np.random.default_rng(3)
+    return [rng.integers(0, 256, size=(480 + 40 * i, 640, 3), dtype=np.uint8) for i in range(count)]
+
+def check_detector(args):
+    from ultralytics import YOLO
+
+    from app.models.detection.clothing_detector import ClothingDetector
+
+    detector = ClothingDetector(settings.clothing_detection_model, "cpu")
+    onnx_path = detector.export_onnx(settings.clothing_detection_onnx_model or None)
+    session = onnx_runtime.create_session(onnx_path, args.intra_op_threads, args.inter_op_threads)
+    batch, _ = onnx_runtime.yolo_input(make_images(args.batch))
+
+    net = YOLO(detector.model_path).model.float().eval()
+    with torch.no_grad():
+        torch_run = lambda: net(torch.from_numpy(batch))[0].numpy()
+        expected = torch_run()
+        onnx_run = lambda: onnx_runtime.run(session, batch)
+        return onnx_path, np.abs(expected - onnx_run()).max(), timed(torch_run, args.runs), timed(onnx_run, args.runs)
+
+def check_tryon(args):
+    from app.models.generation.virtual_tryon import VirtualTryOnModel
+
+    model = VirtualTryOnModel(settings.virtual_tryon_model, "cpu")
+    onnx_path = model.export_onnx(settings.virtual_tryon_onnx_model or None)
+    session = onnx_runtime.create_session(onnx_path, args.intra_op_threads, args.inter_op_threads)
+    width, height = model.TARGET_SIZE
+    batch = torch.rand(args.batch, 7, height, width) * 2 - 1
+
+    with torch.no_grad():
+        torch_run = lambda: model.model(batch).numpy()
+        expected = torch_run()
+        onnx_run = lambda: onnx_runtime.run(session, batch.numpy())
+        return onnx_path, np.abs(expected - onnx_run()).max(), timed(torch_run, args.runs), timed(onnx_run, args.runs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="max absolute output difference")
+    parser.add_argument("--intra-op-threads", type=int, default=settings.onnx_intra_op_threads)
+    parser.add_argument("--inter-op-threads", type=int, default=settings.onnx_inter_op_threads)
+    parser.add_argument("--skip-detector", action="store_true", help="only export the try-on generator")
+    args = parser.parse_args()
+
+    checks = [("virtual_tryon", check_tryon)]
+    if not args.skip_detector:
+        checks.insert(0, ("clothing_detector", check_detector))
+
+    failed = False
+    for name, check in checks:
+        onnx_path, diff, torch_time, onnx_time = check(args)
+        ok = diff <= args.tolerance
+        failed |= not ok
+        print(f"{name}: {onnx_path}")
+        print(f"  max abs diff {diff:.2e} ({'OK' if ok else 'FAIL'}, tolerance {args.tolerance:.0e})")
+        print(f"  torch {torch_time * 1000:8.1f} ms/batch  onnx {onnx_time * 1000:8.1f} ms/batch  "
+              f"x{torch_time / onnx_time:.2f}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test script for the cache backends behind CacheService
+Runs the Redis backend against fakeredis (pip install fakeredis), no server needed.
+Run this from the fitsync-backend directory with: python test_cache_backends.py
+"""
+
+import asyncio
+
+from app.services.cache_backends import InMemoryBackend, InMemoryCache, RedisBackend, TieredBackend
+
+def _fake_redis_backend() -> RedisBackend:
+    import fakeredis.aioredis
+    return RedisBackend(client=fakeredis.aioredis.FakeRedis(), key_prefix="test:")
+
+async def _exercise_backend(backend):
+    await backend.clear()
+    
+    await backend.set("categories", ["tops", "bottoms"], 60)
+    assert await backend.get("categories") == ["tops", "bottoms"]
+    assert await backend.get("missing") is None
+    
+    await backend.set_many({"trending_now:a": {"n": 1}, "trending_now:b": {"n": 2}}, 60)
+    found = await backend.get_many(["trending_now:a", "trending_now:b", "trending_now:c"])
+    assert found == {"trending_now:a": {"n": 1}, "trending_now:b": {"n": 2}}
+    
+    assert sorted(await backend.keys("trending_now:*")) == ["trending_now:a", "trending_now:b"]
+    assert await backend.delete("trending_now:a", "nope") == 1
+    
+    stats = await backend.stats()
+    assert stats["namespaces"]["categories"]["hits"] == 1
+    
+    await backend.clear()
+    assert await backend.keys() == []
+    await backend.close()
+
+async def _exercise_tags(backend):
+    await backend.clear()
+    await backend.set("outfit_recommendations:user_id:1", {"a": 1}, 60, ["user:1"])
+    await backend.set("outfit_recommendations:user_id:12", {"a": 12}, 60, ["user:12"])
+    await backend.set("nearby_people:cell", [], 60, ["geo:1:2", "geo:1:3"])
+    
+    assert await backend.invalidate_tags("user:1") == ["outfit_recommendations:user_id:1"]
+    assert await backend.get("outfit_recommendations:user_id:12") == {"a": 12}
+    assert await backend.invalidate_tags("geo:1:3", "geo:9:9") == ["nearby_people:cell"]
+    assert await backend.invalidate_tags("user:1") == []
+    await backend.close()
+
+def test_in_memory_backend():
+    asyncio.run(_exercise_backend(InMemoryBackend(max_entries=100)))
+    asyncio.run(_exercise_tags(InMemoryBackend(max_entries=100)))
+    print("✅ In-memory backend OK")
+
+def test_redis_backend():
+    asyncio.run(_exercise_backend(_fake_redis_backend()))
+    asyncio.run(_exercise_tags(_fake_redis_backend()))
+    print("✅ Redis backend (fakeredis) OK")
+
+def test_redis_server_side_ttl():
+    async def run():
+        backend = _fake_redis_backend()
+        await backend.set("explore_items:x", {"items": []}, 30)
+        ttl = await backend.client.ttl("test:explore_items:x")
+        assert 0 < ttl <= 30
+        await backend.close()
+    asyncio.run(run())
+    print("✅ Server-side TTL OK")
+
+def test_redis_single_flight_lock():
+    async def run():
+        backend = _fake_redis_backend()
+        token = await backend.acquire_lock("trending_now:x", 5)
+        assert token is not None
+        assert await backend.acquire_lock("trending_now:x", 5) is None
+        assert await backend.is_locked("trending_now:x")
+        await backend.release_lock("trending_now:x", "not-the-owner")
+        assert await backend.is_locked("trending_now:x")
+        await backend.release_lock("trending_now:x", token)
+        assert not await backend.is_locked("trending_now:x")
+        assert await backend.keys() == []  # locks live outside the data prefix
+        await backend.close()
+    asyncio.run(run())
+    print("✅ Single-flight lock OK")
+
+def test_redis_tag_sets_drop_expired_members():
+    async def run():
+        backend = _fake_redis_backend()
+        for user_id in range(20):
+            await backend.set(f"outfit_recommendations:user_id:{user_id}", {}, 1, ["namespace:outfit_recommendations"])
+        await asyncio.sleep(1.1)
+        await backend.set("outfit_recommendations:user_id:99", {}, 60, ["namespace:outfit_recommendations"])
+        tag_key = backend._tag_key("namespace:outfit_recommendations")
+        assert await backend.client.zcard(tag_key) == 1
+        assert await backend.invalidate_tags("namespace:outfit_recommendations") == ["outfit_recommendations:user_id:99"]
+        assert await backend.client.zcard(tag_key) == 0
+        await backend.close()
+    asyncio.run(run())
+    print("✅ Expired members pruned from Redis tag sets")
+
+def test_redis_bytes_roundtrip():
+    async def run():
+        backend = _fake_redis_backend()
+        entry = {"__response__": True, "body": b'{"styles":[]}', "gzip": b"\x1f\x8b\x08\x00", "etag": '"abc"'}
+        await backend.set("trending_styles:fmt:body", entry, 60)
+        assert await backend.get("trending_styles:fmt:body") == entry
+    asyncio.run(run())
+    print("✅ Pre-serialized bytes round-trip OK")
+
+def test_tiered_invalidation_reaches_other_workers():
+    async def run():
+        import fakeredis
+        import fakeredis.aioredis
+        server = fakeredis.FakeServer()
+        
+        def worker() -> TieredBackend:
+            l2 = RedisBackend(client=fakeredis.aioredis.FakeRedis(server=server), key_prefix="test:")
+            return TieredBackend(l1=InMemoryCache(max_entries=100), l2=l2, l1_ttl=30)
+        
+        a, b = worker(), worker()
+        await a.start()
+        await b.start()
+        await asyncio.sleep(0.1)
+        
+        await a.set("trending_styles:limit:10", ["v1"], 60)
+        assert await b.get("trending_styles:limit:10") == ["v1"]  # now in b's L1
+        
+        await a.set("trending_styles:limit:10", ["v2"], 60)
+        await asyncio.sleep(0.1)
+        assert await b.get("trending_styles:limit:10") == ["v2"]
+        
+        await a.clear()
+        await asyncio.sleep(0.1)
+        assert await b.get("trending_styles:limit:10") is None
+        
+        await a.close()
+        await b.close()
+    asyncio.run(run())
+    print("✅ Tiered L1 invalidation OK")
+
+def test_gzip_negotiation_honours_q_values():
+    from starlette.requests import Request
+    
+    from app.services.cache_service import CachedResponse
+    
+    cached = CachedResponse.encode({"styles": ["classic"] * 200})
+    
+    def encoding(accept_encoding):
+        headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+        response = cached.render(Request({"type": "http", "method": "GET", "path": "/", "headers": headers}))
+        return response.headers.get("content-encoding")
+    
+    assert encoding("gzip, deflate") == "gzip"
+    assert encoding("br;q=1.0, gzip;q=0.5") == "gzip"
+    assert encoding("*") == "gzip"
+    assert encoding("gzip;q=0") is None
+    assert encoding("gzip; q=0.0, deflate") is None
+    assert encoding("*;q=1, gzip;q=0") is None
+    assert encoding("identity") is None
+    assert encoding(None) is None
+    print("✅ Gzip served only when Accept-Encoding allows it")
+
+def test_warm_up_fills_the_entry_the_endpoint_serves():
+    import json
+    
+    from starlette.requests import Request
+    
+    from app.api.v1.endpoints.ml_recommendations import load_categories
+    from app.config import settings
+    from app.services.cache_service import CacheService
+    
+    def not_warmed():
+        raise AssertionError("endpoint recomputed a warmed entry")
+    
+    saved = settings.cache_serialized_responses
+    try:
+        for serialized in (True, False):
+            settings.cache_serialized_responses = serialized
+            async def run():
+                await CacheService.clear_all_cache()
+                await CacheService.warm_response("categories", load_categories)
+                request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+                return await CacheService.cached_response(request, "categories", not_warmed)
+            response = asyncio.run(run())
+            assert response.status_code == 200
+            assert json.loads(response.body) == load_categories()
+    finally:
+        settings.cache_serialized_responses = saved
+        asyncio.run(CacheService.clear_all_cache())
+    print("✅ Warm-up fills the entry the endpoint serves")
+
+if __name__ == "__main__":
+    test_in_memory_backend()
+    test_redis_backend()
+    test_redis_server_side_ttl()
+    test_redis_single_flight_lock()
+    test_redis_tag_sets_drop_expired_members()
+    test_redis_bytes_roundtrip()
+    test_tiered_invalidation_reaches_other_workers()
+    test_gzip_negotiation_honours_q_values()
+    test_warm_up_fills_the_entry_the_endpoint_serves()
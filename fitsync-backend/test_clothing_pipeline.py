@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for the staged multi-item clothing analysis pipeline
+Run this from the fitsync-backend directory with: python test_clothing_pipeline.py
+"""
+
+import asyncio
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.models.recommendation.style_matcher import StyleMatcher
+
+def _outfit(size=(480, 640)) -> np.ndarray:
+    """BGR photo with a navy, a red and a white garment side by side"""
+    image = np.full((size[0], size[1], 3), 128, dtype=np.uint8)
+    image[:, :200] = (128, 0, 0)
+    image[:, 200:400] = (0, 0, 230)
+    image[:, 400:] = (250, 250, 250)
+    return image
+
+def test_style_classification_is_batched_over_palettes():
+    palettes = [
+        {'color_names': ['navy', 'white'], 'percentages': [70.0, 30.0]},
+        {'color_names': ['red', 'orange'], 'percentages': [60.0, 40.0]},
+        {'color_names': ['purple'], 'percentages': [100.0]},
+    ]
+    styles = StyleMatcher().classify_styles(palettes)
+    assert [s and s['style'] for s in styles] == ['classic', 'casual', None]
+    assert styles[0]['confidence'] == 1.0 and styles[1]['confidence'] == 0.6
+    assert StyleMatcher().classify_styles([]) == []
+    print("✅ Batched style classification OK")
+
+def test_items_analyzed_stage_by_stage():
+    from app.services.enhanced_ml_service import EnhancedMLService
+    from app.services.inference_executor import inference_executor
+    from app.services.ml_model_manager import ml_model_manager
+    from app.services.prediction_cache import prediction_cache
+
+    async def fake_detect(image):
+        return [
+            {"class": "jacket", "confidence": 0.9, "bbox": [0, 0, 200, 480]},
+            {"class": "shirt", "confidence": 0.8, "bbox": [200, 0, 400, 480]},
+            {"class": "pants", "confidence": 0.7, "bbox": [400, 0, 700, 480]},
+            # Entirely outside the image after clipping
+            {"class": "shoes", "confidence": 0.6, "bbox": [650, 10, 700, 20]},
+        ]
+
+    service = EnhancedMLService()
+    service._initialized = True
+    palette_calls = []
+    executor_run = inference_executor.run
+
+    async def counting_run(fn, *args, task=None, **kwargs):
+        if task == "color_palette":
+            palette_calls.append(args[0].shape)
+        return await executor_run(fn, *args, task=task, **kwargs)
+    style_batches = []
+    classify_styles = StyleMatcher.classify_styles
+
+    def counting_classify(self, palettes):
+        style_batches.append(len(palettes))
+        return classify_styles(self, palettes)
+
+    saved = (ml_model_manager.detect_clothing, dict(ml_model_manager.status), prediction_cache.persist, settings.debug)
+    ml_model_manager.detect_clothing = fake_detect
+    inference_executor.run = counting_run
+    ml_model_manager.status["clothing_detector"] = {"status": "ready"}
+    prediction_cache.persist = False
+    StyleMatcher.classify_styles = counting_classify
+    settings.debug = True
+    prediction_cache.clear()
+    try:
+        async def run():
+            # Default config: the style matcher is not eager, the first analysis loads it
+            ml_model_manager._register_defaults()
+            assert not await ml_model_manager.is_model_ready("style_matcher")
+            image_data = cv2.imencode(".png", _outfit())[1].tobytes()
+            first = await service.analyze_clothing_image(image_data, user_id=5151)
+            again = await service.analyze_clothing_image(image_data, user_id=5151)
+            return first, again
+        result, again = asyncio.run(run())
+    finally:
+        ml_model_manager.detect_clothing = saved[0]
+        del inference_executor.run
+        ml_model_manager.status.clear()
+        ml_model_manager.status.update(saved[1])
+        prediction_cache.persist = saved[2]
+        settings.debug = saved[3]
+        StyleMatcher.classify_styles = classify_styles
+        asyncio.run(ml_model_manager.cleanup())
+
+    # Three crops, one executor call per palette and one style call; the repeat (not
+    # stored whole, as one item failed) takes its palettes from the palette cache
+    assert sorted(palette_calls) == [(480, 200, 3), (480, 200, 3), (480, 240, 3)] and style_batches == [3, 3]
+    items = result['items']
+    assert [item['style_classification']['style'] for item in items[:3]] == ['classic', 'casual', 'classic']
+    assert items[3]['error'] == "empty detection box"
+    metadata = result['metadata']
+    assert not metadata['cached']
+    assert {'decode', 'detection', 'crop', 'color_palette', 'style_classification'} <= set(metadata['timings_ms'])
+    assert not again['metadata']['cached'] and again['items'] == items
+    print("✅ Items analyzed stage by stage, timings in debug metadata")
+
+if __name__ == "__main__":
+    test_style_classification_is_batched_over_palettes()
+    test_items_analyzed_stage_by_stage()
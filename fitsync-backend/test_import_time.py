@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the API app
+Workers that only serve auth or social routes must not pay for the ML stack
+at boot. Set IMPORT_TIME_BUDGET (seconds) to tune the budget per machine.
+Run this from the fitsync-backend directory with: python test_import_time.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Libraries that may only load once a model or an image operation needs them
+HEAVY_MODULES = (
+    "torch", "torchvision", "mediapipe", "sklearn", "scipy", "ultralytics",
+    "cv2", "onnxruntime", "pandas", "tensorflow", "transformers",
+)
+BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET", "3.5"))
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+def _import_app() -> dict:
+    """Import app.main in a fresh interpreter; returns its import time and heavy modules loaded"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_app_import_skips_heavy_libraries():
+    loaded = _import_app()["heavy"]
+    assert not loaded, f"import app.main loaded {loaded}; import them where they are used"
+    print("✅ No heavy ML libraries at import")
+
+def test_app_import_within_budget():
+    # Best of three, so a busy machine doesn't fail the budget
+    seconds = min(_import_app()["seconds"] for _ in range(3))
+    assert seconds <= BUDGET_SECONDS, f"import app.main took {seconds:.2f}s (budget {BUDGET_SECONDS}s)"
+    print(f"✅ import app.main in {seconds:.2f}s (budget {BUDGET_SECONDS}s)")
+
+if __name__ == "__main__":
+    test_app_import_skips_heavy_libraries()
+    test_app_import_within_budget()
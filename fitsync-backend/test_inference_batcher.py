@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test script for the micro-batching scheduler in front of ML models
+Run this from the fitsync-backend directory with: python test_inference_batcher.py
+"""
+
+import asyncio
+import time
+
+from app.services.inference_batcher import MicroBatcher
+
+def _doubling_model(calls):
+    def batch_fn(items):
+        calls.append(len(items))
+        time.sleep(0.01)
+        if "bad" in items:
+            raise ValueError("bad input")
+        return [item * 2 for item in items]
+    return batch_fn
+
+def test_concurrent_requests_share_batches():
+    async def run():
+        calls = []
+        batcher = MicroBatcher("test", _doubling_model(calls), max_batch_size=8, max_wait_ms=5)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(20)])
+        assert results == [i * 2 for i in range(20)]
+        assert calls == [8, 8, 4]
+        assert batcher.stats()["batches"] == 3
+        await batcher.close()
+    asyncio.run(run())
+    print("✅ Micro-batching OK")
+
+def test_batch_error_reaches_every_request():
+    async def run():
+        batcher = MicroBatcher("test", _doubling_model([]), max_batch_size=4, max_wait_ms=5)
+        results = await asyncio.gather(batcher.submit(1), batcher.submit("bad"), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        # The worker survives a failed batch
+        assert await batcher.submit(3) == 6
+        await batcher.close()
+    asyncio.run(run())
+    print("✅ Micro-batching errors OK")
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_batches()
+    test_batch_error_reaches_every_request()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded ML inference executor
+Run this from the fitsync-backend directory with: python test_inference_executor.py
+"""
+
+import asyncio
+import threading
+import time
+
+from app.core.exceptions import InferenceCapacityError, InferenceTimeoutError
+from app.services.inference_executor import InferenceExecutor
+
+def test_runs_off_the_event_loop():
+    async def run():
+        executor = InferenceExecutor(max_concurrent=2, max_queue=2, timeout=5)
+        loop_thread = threading.get_ident()
+        assert await executor.run(lambda x, y=1: x + y, 1, y=2) == 3
+        assert await executor.run(threading.get_ident) != loop_thread
+        executor.shutdown()
+    asyncio.run(run())
+    print("✅ Inference pool OK")
+
+def test_rejects_when_queue_is_full():
+    async def run():
+        executor = InferenceExecutor(max_concurrent=1, max_queue=1, timeout=5)
+        results = await asyncio.gather(
+            *[executor.run(time.sleep, 0.1, task="sleep") for _ in range(3)],
+            return_exceptions=True
+        )
+        # One running, one queued, one rejected
+        assert sum(isinstance(r, InferenceCapacityError) for r in results) == 1
+        assert executor.stats()["completed"] == 2
+        executor.shutdown()
+    asyncio.run(run())
+    print("✅ Inference backpressure OK")
+
+def test_timeout_keeps_slot_until_work_finishes():
+    async def run():
+        executor = InferenceExecutor(max_concurrent=1, max_queue=0, timeout=0.05)
+        try:
+            await executor.run(time.sleep, 0.3, task="slow")
+            assert False, "expected a timeout"
+        except InferenceTimeoutError:
+            pass
+        # The timed-out call is still running, so there is no free slot
+        assert executor.stats()["running"] == 1
+        try:
+            await executor.run(time.sleep, 0, task="fast")
+            assert False, "expected a rejection"
+        except InferenceCapacityError:
+            pass
+        await asyncio.sleep(0.35)
+        assert executor.stats()["running"] == 0
+        await executor.run(time.sleep, 0, task="fast")
+        executor.shutdown()
+    asyncio.run(run())
+    print("✅ Inference timeouts OK")
+
+if __name__ == "__main__":
+    test_runs_off_the_event_loop()
+    test_rejects_when_queue_is_full()
+    test_timeout_keeps_slot_until_work_finishes()
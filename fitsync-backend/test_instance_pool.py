@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the model instance pool (used for MediaPipe Pose graphs)
+Run this from the fitsync-backend directory with: python test_instance_pool.py
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.instance_pool import INSTANCE_POOL_WAIT_SECONDS, InstancePool
+
+class FakeGraph:
+    """Stands in for a Pose graph: fails if two threads use it at once"""
+    def __init__(self):
+        self.busy = False
+        self.frames = 0
+        self.resets = 0
+        self.closed = False
+
+    def process(self):
+        assert not self.busy, "graph used by two callers at once"
+        self.busy = True
+        time.sleep(0.01)
+        self.frames += 1
+        self.busy = False
+
+    def reset(self):
+        self.frames = 0
+        self.resets += 1
+
+def test_instances_are_built_up_front_and_never_shared():
+    built = []
+    pool = InstancePool("test_exclusive", lambda: built.append(FakeGraph()) or built[-1], size=3)
+    assert len(built) == 3
+
+    def call(_):
+        with pool.checkout() as graph:
+            graph.process()
+            return graph
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        used = list(executor.map(call, range(40)))
+    assert {id(graph) for graph in used} <= {id(graph) for graph in built}
+    assert sum(graph.frames for graph in built) == 40
+    stats = pool.stats()
+    assert stats["checkouts"] == 40 and stats["in_use"] == 0 and stats["size"] == 3
+    # Eight callers on three graphs must have queued
+    assert stats["waits"] > 0 and stats["max_wait_seconds"] > 0
+    print("✅ Pooled instances built once and used by one caller at a time")
+
+def test_waits_are_instrumented_and_bounded():
+    pool = InstancePool("test_wait", FakeGraph, size=1)
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.checkout():
+            held.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    for timeout in (0.05, 0):
+        try:
+            with pool.checkout(timeout=timeout):
+                raise AssertionError("checked out a busy instance")
+        except TimeoutError:
+            pass
+    threading.Timer(0.05, release.set).start()
+    with pool.checkout(timeout=5) as graph:
+        graph.process()
+    holder.join()
+
+    samples = {s.name: s.value for s in INSTANCE_POOL_WAIT_SECONDS.collect()[0].samples
+               if s.labels.get("pool") == "test_wait"}
+    assert samples["instance_pool_wait_seconds_count"] == 2
+    assert samples["instance_pool_wait_seconds_sum"] >= 0.04
+    print("✅ Pool waits recorded and bounded by the timeout")
+
+def test_reset_on_return_and_close():
+    pool = InstancePool("test_reset", FakeGraph, size=1, reset=lambda g: g.reset(),
+                        close=lambda g: setattr(g, "closed", True))
+    with pool.checkout() as graph:
+        graph.process()
+        graph.process()
+        assert graph.frames == 2
+    assert graph.frames == 0 and graph.resets == 1
+    pool.close()
+    assert graph.closed
+    print("✅ Instances reset on return and closed with the pool")
+
+if __name__ == "__main__":
+    test_instances_are_built_up_front_and_never_shared()
+    test_waits_are_instrumented_and_bounded()
+    test_reset_on_return_and_close()
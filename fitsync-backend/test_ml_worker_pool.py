@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for the process-based ML worker pool
+Run this from the fitsync-backend directory with: python test_ml_worker_pool.py
+"""
+
+import asyncio
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.services.ml_worker_pool import MLWorkerPool, share_image
+from app.utils.color_analysis import ColorAnalyzer
+
+def _image():
+    rng = np.random.default_rng(3)
+    blocks = rng.integers(0, 256, size=(4, 4, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((16, 16, 1), dtype=np.uint8))
+
+def test_share_image_round_trip():
+    image = _image()
+    block, (name, shape, dtype) = share_image(image)
+    try:
+        attached = shared_memory.SharedMemory(name=name)
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=attached.buf)
+        assert np.array_equal(view, image)
+        del view
+        attached.close()
+    finally:
+        block.close()
+        block.unlink()
+    print("✅ Shared memory round trip OK")
+
+def test_worker_pool_matches_in_process():
+    image = _image()
+    expected = ColorAnalyzer().extract_palette(image)
+
+    pool = MLWorkerPool(workers=2)
+    try:
+        pool.start()
+        palette, harmony = pool.call("color_analysis", image)
+        # Non-contiguous views are copied before sharing
+        crop_palette, _ = asyncio.run(pool.run("color_analysis", image[::2, ::2]))
+    finally:
+        pool.shutdown()
+
+    assert palette.hex_colors == expected.hex_colors
+    assert palette.percentages == expected.percentages
+    assert 0.0 <= harmony.harmony_score <= 1.0
+    assert crop_palette.hex_colors
+    assert pool.stats()["tasks"] == 2 and pool.stats()["errors"] == 0
+    print("✅ Worker pool results match in-process analysis")
+
+if __name__ == "__main__":
+    test_share_image_round_trip()
+    test_worker_pool_matches_in_process()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test script for the ML model registry (lazy loading, warmup, hot swap)
+Run this from the fitsync-backend directory with: python test_model_registry.py
+"""
+
+import asyncio
+
+from app.config import settings
+from app.services.ml_model_manager import MLModelManager, ModelSpec
+
+class FakeModel:
+    def __init__(self, version: str):
+        self.version = version
+        self.warmed_up = False
+        self.closed = False
+
+    def cleanup(self):
+        self.closed = True
+
+def _spec(name: str = "fake", versions=None, fail_on=()):
+    """Spec whose n-th load builds version versions[n]; loads listed in fail_on raise"""
+    versions = list(versions or ["v1", "v2", "v3"])
+    loads = []
+
+    async def load():
+        loads.append(len(loads))
+        await asyncio.sleep(0.01)
+        if len(loads) - 1 in fail_on:
+            raise RuntimeError("corrupt weights")
+        return FakeModel(versions[len(loads) - 1])
+
+    def warmup(model):
+        model.warmed_up = True
+
+    spec = ModelSpec(name=name, load=load, version=lambda: versions[len(loads)], warmup=warmup)
+    return spec, loads
+
+def test_lazy_load_happens_once_and_is_warmed_up():
+    manager = MLModelManager()
+    spec, loads = _spec()
+    manager.register(spec)
+
+    async def run():
+        assert not await manager.is_model_ready("fake") and not loads
+
+        async def use():
+            async with manager.lease("fake") as loaded:
+                return loaded.model
+        return await asyncio.gather(*(use() for _ in range(5)))
+
+    models = asyncio.run(run())
+    assert len(loads) == 1 and all(model is models[0] for model in models)
+    assert models[0].warmed_up
+    status = manager.status["fake"]
+    assert status["status"] == "ready" and status["version"] == "v1"
+    assert status["load_time"] >= 0.01 and status["memory_bytes"] >= 0
+    print("✅ Lazy loading and warmup OK")
+
+def test_reload_swaps_and_drains_in_flight_requests():
+    manager = MLModelManager()
+    spec, _ = _spec()
+    manager.register(spec)
+
+    async def run():
+        release = asyncio.Event()
+        held = asyncio.Event()
+
+        async def slow_request():
+            async with manager.lease("fake") as loaded:
+                held.set()
+                await release.wait()
+                return loaded.model
+
+        request = asyncio.create_task(slow_request())
+        await held.wait()
+        reload = asyncio.create_task(manager.reload("fake"))
+        await asyncio.sleep(0.05)
+
+        # New requests already get v2 while the old request still runs on v1
+        async with manager.lease("fake") as loaded:
+            assert loaded.model.version == "v2"
+        old = manager._loaded["fake"]
+        assert not reload.done()
+
+        release.set()
+        old_model = await request
+        result = await reload
+        return old_model, old.model, result
+
+    old_model, new_model, result = asyncio.run(run())
+    assert old_model.version == "v1" and old_model.closed
+    assert new_model.version == "v2" and not new_model.closed
+    assert result == {"fake": {"status": "reloaded", "version": "v2", "previous_version": "v1"}}
+    print("✅ Hot swap drains in-flight requests")
+
+def test_failed_reload_keeps_current_version():
+    manager = MLModelManager()
+    spec, _ = _spec(fail_on=(1,))
+    manager.register(spec)
+
+    async def run():
+        await manager.load("fake")
+        result = await manager.reload()
+        async with manager.lease("fake") as loaded:
+            return result, loaded.model
+
+    result, model = asyncio.run(run())
+    assert result["fake"]["status"] == "error"
+    assert model.version == "v1" and not model.closed
+    assert manager.status["fake"]["reload_error"] == "corrupt weights"
+    print("✅ Failed reload keeps the current version")
+
+def test_preloaded_model_is_adopted_by_first_load_only():
+    manager = MLModelManager()
+    spec, loads = _spec()
+    spec.shareable = lambda: True
+    spec.prepare_shared = lambda model: setattr(model, "prepared", True)
+    manager.register(spec)
+    other, other_loads = _spec("per_worker")
+    manager.register(other)
+    settings.ml_eager_models, eager = ["fake", "per_worker"], settings.ml_eager_models
+    try:
+        timings = manager.preload()
+    finally:
+        settings.ml_eager_models = eager
+    # Only shareable models are built before fork
+    assert list(timings) == ["fake"] and len(loads) == 1 and not other_loads
+
+    async def run():
+        async with manager.lease("fake") as loaded:
+            first = loaded
+        await manager.reload("fake")
+        async with manager.lease("fake") as loaded:
+            return first, loaded
+
+    first, reloaded = asyncio.run(run())
+    assert first.model.prepared and first.model.warmed_up and first.shared
+    # A reload builds a fresh, worker-private version
+    assert len(loads) == 2 and reloaded.model.version == "v2" and not reloaded.shared
+    print("✅ Preloaded model adopted once, reload builds a private copy")
+
+def test_recommendation_models_load_on_first_use():
+    from app.services.enhanced_ml_service import EnhancedMLService
+    from app.services.ml_model_manager import ml_model_manager
+
+    service = EnhancedMLService()
+    service._initialized = True
+    context = {
+        "clothing_history": [{"color_primary": "navy"}, {"color_primary": "white", "fit_type": "clean"}],
+        "color_preferences": {"navy": 0.9, "red": 0.2},
+    }
+
+    ml_model_manager._register_defaults()
+    spec = ml_model_manager.specs["user_profiler"]
+    load = spec.load
+
+    async def run():
+        # Default config: neither model is eager, so nothing has loaded them yet
+        assert "style_matcher" not in settings.ml_eager_models
+        assert not await ml_model_manager.is_model_ready("style_matcher")
+        loaded = await service.get_user_recommendations(7, context)
+
+        # A model that fails to load only drops its section
+        await ml_model_manager.cleanup()
+        async def broken():
+            raise RuntimeError("corrupt weights")
+        spec.load = broken
+        return loaded, await service.get_user_recommendations(7, context)
+
+    try:
+        result, degraded = asyncio.run(run())
+    finally:
+        asyncio.run(ml_model_manager.cleanup())
+        spec.load = load
+    recommendations = result["recommendations"]
+    assert [style["style"] for style in recommendations["style"]["styles"]] == ["classic", "minimalist"]
+    assert recommendations["profile"]["insights"][0]["value"] == "navy"
+    assert set(degraded["recommendations"]) == {"style"}
+    print("✅ Recommendation models load on first use")
+
+if __name__ == "__main__":
+    test_lazy_load_happens_once_and_is_warmed_up()
+    test_reload_swaps_and_drains_in_flight_requests()
+    test_failed_reload_keeps_current_version()
+    test_preloaded_model_is_adopted_by_first_load_only()
+    test_recommendation_models_load_on_first_use()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for perceptual hashing and near-duplicate upload reuse
+Run this from the fitsync-backend directory with: python test_near_duplicates.py
+"""
+
+import asyncio
+
+import cv2
+import numpy as np
+
+from app.services.near_duplicate_index import NearDuplicateIndex
+from app.utils.image_processing import ImageProcessor
+
+def _photo(seed: int, size=(600, 480)) -> np.ndarray:
+    """Smooth synthetic photo (BGR)"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(6, 5, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(cv2.resize(coarse, (size[1], size[0]), interpolation=cv2.INTER_CUBIC), (0, 0), 3)
+
+def _jpeg(image: np.ndarray, quality: int = 60) -> bytes:
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+def test_perceptual_hash_tolerates_reencoding_and_resizing():
+    original = _photo(1)
+    reencoded = cv2.imdecode(np.frombuffer(_jpeg(original), np.uint8), cv2.IMREAD_COLOR)
+    resized = cv2.resize(original, (240, 300), interpolation=cv2.INTER_AREA)
+    for method in ("dhash", "phash"):
+        h = ImageProcessor.perceptual_hash(original, method)
+        assert ImageProcessor.hamming_distance(h, ImageProcessor.perceptual_hash(reencoded, method)) <= 4
+        assert ImageProcessor.hamming_distance(h, ImageProcessor.perceptual_hash(resized, method)) <= 4
+        for seed in range(2, 6):
+            assert ImageProcessor.hamming_distance(h, ImageProcessor.perceptual_hash(_photo(seed), method)) > 10
+    print("✅ Perceptual hashes OK")
+
+def test_index_matches_per_user_and_aspect():
+    index = NearDuplicateIndex(max_distance=5, per_user=2, ttl=3600)
+    index.add(1, "clothing_analysis", "v1", 0b1011, 0.8, "first")
+    assert index.find(1, "clothing_analysis", "v1", 0b1010, 0.8) == (1, "first")
+    # Other users, models, versions and shapes never match
+    assert index.find(2, "clothing_analysis", "v1", 0b1011, 0.8) is None
+    assert index.find(1, "clothing_detection", "v1", 0b1011, 0.8) is None
+    assert index.find(1, "clothing_analysis", "v2", 0b1011, 0.8) is None
+    assert index.find(1, "clothing_analysis", "v1", 0b1011, 1.25) is None
+    assert index.find(1, "clothing_analysis", "v1", 0b1011 ^ 0xFF00, 0.8) is None
+
+    # Only the newest per_user hashes are kept
+    index.add(1, "clothing_analysis", "v1", 0xFFFF << 40, 0.8, "second")
+    index.add(1, "clothing_analysis", "v1", 0xFFFF << 20, 0.8, "third")
+    assert index.find(1, "clothing_analysis", "v1", 0b1011, 0.8) is None
+    assert index.stats()["hashes"] == 2
+    print("✅ Near-duplicate index OK")
+
+def test_service_reuses_analysis_for_near_duplicates():
+    from app.services.enhanced_ml_service import EnhancedMLService
+    from app.services.ml_model_manager import ml_model_manager
+    from app.services.prediction_cache import prediction_cache
+
+    calls = []
+    async def fake_detect(image):
+        calls.append(image.shape)
+        h, w = image.shape[:2]
+        return [{"class": "shirt", "confidence": 0.9, "bbox": [w // 4, h // 4, w // 2, h // 2]}]
+
+    service = EnhancedMLService()
+    service._initialized = True
+    saved = (ml_model_manager.detect_clothing, dict(ml_model_manager.status), prediction_cache.persist)
+    ml_model_manager.detect_clothing = fake_detect
+    ml_model_manager.status["clothing_detector"] = {"status": "ready"}
+    prediction_cache.persist = False
+    try:
+        original = _photo(7, size=(1200, 960))
+        first = asyncio.run(service.analyze_clothing_image(_jpeg(original, 90), user_id=4242))
+        # Same picture, re-encoded at a smaller size: no new detection, boxes rescaled
+        smaller = cv2.resize(original, (480, 600), interpolation=cv2.INTER_AREA)
+        second = asyncio.run(service.analyze_clothing_image(_jpeg(smaller, 60), user_id=4242))
+        # A different user gets their own analysis
+        asyncio.run(service.analyze_clothing_image(_jpeg(smaller, 70), user_id=4343))
+    finally:
+        ml_model_manager.detect_clothing = saved[0]
+        ml_model_manager.status.clear()
+        ml_model_manager.status.update(saved[1])
+        prediction_cache.persist = saved[2]
+
+    assert len(calls) == 2
+    assert first["items"][0]["bbox"] == [160, 200, 320, 400]
+    assert second["items"][0]["bbox"] == [120, 150, 240, 300]
+    assert second["items"][0]["color_palette"] == first["items"][0]["color_palette"]
+    print("✅ Near-duplicate uploads reuse the prior analysis")
+
+if __name__ == "__main__":
+    test_perceptual_hash_tolerates_reencoding_and_resizing()
+    test_index_matches_per_user_and_aspect()
+    test_service_reuses_analysis_for_near_duplicates()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized nearby selection and the in-process grid index
+Run this from the fitsync-backend directory with: python test_nearby_index.py
+"""
+
+import math
+import random
+import time
+
+from app.services.geo_index import GridEntry, GridIndex
+from app.utils.geo import (
+    EARTH_RADIUS_KM, covering_geohashes, geohash_bbox, geohash_cell_size, geohash_encode,
+    haversine_km, haversine_km_many, nearest_within
+)
+
+def _points(n: int = 2000):
+    rng = random.Random(1)
+    return [(40.7 + rng.gauss(0, 0.1), -74.0 + rng.gauss(0, 0.1)) for _ in range(n)]
+
+def _reference(points, lat, lng, radius_km, limit):
+    in_range = [(haversine_km(lat, lng, *p), i) for i, p in enumerate(points)]
+    return [i for d, i in sorted(in_range) if d <= radius_km][:limit]
+
+def test_vectorized_selection_matches_scalar():
+    points = _points()
+    distances = haversine_km_many(40.7, -74.0, [p[0] for p in points], [p[1] for p in points])
+    for i, p in enumerate(points):
+        assert abs(distances[i] - haversine_km(40.7, -74.0, *p)) < 1e-9
+
+    assert list(nearest_within(distances, 5.0, 20)) == _reference(points, 40.7, -74.0, 5.0, 20)
+    assert len(nearest_within(distances, 5.0, 0)) == 0
+    print("✅ Vectorized haversine and top-k OK")
+
+def test_grid_index_queries_and_updates():
+    points = _points()
+    index = GridIndex(cell_deg=0.05)
+    index.replace((i, GridEntry("person", lat, lng, None, i)) for i, (lat, lng) in enumerate(points))
+
+    expected = _reference(points, 40.7, -74.0, 5.0, 20)
+    assert [payload for _, payload in index.nearest("person", 40.7, -74.0, 5.0, 20)] == expected
+    assert index.nearest("event", 40.7, -74.0, 5.0, 20) == []
+
+    # Moves and removals are visible immediately
+    index.upsert(expected[0], GridEntry("person", 10.0, 10.0, None, expected[0]))
+    index.remove(expected[1])
+    assert [payload for _, payload in index.nearest("person", 40.7, -74.0, 5.0, 18)] == expected[2:]
+    assert index.sizes()["person"] == len(points) - 1
+    print("✅ Grid index queries and updates OK")
+
+def test_grid_index_nearest_by_type_matches_single_type():
+    rng = random.Random(2)
+    index = GridIndex(cell_deg=0.05)
+    types = ["person", "event", "hotspot"]
+    index.replace(
+        (i, GridEntry(rng.choice(types), lat, lng, None, i)) for i, (lat, lng) in enumerate(_points())
+    )
+
+    limits = {"person": 5, "event": 7, "hotspot": 4}
+    combined = index.nearest_by_type(limits, 40.7, -74.0, 3.0)
+    for location_type, limit in limits.items():
+        assert combined[location_type] == index.nearest(location_type, 40.7, -74.0, 3.0, limit)
+    assert index.nearest_by_type({"unknown": 3}, 40.7, -74.0, 3.0) == {"unknown": []}
+    print("✅ Grid index combined query OK")
+
+def test_grid_index_expiry():
+    index = GridIndex()
+    index.upsert(1, GridEntry("event", 40.7, -74.0, time.time() + 0.2, "soon"))
+    index.upsert(2, GridEntry("event", 40.7, -74.0, None, "open"))
+    assert not index.upsert(3, GridEntry("event", 40.7, -74.0, time.time() - 1, "past"))
+    assert len(index.nearest("event", 40.7, -74.0, 1.0, 10)) == 2
+
+    time.sleep(0.3)
+    assert [payload for _, payload in index.nearest("event", 40.7, -74.0, 1.0, 10)] == ["open"]
+    assert index.sizes()["event"] == 1
+    print("✅ Grid index expiry OK")
+
+def _destination(lat, lng, bearing_deg, distance_km):
+    """Point ``distance_km`` from (lat, lng) along ``bearing_deg``"""
+    angle = distance_km / EARTH_RADIUS_KM
+    lat_rad, bearing = math.radians(lat), math.radians(bearing_deg)
+    dest_lat = math.asin(math.sin(lat_rad) * math.cos(angle) + math.cos(lat_rad) * math.sin(angle) * math.cos(bearing))
+    dest_lng = math.radians(lng) + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat_rad), math.cos(angle) - math.sin(lat_rad) * math.sin(dest_lat)
+    )
+    return math.degrees(dest_lat), math.degrees(dest_lng)
+
+def test_covering_cells_match_brute_force():
+    rng = random.Random(1)
+    for _ in range(300):
+        lat, lng = rng.uniform(-80, 80), rng.uniform(-170, 170)
+        precision = rng.choice([4, 5, 6])
+        radius_km = rng.uniform(0.3, 3.0) * geohash_cell_size(precision)[0] * 111
+        cells = set(covering_geohashes(lat, lng, radius_km, precision))
+
+        # Points just inside the circle, and every cell corner of the neighbourhood within it
+        points = [_destination(lat, lng, rng.uniform(0, 360), radius_km * (1 - 1e-7)) for _ in range(64)]
+        for cell in {geohash_encode(p_lat, p_lng, precision) for p_lat, p_lng in points}:
+            min_lat, max_lat, min_lng, max_lng = geohash_bbox(cell)
+            points += [(min_lat, min_lng), (min_lat, max_lng), (max_lat, min_lng), (max_lat, max_lng)]
+        for p_lat, p_lng in points:
+            if haversine_km(lat, lng, p_lat, p_lng) <= radius_km:
+                assert geohash_encode(p_lat, p_lng, precision) in cells, (lat, lng, radius_km, precision)
+    print("✅ Covering cells include every cell the circle reaches")
+
+def test_cell_records_expire_with_aware_datetimes():
+    from datetime import datetime, timedelta, timezone
+
+    from app.models.trends import NearbyLocation
+    from app.services.nearby_service import NearbyService
+
+    # PostgreSQL returns timezone-aware values for DateTime(timezone=True)
+    now = datetime.now(timezone.utc)
+    def event(location_id, expires_at):
+        return NearbyLocation(
+            id=location_id, location_type="event", name=f"Event {location_id}", latitude=40.7,
+            longitude=-74.0, location_metadata={"attendees": 3}, expires_at=expires_at
+        )
+    records = [
+        NearbyService._to_record("events", event(1, now + timedelta(hours=1))),
+        NearbyService._to_record("events", event(2, now - timedelta(hours=1))),
+        NearbyService._to_record("events", event(3, None)),
+        NearbyService._to_record("events", event(4, (now + timedelta(hours=1)).replace(tzinfo=None))),
+    ]
+    nearest = NearbyService.select_nearest(records, 40.7, -74.0, 1.0, 10)
+    assert sorted(record["id"] for record in nearest) == ["ev_1", "ev_3", "ev_4"]
+    assert all("_expires_at" not in record for record in nearest)
+    print("✅ Cached cell records expire with aware and naive datetimes")
+
+if __name__ == "__main__":
+    test_vectorized_selection_matches_scalar()
+    test_grid_index_queries_and_updates()
+    test_grid_index_nearest_by_type_matches_single_type()
+    test_grid_index_expiry()
+    test_covering_cells_match_brute_force()
+    test_cell_records_expire_with_aware_datetimes()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for the ONNX Runtime inference backend
+Run this from the fitsync-backend directory with: python test_onnx_backend.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from app.utils import onnx_runtime
+
+def test_letterbox_keeps_aspect_and_centres():
+    image = np.full((300, 600, 3), 200, dtype=np.uint8)
+    padded, ratio, (left, top) = onnx_runtime.letterbox(image, 640)
+    assert padded.shape == (640, 640, 3)
+    assert ratio == pytest.approx(640 / 600) and (left, top) == (0, 160)
+    assert (padded[:160] == 114).all() and (padded[160:480] == 200).all() and (padded[480:] == 114).all()
+    print("✅ Letterbox OK")
+
+def test_postprocess_nms_per_class_and_maps_back():
+    # Two overlapping boxes of class 0, one overlapping box of class 1, one below threshold
+    boxes = np.array([[320, 320, 100, 100], [325, 320, 100, 100], [320, 320, 100, 100], [100, 100, 20, 20]])
+    scores = np.array([[0.9, 0.0], [0.8, 0.0], [0.0, 0.7], [0.1, 0.0]])
+    prediction = np.c_[boxes, scores].T.astype(np.float32)
+    image_shape = (320, 640, 3)
+    _, transforms = onnx_runtime.yolo_input([np.zeros(image_shape, dtype=np.uint8)])
+
+    xyxy, conf, cls = onnx_runtime.yolo_postprocess(prediction, transforms[0], image_shape)
+    assert cls.tolist() == [0, 1]
+    assert conf.tolist() == pytest.approx([0.9, 0.7])
+    # 640x320 is letterboxed at scale 1 with 160 px of padding on top
+    assert xyxy[0].tolist() == pytest.approx([270, 110, 370, 210])
+    print("✅ YOLO post-processing OK")
+
+def test_tryon_generator_matches_torch():
+    pytest.importorskip("onnxruntime")
+    torch = pytest.importorskip("torch")
+    from app.models.generation.virtual_tryon import VirtualTryOnModel
+
+    torch.manual_seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "tryon_model.pt")
+        torch_model = VirtualTryOnModel(device="cpu")
+        torch.save(torch_model.model.state_dict(), model_path)
+        onnx_model = VirtualTryOnModel(model_path, device="cpu", backend="onnx")
+        assert os.path.exists(os.path.join(tmp, "tryon_model.onnx"))
+
+        batch = torch.rand(2, 7, 192, 256) * 2 - 1
+        assert np.abs(torch_model._forward(batch) - onnx_model._forward(batch)).max() < 1e-4
+
+        person = np.random.default_rng(0).integers(0, 256, size=(300, 200, 3), dtype=np.uint8)
+        result = onnx_model.generate_tryon(person, person[::2, ::2].copy())
+        assert result.result_image.shape == (192, 256, 3) and result.metadata["backend"] == "onnx"
+    print("✅ ONNX try-on generator matches torch")
+
+def test_tryon_static_int8_stays_close_to_fp32():
+    pytest.importorskip("onnxruntime")
+    torch = pytest.importorskip("torch")
+    from app.models.generation.virtual_tryon import VirtualTryOnModel
+
+    torch.manual_seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "tryon_model.pt")
+        fp32 = VirtualTryOnModel(device="cpu")
+        torch.save(fp32.model.state_dict(), model_path)
+        int8 = VirtualTryOnModel(model_path, device="cpu", quantization="static", calibration_samples=4)
+        assert int8.backend == "onnx" and os.path.exists(os.path.join(tmp, "tryon_model.int8-static.onnx"))
+
+        batch = torch.from_numpy(np.concatenate(int8.calibration_batches(samples=2)))
+        expected = fp32._forward(batch)
+        error = np.abs(int8._forward(batch) - expected).max()
+        assert error < 0.05 * np.abs(expected).max()
+
+        with pytest.raises(ValueError):
+            int8.quantize("float16")
+    print("✅ Static INT8 try-on generator stays close to fp32")
+
+if __name__ == "__main__":
+    test_letterbox_keeps_aspect_and_centres()
+    test_postprocess_nms_per_class_and_maps_back()
+    test_tryon_generator_matches_torch()
+    test_tryon_static_int8_stays_close_to_fp32()
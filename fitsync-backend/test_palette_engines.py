@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the ColorAnalyzer palette engines
+Run this from the fitsync-backend directory with: python test_palette_engines.py
+"""
+
+import numpy as np
+
+from app.utils.color_analysis import PALETTE_ENGINES, ColorAnalyzer
+
+# RGB colors and the share of the image each one covers
+GARMENT_COLORS = [((20, 30, 120), 0.5), ((200, 40, 40), 0.3), ((240, 240, 235), 0.2)]
+
+def _garment(height: int = 300, width: int = 200) -> np.ndarray:
+    """BGR image of three flat color bands with light noise"""
+    rows = []
+    for rgb, share in GARMENT_COLORS:
+        rows.append(np.tile(np.array(rgb[::-1], dtype=np.int16), (int(height * share), width, 1)))
+    image = np.concatenate(rows) + np.random.default_rng(1).integers(-3, 4, size=(height, width, 3))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+def test_engines_recover_garment_colors():
+    image = _garment()
+    for engine in PALETTE_ENGINES:
+        palette = ColorAnalyzer(n_colors=3, engine=engine).extract_palette(image)
+        assert len(palette.colors) == 3 and abs(sum(palette.percentages) - 100) < 1e-6, engine
+        for rgb, share in GARMENT_COLORS:
+            distances = [np.linalg.norm(np.subtract(color, rgb)) for color in palette.colors]
+            nearest = int(np.argmin(distances))
+            assert distances[nearest] < 4, (engine, rgb, palette.colors)
+            assert abs(palette.percentages[nearest] - share * 100) < 1, (engine, rgb, palette.percentages)
+        assert np.linalg.norm(np.subtract(palette.dominant_color, GARMENT_COLORS[0][0])) < 4, engine
+        assert palette.color_names[palette.colors.index(palette.dominant_color)] == "navy", engine
+    print("✅ Every engine recovers the garment colors and their shares")
+
+def test_fast_engines_handle_few_colors_and_bad_names():
+    flat = np.zeros((40, 40, 3), dtype=np.uint8)
+    for engine in ("minibatch", "histogram", "median_cut"):
+        palette = ColorAnalyzer(engine=engine).extract_palette(flat)
+        assert palette.colors == [(0, 0, 0)] and palette.percentages == [100.0], engine
+    try:
+        ColorAnalyzer(engine="octree")
+        raise AssertionError("unknown engine accepted")
+    except ValueError:
+        pass
+    assert ColorAnalyzer().version == "kmeans-8"
+    assert ColorAnalyzer(engine="minibatch", sample_size=5000).version == "minibatch-8-5000"
+    print("✅ Degenerate images and engine validation OK")
+
+if __name__ == "__main__":
+    test_engines_recover_garment_colors()
+    test_fast_engines_handle_few_colors_and_bad_names()
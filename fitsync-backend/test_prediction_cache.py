@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for the ML prediction cache
+Uses the configured sync database (e.g. DATABASE_URL=sqlite:///./fitsync.db).
+Run this from the fitsync-backend directory with: python test_prediction_cache.py
+"""
+
+import asyncio
+import uuid
+
+import numpy as np
+
+import app.models  # noqa: F401  (registers the users table for the foreign key)
+from app.database import engine, session_scope
+from app.models.analytics import ModelPrediction
+from app.services.prediction_cache import PredictionCache
+
+def _counting_compute(result):
+    calls = []
+    async def compute():
+        calls.append(1)
+        return result
+    return compute, calls
+
+def test_memory_hits_skip_inference():
+    cache = PredictionCache(persist=False)
+    compute, calls = _counting_compute({"items": [], "status": "success"})
+    key = PredictionCache.hash_bytes(b"same photo")
+
+    async def run():
+        for _ in range(3):
+            assert await cache.get_or_compute("clothing_analysis", "v1", key, compute) == {"items": [], "status": "success"}
+        # A new version is a different prediction
+        await cache.get_or_compute("clothing_analysis", "v2", key, compute)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    stats = cache.stats()["models"]["clothing_analysis"]
+    assert stats["memory_hits"] == 2 and stats["misses"] == 2 and stats["hit_ratio"] == 0.5
+    print("✅ In-memory prediction hits OK")
+
+def test_cache_if_vetoes_results():
+    cache = PredictionCache(persist=False)
+    compute, calls = _counting_compute({"status": "error"})
+    key = PredictionCache.hash_bytes(b"broken")
+
+    async def run():
+        for _ in range(2):
+            await cache.get_or_compute("clothing_detection", "v1", key, compute,
+                                       cache_if=lambda r: r["status"] == "success")
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    print("✅ Uncacheable results are recomputed")
+
+def test_array_hash_covers_shape_and_pixels():
+    image = np.zeros((4, 6, 3), dtype=np.uint8)
+    assert PredictionCache.hash_array(image) == PredictionCache.hash_array(image.copy())
+    assert PredictionCache.hash_array(image) != PredictionCache.hash_array(image.reshape(6, 4, 3))
+    changed = image.copy()
+    changed[0, 0, 0] = 1
+    assert PredictionCache.hash_array(image) != PredictionCache.hash_array(changed)
+    # Non-contiguous crops hash like their contiguous copies
+    assert PredictionCache.hash_array(image[:, ::2]) == PredictionCache.hash_array(image[:, ::2].copy())
+    print("✅ Array hashing OK")
+
+def test_predictions_persist_across_processes():
+    ModelPrediction.__table__.create(engine, checkfirst=True)
+    result = {"color_palette": {"colors": [[1, 2, 3]]}, "color_harmony": {"harmony_score": 0.5}}
+    key = PredictionCache.hash_bytes(uuid.uuid4().bytes)
+    compute, calls = _counting_compute(result)
+
+    async def run():
+        await PredictionCache(persist=True).get_or_compute("color_palette", "v1", key, compute, user_id=1)
+        # A fresh cache (e.g. another worker or a restart) finds the stored row
+        fresh = PredictionCache(persist=True)
+        assert await fresh.get_or_compute("color_palette", "v1", key, compute, user_id=1) == result
+        assert await fresh.get_or_compute("color_palette", "v1", key, compute, user_id=1) == result
+        return fresh.stats()["models"]["color_palette"]
+
+    stats = asyncio.run(run())
+    assert len(calls) == 1
+    assert stats == {"memory_hits": 1, "db_hits": 1, "misses": 0, "hit_ratio": 1.0}
+    print("✅ Persisted predictions are reused")
+
+def test_memory_only_predictions_skip_the_database():
+    ModelPrediction.__table__.create(engine, checkfirst=True)
+    key = PredictionCache.hash_bytes(uuid.uuid4().bytes)
+    compute, calls = _counting_compute({"color_palette": {}})
+
+    async def run():
+        cache = PredictionCache(persist=True)
+        await cache.get_or_compute("color_palette", "v1", key, compute, user_id=1, persist=False)
+        # Not stored, so another worker computes it again
+        await PredictionCache(persist=True).get_or_compute("color_palette", "v1", key, compute, user_id=1, persist=False)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    with session_scope() as db:
+        assert db.query(ModelPrediction).filter_by(input_hash=key).count() == 0
+    print("✅ Memory-only predictions skip the database")
+
+if __name__ == "__main__":
+    test_memory_hits_skip_inference()
+    test_cache_if_vetoes_results()
+    test_array_hash_covers_shape_and_pixels()
+    test_predictions_persist_across_processes()
+    test_memory_only_predictions_skip_the_database()